@@ -1,14 +1,29 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import io
 import json
 import os
+import pstats
 import uuid
 import asyncio
-import threading
 from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
-from src.adforge_agent import AdForgeAgent
-from src.gemini_service import GeminiService
+from src.checkpoint import DEFAULT_CHECKPOINT_ROWS, load_checkpoint
+from src.gemini_service import get_gemini_service
+from src.response_cache import get_response_cache
+from src.log_tail import LogTailRegistry
+from src.event_bus import END_OF_STREAM, get_event_bus
+from src.job_scheduler import QueueFullError, get_job_scheduler
+from src.job_store import ACTIVE_STATUSES, FINISHED_STATUSES, current_owner, get_job_store, owner_alive
+from src.metrics import get_metrics
+from src.records import OBSERVATION_FIELDS, json_default, plain
+from src.warmup import start_warm_up
+
+# The agent, rules engine, portfolio optimizer and segment index (pandas,
+# numpy and the Gemini SDK behind them) are imported where they are first
+# used, so the process starts and answers /health without loading them;
+# the background warm-up (see start_background_warm_up) preloads them.
 
 # Load environment variables
 load_dotenv()
@@ -16,59 +31,213 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# In-memory job storage (in production, use Redis or database)
-active_jobs = {}
+# Job records; finished jobs are evicted after JOB_TTL_SECONDS
+job_store = get_job_store()
+
+# Parsed log entries and progress counters per job, updated incrementally
+log_tails = LogTailRegistry()
+
+# Drop per-job state along with evicted job records
+job_store.on_evict.append(log_tails.discard)
+job_store.on_evict.append(get_event_bus().discard)
+job_store.on_evict.append(lambda job_id: _segment_indexes().discard(job_id))
+
+# Seconds between SSE keep-alive comments on an idle stream
+SSE_KEEPALIVE_SECONDS = 15
+# Retry-After hint sent with 429 responses when the job queue is full
+QUEUE_FULL_RETRY_AFTER_SECONDS = 5
+DATASET_PATH = "../data/digital_marketing_campaign_dataset.csv"
+
+
+def start_background_warm_up():
+    """
+    Preload the heavy modules, dataset and Gemini client on a background
+    thread, once per process; AGENT_WARMUP=0 turns it off. Every worker
+    starts it with its first request, under any WSGI server; a server hook
+    that runs in each worker (e.g. gunicorn's post_fork) can call this to
+    start it before any request arrives.
+    """
+    if os.getenv("AGENT_WARMUP", "1") == "1":
+        start_warm_up(DATASET_PATH, delay=float(os.getenv("AGENT_WARMUP_DELAY", 0.5)))
+
+
+@app.before_request
+def _warm_up_worker():
+    start_background_warm_up()
+
+
+def _segment_indexes():
+    from src.segment_index import get_segment_indexes
+    return get_segment_indexes()
+
+
+def _rules_engine(rules):
+    """RulesEngine from the "rules" option: true, or a dict of custom thresholds"""
+    from src.rules_engine import RulesEngine
+    return RulesEngine(**rules) if isinstance(rules, dict) else (RulesEngine() if rules else None)
+
+
+def _portfolio_optimizer(portfolio):
+    """PortfolioOptimizer from the "portfolio" option: true, or a dict of settings"""
+    from src.portfolio import PortfolioOptimizer
+    return PortfolioOptimizer(**portfolio) if isinstance(portfolio, dict) else (PortfolioOptimizer() if portfolio else None)
+
+
+def _int_option(value, name, minimum):
+    """An integer run option (JSON number or numeric string); ValueError otherwise"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"\"{name}\" must be an integer")
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"\"{name}\" must be an integer") from None
+    if number < minimum:
+        raise ValueError(f"\"{name}\" must be at least {minimum}")
+    return number
+
+
+def _schedule_agent(job_id, tenant, build_agent, dataset_path=DATASET_PATH, demo_rows=3):
+    """
+    Queue a job whose agent comes from build_agent(gemini_service); it runs
+    as a coroutine on the scheduler's shared event loop. Returns the queue
+    position; raises QueueFullError when the scheduler is saturated.
+    """
+    async def run_agent():
+        try:
+            # Create agent on the shared gemini service. Construction can read
+            # files (a resumed job replays its log), so it runs on a worker
+            # thread instead of blocking every job on the shared event loop.
+            agent = await asyncio.to_thread(lambda: build_agent(get_gemini_service()))
+            
+            # Update job status
+            job_store.update(job_id, status="RUNNING")
+            
+            # Run the campaign analysis
+            result = await agent.run_intelligent_campaign(dataset_path, demo_rows)
+            
+            # Update final status
+            job_store.update(job_id, status="COMPLETED", result=result)
+            
+        except asyncio.CancelledError:
+            job_store.update(job_id, status="CANCELLED")
+            raise
+        except Exception as e:
+            job_store.update(job_id, status="ERROR", error=str(e))
+            raise
+        finally:
+            get_event_bus().close(job_id)
+    
+    def on_cancel():
+        job_store.update(job_id, status="CANCELLED")
+        get_event_bus().close(job_id)
+    
+    return get_job_scheduler().submit(job_id, run_agent, tenant=tenant, on_cancel=on_cancel)
+
+
+def _queue_full_response(error):
+    response = jsonify({
+        "success": False,
+        "error": str(error)
+    })
+    response.headers["Retry-After"] = str(QUEUE_FULL_RETRY_AFTER_SECONDS)
+    return response, 429
 
 
 @app.route('/start-campaign', methods=['POST'])
 def start_campaign():
     """Start a new campaign analysis job"""
+    from src.adforge_agent import AGENT_MODES, AdForgeAgent, DEFAULT_MAX_CONCURRENCY
+    from src.clock import CLOCK_MODES
+    from src.prompt_builder import PROMPT_ENCODINGS
     try:
         # Generate unique job ID
         job_id = str(uuid.uuid4())
         
+        # Optional run settings, checked before anything is queued:
+        # {"mode": "demo"|"production", "max_concurrency": 8, "batch_size": 1, "streaming": false, "shards": 1,
+        #  "rules": false | true | {"high_roi": 20, "low_roi": -10, ...},
+        #  "portfolio": false | true | {"max_shift": 0.5, "budget": 40000000},
+        #  "prompt_encoding": "json"|"compact", "prompt_fields": ["roi", ...],
+        #  "clock": "demo"|"realtime"|"virtual", "profile": false, "checkpoint_rows": 256}
+        options = request.get_json(silent=True) or {}
+        try:
+            mode = options.get("mode", os.getenv("AGENT_MODE", "demo"))
+            if mode not in AGENT_MODES:
+                raise ValueError(f"Unknown mode '{mode}', expected one of {AGENT_MODES}")
+            max_concurrency = _int_option(
+                options.get("max_concurrency", os.getenv("AGENT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                "max_concurrency", 1)
+            batch_size = _int_option(options.get("batch_size", os.getenv("AGENT_BATCH_SIZE", 1)), "batch_size", 1)
+            streaming = bool(options.get("streaming", os.getenv("AGENT_STREAMING", "0") == "1"))
+            # Production runs can be split across this many worker processes,
+            # at most one per CPU (each is a freshly spawned interpreter)
+            shards = _int_option(options.get("shards", os.getenv("AGENT_SHARDS", 1)), "shards", 1)
+            if streaming and shards > 1:
+                raise ValueError("Sharded runs load the dataset in memory and cannot be combined with streaming")
+            shards = min(shards, os.cpu_count() or 1)
+            # Decide clear-cut rows with local rules (optionally with custom thresholds)
+            rules = options.get("rules", os.getenv("AGENT_RULES", "0") == "1")
+            rules_engine = _rules_engine(rules)
+            # Reallocate budget across campaign groups at the end of the run
+            portfolio_optimizer = _portfolio_optimizer(options.get("portfolio", os.getenv("AGENT_PORTFOLIO", "0") == "1"))
+            prompt_encoding = options.get("prompt_encoding", os.getenv("AGENT_PROMPT_ENCODING", "json"))
+            if prompt_encoding not in PROMPT_ENCODINGS:
+                raise ValueError(f"Unknown prompt_encoding '{prompt_encoding}', expected one of {PROMPT_ENCODINGS}")
+            prompt_fields = options.get("prompt_fields")
+            if prompt_fields is not None and (not isinstance(prompt_fields, list) or any(
+                    not isinstance(field, str) or field not in OBSERVATION_FIELDS for field in prompt_fields)):
+                raise ValueError(f"prompt_fields must be a list of observation fields: {', '.join(OBSERVATION_FIELDS)}")
+            # Pacing defaults to the demo cadence in demo mode and none in production
+            clock = options.get("clock", os.getenv("AGENT_CLOCK"))
+            if clock is not None and clock not in CLOCK_MODES:
+                raise ValueError(f"Unknown clock '{clock}', expected one of {CLOCK_MODES}")
+            # Write a cProfile of the run to logs/<job_id>.prof (see /campaign-profile)
+            profile = bool(options.get("profile", os.getenv("AGENT_PROFILE", "0") == "1"))
+            # Committed progress is checkpointed every this many rows (0: never), see /resume-campaign
+            checkpoint_every = _int_option(
+                options.get("checkpoint_rows", os.getenv("AGENT_CHECKPOINT_ROWS", DEFAULT_CHECKPOINT_ROWS)),
+                "checkpoint_rows", 0)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        # Jobs are scheduled fairly across tenants
+        tenant = request.headers.get("X-Tenant-ID") or options.get("tenant") or "default"
+        
         # Initialize the job
-        active_jobs[job_id] = {
-            "status": "STARTING",
+        job_store.create(job_id, {
+            "status": "QUEUED",
             "created_at": datetime.now().isoformat(),
+            "mode": mode,
+            "tenant": tenant,
+            "owner": current_owner(),
             "progress": 0
-        }
+        })
+        # Per-segment totals of the rows observed so far (see /segment-summary)
+        segment_index = _segment_indexes().create_job(job_id)
         
-        # Start the agent in a separate thread
-        def run_agent():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                # Create agent and gemini service
-                gemini_service = GeminiService()
-                agent = AdForgeAgent(job_id, gemini_service)
-                
-                # Update job status
-                active_jobs[job_id]["status"] = "RUNNING"
-                
-                # Run the campaign analysis
-                dataset_path = "../data/digital_marketing_campaign_dataset.csv"
-                result = loop.run_until_complete(agent.run_intelligent_campaign(dataset_path))
-                
-                # Update final status
-                active_jobs[job_id]["status"] = "COMPLETED"
-                active_jobs[job_id]["result"] = result
-                
-            except Exception as e:
-                active_jobs[job_id]["status"] = "ERROR"
-                active_jobs[job_id]["error"] = str(e)
-            finally:
-                loop.close()
+        def build_agent(gemini_service):
+            return AdForgeAgent(job_id, gemini_service, mode=mode, max_concurrency=max_concurrency,
+                                response_cache=get_response_cache(), batch_size=batch_size,
+                                streaming=streaming, shards=shards, rules_engine=rules_engine,
+                                portfolio_optimizer=portfolio_optimizer, segment_index=segment_index,
+                                prompt_encoding=prompt_encoding, prompt_fields=prompt_fields, clock=clock,
+                                profile=profile, checkpoint_every=checkpoint_every or None,
+                                event_sink=partial(get_event_bus().publish, job_id))
         
-        # Start the agent thread
-        thread = threading.Thread(target=run_agent)
-        thread.daemon = True
-        thread.start()
+        # Queue the job; reject it when the scheduler is saturated
+        try:
+            position = _schedule_agent(job_id, tenant, build_agent)
+        except QueueFullError as e:
+            job_store.delete(job_id)
+            _segment_indexes().discard(job_id)
+            return _queue_full_response(e)
         
         return jsonify({
             "success": True,
             "job_id": job_id,
+            "queue_position": position,
             "message": "Campaign analysis started"
         })
         
@@ -78,37 +247,140 @@ def start_campaign():
             "error": str(e)
         }), 500
 
+
+def _held_by_live_process(job_id, job_info):
+    """
+    Whether the job is queued or running in some server process, this one or
+    another sharing the job store: its record is QUEUED or RUNNING and the
+    process that owns it is still alive.
+    """
+    if get_job_scheduler().is_active(job_id):
+        return True
+    owner = job_info.get("owner")
+    if job_info.get("status") not in ACTIVE_STATUSES or owner is None or owner == current_owner():
+        return False
+    return owner_alive(owner)
+
+
+@app.route('/resume-campaign/<job_id>', methods=['POST'])
+def resume_campaign(job_id):
+    """
+    Continue a job from its last checkpoint, e.g. after the process died.
+    
+    Log entries of steps that never committed are dropped and the run picks
+    up at the next row, with the job's original settings. A completed job
+    can be resumed with {"incremental": true} to process only the rows
+    appended to the dataset since it last ran.
+    """
+    from src.adforge_agent import AdForgeAgent
+    try:
+        state = load_checkpoint(job_id)
+        if state is None:
+            return jsonify({
+                "success": False,
+                "error": "No checkpoint for this job"
+            }), 404
+        
+        # A job left QUEUED or RUNNING by a process that died can be resumed
+        job_info = job_store.get(job_id)
+        if job_info is not None and _held_by_live_process(job_id, job_info):
+            return jsonify({
+                "success": False,
+                "error": f"Job is already {job_info['status']}"
+            }), 409
+        
+        body = request.get_json(silent=True) or {}
+        if state["completed"] and not body.get("incremental"):
+            return jsonify({
+                "success": False,
+                "error": "Job already completed; pass \"incremental\": true to process newly appended rows"
+            }), 409
+        
+        options = state["options"]
+        tenant = request.headers.get("X-Tenant-ID") or body.get("tenant") or (job_info or {}).get("tenant", "default")
+        if job_info is None:
+            # The job record did not survive (e.g. an in-memory store after a restart)
+            job_store.create(job_id, {
+                "status": "QUEUED",
+                "created_at": datetime.now().isoformat(),
+                "mode": options["mode"],
+                "tenant": tenant,
+                "progress": 0
+            })
+        job_store.update(job_id, status="QUEUED", resumed_from_row=state["next_row"], error=None,
+                         owner=current_owner())
+        
+        # The log is about to be truncated and continued
+        log_tails.discard(job_id)
+        get_event_bus().discard(job_id)
+        # Rebuilt from the committed steps in the log, then updated as the run continues
+        segment_index = _segment_indexes().create_job(job_id)
+        
+        def build_agent(gemini_service):
+            return AdForgeAgent(job_id, gemini_service, mode=options["mode"],
+                                max_concurrency=options["max_concurrency"],
+                                response_cache=get_response_cache(), batch_size=options["batch_size"],
+                                streaming=options["streaming"], shards=options["shards"],
+                                rules_engine=_rules_engine(options["rules"]),
+                                portfolio_optimizer=_portfolio_optimizer(options.get("portfolio")),
+                                segment_index=segment_index,
+                                prompt_encoding=options["prompt_encoding"], prompt_fields=options["prompt_fields"],
+                                json_output=options["json_output"], clock=options["clock"],
+                                profile=options["profile"], checkpoint_every=options["checkpoint_every"],
+                                resume=True, event_sink=partial(get_event_bus().publish, job_id))
+        
+        try:
+            position = _schedule_agent(job_id, tenant, build_agent, options["dataset_path"], options["demo_rows"])
+        except QueueFullError as e:
+            if job_info is None:
+                job_store.delete(job_id)
+            else:
+                job_store.update(job_id, status=job_info["status"], error=job_info.get("error"),
+                                 owner=job_info.get("owner"))
+            return _queue_full_response(e)
+        
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "queue_position": position,
+            "resumed_from_row": state["next_row"],
+            "message": "Campaign analysis resumed"
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/get-campaign-status/<job_id>', methods=['GET'])
 def get_campaign_status(job_id):
     """Get the current status and live log of a campaign job"""
     try:
-        # Check if job exists
-        if job_id not in active_jobs:
+        # Get job info
+        job_info = job_store.get(job_id)
+        if job_info is None:
             return jsonify({
                 "success": False,
                 "error": "Job not found"
             }), 404
         
-        # Get job info
-        job_info = active_jobs[job_id]
-        
-        # Read the log file
-        log_file_path = f"logs/{job_id}.jsonlog"
-        log_entries = []
-        
-        if os.path.exists(log_file_path):
-            with open(log_file_path, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            log_entries.append(json.loads(line))
-                        except json.JSONDecodeError:
-                            continue
-        
-        # Calculate progress based on log entries
-        total_expected_steps = 3  # We're using 3 demo rows
-        completed_steps = len([entry for entry in log_entries if entry.get("step") == "ACT" and entry.get("sub_step") == "completed"])
-        progress = min(100, (completed_steps / total_expected_steps) * 100) if total_expected_steps > 0 else 0
+        # Only entries after `cursor` are returned; pass back `next_cursor` on the next poll
+        cursor = request.args.get("cursor", default=0, type=int)
+        limit = request.args.get("limit", default=None, type=int)
+        if limit is not None and limit < 0:
+            return jsonify({
+                "success": False,
+                "error": "limit must not be negative"
+            }), 400
+        
+        # Read what was appended to the log file since the last poll
+        log_tail = log_tails.get(job_id, f"logs/{job_id}.jsonlog")
+        log_entries, next_cursor = log_tail.read(cursor, limit)
+        progress = log_tail.progress
+        # Nothing more will be appended: later pages are read back from the file
+        if job_info["status"] in FINISHED_STATUSES and next_cursor == log_tail.total_entries:
+            log_tail.release()
         
         return jsonify({
             "success": True,
@@ -117,7 +389,9 @@ def get_campaign_status(job_id):
                 "progress": progress
             },
             "log_entries": log_entries,
-            "total_entries": len(log_entries)
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "total_entries": log_tail.total_entries
         })
         
     except Exception as e:
@@ -126,20 +400,214 @@ def get_campaign_status(job_id):
             "error": str(e)
         }), 500
 
+def _sse_event(seq, entry):
+    return f"id: {seq}\ndata: {json.dumps(plain(entry), default=json_default)}\n\n"
+
+@app.route('/stream-campaign/<job_id>', methods=['GET'])
+def stream_campaign(job_id):
+    """
+    Push a job's log entries as Server-Sent Events as soon as they are written.
+    
+    Each event's id is the entry's sequence number. A reconnecting client
+    sends Last-Event-ID (or ?last_event_id=) and resumes right after it.
+    A client that falls too far behind gets an `overflow` event and should
+    reconnect; an `end` event with the final job info closes the stream.
+    """
+    if job_id not in job_store:
+        return jsonify({
+            "success": False,
+            "error": "Job not found"
+        }), 404
+    
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    start_seq = 0
+    if last_event_id:
+        if not last_event_id.isdecimal():
+            return jsonify({
+                "success": False,
+                "error": "Last-Event-ID must be a non-negative integer"
+            }), 400
+        start_seq = int(last_event_id) + 1
+    
+    event_bus = get_event_bus()
+    subscription = event_bus.subscribe(job_id)
+    log_tail = log_tails.get(job_id, f"logs/{job_id}.jsonlog")
+    
+    def generate():
+        next_seq = start_seq
+        try:
+            # Replay: older entries from the log file, then the bus's recent events
+            backlog = [(seq, entry) for seq, entry in subscription.backlog if seq >= next_seq]
+            backlog_start = backlog[0][0] if backlog else None
+            if backlog_start is None or backlog_start > next_seq:
+                limit = None if backlog_start is None else backlog_start - next_seq
+                entries, _ = log_tail.read(next_seq, limit)
+                for entry in entries:
+                    yield _sse_event(next_seq, entry)
+                    next_seq += 1
+            for seq, entry in backlog:
+                if seq >= next_seq:
+                    yield _sse_event(seq, entry)
+                    next_seq = seq + 1
+            
+            # Live events
+            while not subscription.closed:
+                item = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if item is END_OF_STREAM:
+                    break
+                if item is None:
+                    if subscription.overflowed:
+                        yield "event: overflow\ndata: {}\n\n"
+                        return
+                    if (job_store.get(job_id) or {}).get("status") in FINISHED_STATUSES:
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                seq, entry = item
+                if seq >= next_seq:  # Skip anything already replayed
+                    yield _sse_event(seq, entry)
+                    next_seq = seq + 1
+            
+            yield f"event: end\ndata: {json.dumps(job_store.get(job_id) or {})}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/cancel-campaign/<job_id>', methods=['POST'])
+def cancel_campaign(job_id):
+    """Cancel a queued or running campaign job"""
+    job_info = job_store.get(job_id)
+    if job_info is None:
+        return jsonify({
+            "success": False,
+            "error": "Job not found"
+        }), 404
+    
+    if job_info["status"] in FINISHED_STATUSES or not get_job_scheduler().cancel(job_id):
+        job_info = job_store.get(job_id) or job_info
+        return jsonify({
+            "success": False,
+            "error": f"Job is already {job_info['status']}"
+        }), 409
+    
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "message": "Cancellation requested"
+    })
+
 @app.route('/list-jobs', methods=['GET'])
 def list_jobs():
-    """List all active jobs"""
+    """
+    List jobs, newest first, a page at a time.
+    
+    Filter with ?status=RUNNING etc.; pass the returned `next_cursor` as
+    ?cursor= to get the next page (it is null on the last page).
+    """
+    status = request.args.get("status")
+    limit = max(1, min(request.args.get("limit", default=50, type=int), 500))
+    cursor = request.args.get("cursor", default=None, type=int)
+    jobs, next_cursor = job_store.list(status=status, limit=limit, cursor=cursor)
     return jsonify({
         "success": True,
-        "jobs": active_jobs
+        "jobs": jobs,
+        "next_cursor": next_cursor,
+        "total": job_store.count(status)
     })
 
+@app.route('/campaign-profile/<job_id>', methods=['GET'])
+def campaign_profile(job_id):
+    """Top functions of a profiled job's run, as pstats text (?sort=cumulative&limit=40)"""
+    path = f"logs/{job_id}.prof"
+    if not os.path.exists(path):
+        return jsonify({
+            "success": False,
+            "error": "No profile for this job (start it with \"profile\": true)"
+        }), 404
+    
+    sort = request.args.get("sort", "cumulative")
+    limit = max(1, min(request.args.get("limit", default=40, type=int), 500))
+    report = io.StringIO()
+    try:
+        pstats.Stats(path, stream=report).sort_stats(sort).print_stats(limit)
+    except (KeyError, TypeError) as e:
+        return jsonify({
+            "success": False,
+            "error": f"Invalid sort key: {str(e)}"
+        }), 400
+    return Response(report.getvalue(), mimetype="text/plain")
+
+@app.route('/segment-summary', methods=['GET'])
+def segment_summary():
+    """
+    Spend, conversions, visits and ROI of a segment, from precomputed aggregates.
+    
+    Filter with any of ?channel=, ?type=, ?platform=, ?gender=, ?age_band=
+    (e.g. 25-34) and ?income_band= (e.g. 50k-75k); ?group_by=<dimension>
+    adds a breakdown over that dimension. With ?job_id= the figures cover
+    the rows the job has observed so far, otherwise the whole dataset.
+    """
+    from src.segment_index import DIMENSIONS
+    job_id = request.args.get("job_id")
+    filters = {dim: request.args[dim] for dim in DIMENSIONS if request.args.get(dim)}
+    group_by = request.args.get("group_by")
+    try:
+        if job_id:
+            index = _segment_indexes().for_job(job_id)
+            if index is None:
+                return jsonify({
+                    "success": False,
+                    "error": "No segment index for this job"
+                }), 404
+        else:
+            index = _segment_indexes().for_dataset(DATASET_PATH)
+        
+        summary = {
+            "success": True,
+            "job_id": job_id,
+            "filters": filters,
+            "totals": index.query(**filters)
+        }
+        if group_by:
+            summary["group_by"] = group_by
+            summary["breakdown"] = index.breakdown(group_by, **filters)
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and service counters in the Prometheus text format"""
+    registry = get_metrics()
+    scheduler = get_job_scheduler().metrics()
+    registry.set_gauge("adforge_jobs_queued", scheduler["queue_depth"])
+    registry.set_gauge("adforge_jobs_running", scheduler["running"])
+    cache = get_response_cache().stats()
+    registry.set_counter("adforge_response_cache_hits_total", cache["hits"])
+    registry.set_counter("adforge_response_cache_misses_total", cache["misses"])
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "success": True,
         "message": "AdForge Agent Backend is running",
+        "response_cache": get_response_cache().stats(),
+        "scheduler": get_job_scheduler().metrics(),
         "timestamp": datetime.now().isoformat()
     })
 
@@ -147,7 +615,7 @@ def health_check():
 def test_gemini():
     """Test Gemini API connection"""
     try:
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
         is_connected = gemini_service.test_connection()
         
         return jsonify({
@@ -169,6 +637,11 @@ if __name__ == '__main__':
     # Ensure logs directory exists
     os.makedirs('logs', exist_ok=True)
     
+    # Start the warm-up with the server instead of the first request; with
+    # the debug reloader only the serving child process needs it
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_warm_up()
+    
     print("🚀 AdForge Agent Backend starting...")
     print("📊 Ready to analyze campaigns with AI transparency")
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1 @@
+# AdForge Backend Benchmarks (run from backend/: python -m benchmarks.<name>)
@@ -0,0 +1,37 @@
+"""
+Throughput of GeminiService against a local fake model (no network access).
+
+    python -m benchmarks.bench_gemini_service --calls 400 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from src.gemini_service import GeminiService
+from .fake_gemini import FakeGenerativeModel
+
+
+async def run_calls(service, calls):
+    started = time.perf_counter()
+    await asyncio.gather(*(service.generate_content(f"prompt {i}") for i in range(calls)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>12} {'calls/sec':>10} {'model calls':>12}")
+    for concurrency in args.concurrency:
+        model = FakeGenerativeModel(latency=args.latency, error_rate=args.error_rate, seed=0)
+        service = GeminiService(model=model, max_concurrency=concurrency, backoff_base=0.01)
+        elapsed = asyncio.run(run_calls(service, args.calls))
+        print(f"{concurrency:>12} {args.calls / elapsed:>10.1f} {model.calls:>12}")
+
+
+if __name__ == "__main__":
+    main()
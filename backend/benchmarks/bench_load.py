@@ -0,0 +1,303 @@
+"""
+Offline load test: whole jobs, status polling and job submission, against a
+local fake model. Results are written as JSON so runs can be compared.
+
+    python -m benchmarks.bench_load --rows 8000 --latency 0.05 --latency-spread 0.5 \
+        --error-rate 0.02 --malformation-rate 0.05 --output results.json
+    python -m benchmarks.bench_load --sections poll --compare results.json
+
+jobs   production runs per batch size, each in a fresh process: rows/sec,
+       per-row latency (OBSERVE to ACT) p50/p99, peak RSS
+poll   /get-campaign-status cost for logs of increasing length: first read,
+       repeated full read, and incremental polls at the returned cursor
+start  /start-campaign requests/sec and latency under concurrent clients
+       (short virtual-clock demo jobs; 429s are counted, not retried)
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+
+from src.adforge_agent import AdForgeAgent
+from .fake_gemini import make_fake_service
+from .results import compare
+from .synthetic_data import make_synthetic_dataset
+
+# One step's worth of log entries, repeated to build long logs for the poll section
+POLL_STEP_ENTRIES = [
+    {"step": "OBSERVE", "sub_step": "data_received", "data": {"campaign_id": "campaign_1", "roi": -62.5,
+                                                               "ad_spend": 6497.87, "conversions": 78}},
+    {"step": "ORIENT", "sub_step": "prompt_constructed", "prompt": "x" * 500},
+    {"step": "ORIENT", "sub_step": "consulting_ai"},
+    {"step": "ORIENT", "sub_step": "ai_response_received", "ai_response": {"reasoning": "r" * 200,
+                                                                           "confidence": 0.75}},
+    {"step": "DECIDE", "decision": {"tool_name": "continue_monitoring", "parameters": {}}},
+    {"step": "ACT", "sub_step": "executing"},
+    {"step": "ACT", "sub_step": "completed", "result": {"tool_executed": "continue_monitoring"}},
+]
+
+
+class TimedAgent(AdForgeAgent):
+    """Records each step's latency, from its OBSERVE entry to the end of ACT."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.step_started = {}
+        self.step_latencies = []
+
+    def _observe_entry(self, step_number, observation):
+        self.step_started[step_number] = time.perf_counter()
+        return super()._observe_entry(step_number, observation)
+
+    async def _decide_and_act(self, step_number, gemini_response, emit):
+        await super()._decide_and_act(step_number, gemini_response, emit)
+        self.step_latencies.append(time.perf_counter() - self.step_started.pop(step_number))
+
+
+def _percentiles_ms(samples):
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {f"p{q}": round(float(np.percentile(values, q)), 3) for q in (50, 90, 99)} | \
+        {"max": round(float(values.max()), 3)}
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run_job(dataset_path, batch_size, max_concurrency, rules, model_options):
+    """One production job; runs in its own process so peak RSS is the job's."""
+    from src.rules_engine import RulesEngine
+
+    service = make_fake_service(max_concurrency=max_concurrency, **model_options)
+    agent = TimedAgent(f"bench-load-{batch_size}", service, mode="production", max_concurrency=max_concurrency,
+                       batch_size=batch_size, rules_engine=RulesEngine() if rules else None)
+    rss_before = _max_rss_mb()
+    started = time.perf_counter()
+    summary = asyncio.run(agent.run_intelligent_campaign(dataset_path))
+    elapsed = time.perf_counter() - started
+    rows = len(agent.step_latencies)
+    return {
+        "batch_size": batch_size,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1),
+        "row_latency_ms": _percentiles_ms(agent.step_latencies),
+        "peak_rss_mb": round(_max_rss_mb(), 1),
+        "rss_growth_mb": round(_max_rss_mb() - rss_before, 1),
+        "model_calls": service.model.calls,
+        "malformed_responses": service.model.malformed,
+        "response_parsing": summary["response_parsing"],
+        "token_usage": summary["token_usage"],
+    }
+
+
+def bench_jobs(args, dataset_path, model_options):
+    results = []
+    print(f"{'batch':>6} {'rows/sec':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak MB':>8} {'calls':>7} {'failed':>7}")
+    for batch_size in args.batch_sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(run_job, dataset_path, batch_size, args.concurrency, args.rules,
+                                 model_options).result()
+        results.append(result)
+        print(f"{batch_size:>6} {result['rows_per_sec']:>10.1f} {result['row_latency_ms']['p50']:>9.1f} "
+              f"{result['row_latency_ms']['p99']:>9.1f} {result['peak_rss_mb']:>8.0f} {result['model_calls']:>7} "
+              f"{result['response_parsing']['failed']:>7}")
+    return results
+
+
+def _timed_get(client, url, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000, response
+
+
+def _append_entries(path, start_step, steps):
+    with open(path, "a") as f:
+        for step_number in range(start_step, start_step + steps):
+            for entry in POLL_STEP_ENTRIES:
+                f.write(json.dumps({**entry, "step_number": step_number}) + "\n")
+
+
+def bench_poll(args, app_module):
+    client = app_module.app.test_client()
+    results = []
+    print(f"{'entries':>9} {'first ms':>9} {'full ms':>9} {'tail ms':>8} {'+700 ms':>8} {'full KB':>8}")
+    for entries in args.poll_lengths:
+        job_id = f"bench-poll-{entries}"
+        path = f"logs/{job_id}.jsonlog"
+        if os.path.exists(path):
+            os.remove(path)
+        app_module.job_store.create(job_id, {"status": "RUNNING", "created_at": datetime.now().isoformat(),
+                                             "mode": "production", "progress": 0})
+        steps = max(1, entries // len(POLL_STEP_ENTRIES))
+        _append_entries(path, 1, steps)
+
+        status_url = f"/get-campaign-status/{job_id}"
+        first_ms, response = _timed_get(client, status_url)
+        full_bytes = len(response.get_data())
+        next_cursor = response.get_json()["next_cursor"]
+        full_ms, _ = _timed_get(client, status_url, repeat=3)
+        tail_ms, _ = _timed_get(client, f"{status_url}?cursor={next_cursor}", repeat=20)
+        _append_entries(path, steps + 1, 100)
+        append_ms, response = _timed_get(client, f"{status_url}?cursor={next_cursor}")
+
+        result = {
+            "entries": steps * len(POLL_STEP_ENTRIES),
+            "first_poll_ms": round(first_ms, 3),
+            "full_poll_ms": round(full_ms, 3),
+            "incremental_poll_ms": round(tail_ms, 3),
+            "poll_after_append_ms": round(append_ms, 3),
+            "appended_entries_returned": len(response.get_json()["log_entries"]),
+            "full_response_kb": round(full_bytes / 1024, 1),
+        }
+        results.append(result)
+        print(f"{result['entries']:>9} {first_ms:>9.2f} {full_ms:>9.2f} {tail_ms:>8.3f} {append_ms:>8.2f} "
+              f"{result['full_response_kb']:>8.0f}")
+    return results
+
+
+def _wait_for_jobs(job_store, job_ids, timeout):
+    from src.job_store import FINISHED_STATUSES
+
+    deadline = time.perf_counter() + timeout
+    pending = set(job_ids)
+    while pending and time.perf_counter() < deadline:
+        pending = {job_id for job_id in pending
+                   if (job_store.get(job_id) or {}).get("status") not in FINISHED_STATUSES}
+        time.sleep(0.05)
+    return len(job_ids) - len(pending)
+
+
+def bench_start(args, app_module):
+    results = []
+    print(f"{'clients':>8} {'req/sec':>9} {'p50 ms':>8} {'p99 ms':>8} {'accepted':>9} {'429':>5} {'drain s':>8}")
+    for clients in args.clients:
+        latencies = []
+        statuses = []
+        job_ids = []
+        lock = threading.Lock()
+
+        def client_loop(requests):
+            client = app_module.app.test_client()
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.post("/start-campaign", json={"mode": "demo", "clock": "virtual"})
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses.append(response.status_code)
+                    if response.status_code == 200:
+                        job_ids.append(response.get_json()["job_id"])
+
+        per_client = max(1, args.requests // clients)
+        threads = [threading.Thread(target=client_loop, args=(per_client,)) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        drain_started = time.perf_counter()
+        finished = _wait_for_jobs(app_module.job_store, job_ids, timeout=120)
+
+        result = {
+            "clients": clients,
+            "requests": len(statuses),
+            "requests_per_sec": round(len(statuses) / elapsed, 1),
+            "latency_ms": _percentiles_ms(latencies),
+            "accepted": statuses.count(200),
+            "rejected_429": statuses.count(429),
+            "errors": len(statuses) - statuses.count(200) - statuses.count(429),
+            "jobs_finished": finished,
+            "drain_seconds": round(time.perf_counter() - drain_started, 3),
+        }
+        results.append(result)
+        print(f"{clients:>8} {result['requests_per_sec']:>9.1f} {result['latency_ms']['p50']:>8.2f} "
+              f"{result['latency_ms']['p99']:>8.2f} {result['accepted']:>9} {result['rejected_429']:>5} "
+              f"{result['drain_seconds']:>8.2f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", nargs="+", choices=["jobs", "poll", "start"], default=["jobs", "poll", "start"])
+    parser.add_argument("--rows", type=int, default=8000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rules", action="store_true", help="Decide clear-cut rows with the rules engine")
+    parser.add_argument("--latency", type=float, default=0.05, help="Median fake model latency (seconds)")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="Lognormal sigma; 0 for fixed latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformation-rate", type=float, default=0.0)
+    parser.add_argument("--poll-lengths", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="/start-campaign requests per client count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="A previous --output file to compare against")
+    args = parser.parse_args()
+
+    model_options = {"latency": args.latency, "latency_spread": args.latency_spread, "error_rate": args.error_rate,
+                     "malformation_rate": args.malformation_rate, "seed": args.seed}
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        }
+    }
+    output_path = os.path.abspath(args.output) if args.output else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    # The app's relative paths (logs/ and ../data/) resolve inside a scratch tree
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "backend", "logs"))
+    os.chdir(os.path.join(workdir, "backend"))
+    dataset_path = os.path.join(workdir, "data", "digital_marketing_campaign_dataset.csv")
+    make_synthetic_dataset(args.rows, seed=args.seed).to_csv(dataset_path, index=False)
+
+    if "jobs" in args.sections:
+        print("jobs")
+        results["jobs"] = bench_jobs(args, dataset_path, model_options)
+    if "poll" in args.sections or "start" in args.sections:
+        import app as app_module
+        from src import gemini_service
+
+        # Jobs started through the API use the fake model as the shared service
+        gemini_service._shared_service = make_fake_service(max_concurrency=args.concurrency, **model_options)
+        if "poll" in args.sections:
+            print("\npoll")
+            results["poll"] = bench_poll(args, app_module)
+        if "start" in args.sections:
+            print("\nstart")
+            results["start"] = bench_start(args, app_module)
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output_path}")
+    if compare_path:
+        with open(compare_path) as f:
+            compare(json.load(f), results, ("jobs", "poll", "start"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Observation building: the original iterrows loop vs the columnar builder.
+
+    python -m benchmarks.bench_observation_builder --rows 8000 1000000 10000000
+
+"build" is the time to construct the simulator's observation source;
+"all records" additionally materializes every Observation record. The legacy
+path is skipped above --legacy-max-rows, where it would run for many minutes.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from src.ad_simulator import AdCampaignSimulator
+from .synthetic_data import make_synthetic_dataset
+
+
+def legacy_process_data(data):
+    """The original AdCampaignSimulator._process_data, kept for comparison."""
+    processed = []
+    base_date = datetime(2024, 10, 19)
+
+    for idx, row in data.iterrows():
+        observation = {
+            "date": (base_date + timedelta(hours=idx)).strftime("%Y-%m-%d %H:%M:%S"),
+            "campaign_id": f"CAMP_{row['CustomerID']}",
+            "ad_spend": round(row['AdSpend'], 2),
+            "click_through_rate": round(row['ClickThroughRate'], 4),
+            "conversion_rate": round(row['ConversionRate'], 4),
+            "website_visits": int(row['WebsiteVisits']),
+            "pages_per_visit": round(row['PagesPerVisit'], 2),
+            "time_on_site": round(row['TimeOnSite'], 2),
+            "social_shares": int(row['SocialShares']),
+            "email_opens": int(row['EmailOpens']),
+            "email_clicks": int(row['EmailClicks']),
+            "conversions": int(row['Conversion']),
+            "campaign_channel": row['CampaignChannel'],
+            "campaign_type": row['CampaignType'],
+            "advertising_platform": row['AdvertisingPlatform'],
+            "customer_age": int(row['Age']),
+            "customer_gender": row['Gender'],
+            "customer_income": int(row['Income']),
+            "previous_purchases": int(row['PreviousPurchases']),
+            "loyalty_points": int(row['LoyaltyPoints'])
+        }
+        observation["cost_per_click"] = round(observation["ad_spend"] / max(observation["website_visits"], 1), 2)
+        observation["cost_per_conversion"] = round(observation["ad_spend"] / max(observation["conversions"], 1), 2) if observation["conversions"] > 0 else None
+        observation["roi"] = round((observation["conversions"] * 50 - observation["ad_spend"]) / observation["ad_spend"] * 100, 2)
+        processed.append(observation)
+
+    return processed
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[8000, 1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy':>10} {'build':>10} {'all records':>11} {'speedup':>8}")
+    for rows in args.rows:
+        data = make_synthetic_dataset(rows)
+
+        build_seconds, simulator = timed(lambda: AdCampaignSimulator(None, demo_rows=None, data=data))
+        records_seconds, _ = timed(lambda: sum(1 for _ in simulator.iter_observations()))
+
+        if rows <= args.legacy_max_rows:
+            legacy_seconds, _ = timed(lambda: legacy_process_data(data))
+            legacy = f"{legacy_seconds:>9.2f}s"
+            speedup = f"{legacy_seconds / (build_seconds + records_seconds):>7.1f}x"
+        else:
+            legacy, speedup = f"{'skipped':>10}", f"{'-':>8}"
+
+        print(f"{rows:>10} {legacy} {build_seconds:>9.2f}s {build_seconds + records_seconds:>10.2f}s {speedup}")
+
+
+if __name__ == "__main__":
+    main()
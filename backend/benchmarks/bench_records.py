@@ -0,0 +1,120 @@
+"""
+Memory and speed of the per-row records: Observation and LogEntry slots
+records vs the plain dicts they replaced.
+
+    python -m benchmarks.bench_records --rows 100000
+
+observation  bytes per row held by a list of observations, values included,
+             and rows/sec to build them
+step entries bytes per row for the seven log entries of an AI-decided step
+             (OBSERVE, 3x ORIENT, DECIDE, 2x ACT) with their observation
+serialize    entries/sec turned into JSONL by the log sink's serializer
+
+Memory comes from tracemalloc, so it counts Python allocations only.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src.ad_simulator import AdCampaignSimulator
+from src.log_sink import JsonlLogSink
+from src.records import LogEntry
+from .synthetic_data import make_synthetic_dataset
+
+DECISION = {
+    "tool_name": "continue_monitoring",
+    "parameters": {},
+    "expected_outcome": "Maintain current strategy"
+}
+AI_RESPONSE = {"reasoning": "Performance is within targets.", "confidence": 0.8, "action": DECISION}
+ACTION_RESULT = {"tool_executed": "continue_monitoring", "result": "Monitoring continues."}
+
+
+def step_entries(step_number, observation):
+    """The log entries of one AI-decided step, as the agent writes them."""
+    return [
+        LogEntry(step="OBSERVE", step_number=step_number, sub_step="data_received",
+                 message=f"Receiving campaign data for step {step_number}", data=observation),
+        LogEntry(step="ORIENT", step_number=step_number, sub_step="prompt_constructed",
+                 message="Analyzing data and preparing query for AI reasoning engine", prompt="..."),
+        LogEntry(step="ORIENT", step_number=step_number, sub_step="consulting_ai",
+                 message="Consulting Gemini AI for strategic analysis..."),
+        LogEntry(step="ORIENT", step_number=step_number, sub_step="ai_response_received",
+                 message="AI analysis complete", cached=False, repaired=False, tokens=None, ai_response=AI_RESPONSE),
+        LogEntry(step="DECIDE", step_number=step_number, message="Decision made: continue_monitoring",
+                 decision=DECISION, reasoning=AI_RESPONSE["reasoning"], confidence=0.8),
+        LogEntry(step="ACT", step_number=step_number, sub_step="executing",
+                 message="Executing action: continue_monitoring"),
+        LogEntry(step="ACT", step_number=step_number, sub_step="completed", message="Action executed successfully",
+                 action_taken=DECISION, result=ACTION_RESULT),
+    ]
+
+
+def as_dicts(entries):
+    """The same entries as plain dicts (with a dict observation), as before the records."""
+    dicts = []
+    for entry in entries:
+        entry = entry.to_dict()
+        if "data" in entry:
+            entry["data"] = entry["data"].to_dict()
+        dicts.append(entry)
+    return dicts
+
+
+def traced_bytes(build):
+    """Bytes still allocated after build() returns (its result is kept alive), and the result."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    rows = args.rows
+
+    simulator = AdCampaignSimulator(None, demo_rows=None, data=make_synthetic_dataset(rows))
+    seconds, records = timed(lambda: list(simulator.iter_observations()))
+    print(f"{'':<14} {'records':>12} {'dicts':>12} {'saved':>7}")
+
+    # Each dict is built from a record that is dropped right away, so both sides hold the same values
+    record_bytes, _ = traced_bytes(lambda: list(simulator.iter_observations()))
+    dict_seconds, _ = timed(lambda: [observation.to_dict() for observation in records])
+    dict_bytes, dicts = traced_bytes(lambda: [observation.to_dict() for observation in simulator.iter_observations()])
+    del dicts
+    print(f"{'observation':<14} {record_bytes / rows:>10.0f} B {dict_bytes / rows:>10.0f} B "
+          f"{1 - record_bytes / dict_bytes:>6.0%}")
+    print(f"{'  rows/sec':<14} {rows / seconds:>12,.0f} {rows / (seconds + dict_seconds):>12,.0f}")
+
+    entry_record_bytes, entries = traced_bytes(
+        lambda: [entry for step_number, observation in enumerate(simulator.iter_observations(), start=1)
+                 for entry in step_entries(step_number, observation)])
+    entry_dict_bytes, entry_dicts = traced_bytes(lambda: as_dicts(
+        entry for step_number, observation in enumerate(simulator.iter_observations(), start=1)
+        for entry in step_entries(step_number, observation)))
+    print(f"{'step entries':<14} {entry_record_bytes / rows:>10.0f} B {entry_dict_bytes / rows:>10.0f} B "
+          f"{1 - entry_record_bytes / entry_dict_bytes:>6.0%}")
+
+    dumps = JsonlLogSink("/dev/null")._dumps
+    record_seconds, serialized = timed(lambda: [dumps(entry) for entry in entries])
+    dict_seconds, serialized_dicts = timed(lambda: [dumps(entry) for entry in entry_dicts])
+    assert serialized == serialized_dicts, "records must serialize exactly like the dicts"
+    print(f"{'serialize/sec':<14} {len(entries) / record_seconds:>12,.0f} {len(entries) / dict_seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Response parsing: the original fence-slicing parser vs src.response_parser.
+
+    python -m benchmarks.bench_response_parser --fuzz 5000
+
+Runs the hand-written corpus case by case (a case passes when the expected
+tool is recovered, or when an unusable response is rejected), then a fuzzed
+corpus for recovery rate and parse time.
+"""
+import argparse
+import json
+import time
+
+from src.response_parser import ResponseParseError, parse_decision
+from .response_corpus import CORPUS, fuzz_responses
+
+
+def legacy_parse(response_str):
+    """The original AdForgeAgent._parse_ai_json plus the checks the agent relied on."""
+    if "```json" in response_str:
+        json_start = response_str.find("```json") + 7
+        json_end = response_str.find("```", json_start)
+        response_str = response_str[json_start:json_end].strip()
+    decision = json.loads(response_str)
+    return decision["action"]["tool_name"]
+
+
+def new_parse(response_str):
+    return parse_decision(response_str)[0]["action"]["tool_name"]
+
+
+def outcome(parse, text, expected):
+    try:
+        tool = parse(text)
+    except (ResponseParseError, ValueError, KeyError, TypeError):
+        tool = None
+    return tool == expected
+
+
+def timed_rate(parse, cases):
+    started = time.perf_counter()
+    recovered = sum(outcome(parse, text, expected) for _, text, expected in cases)
+    return recovered / len(cases), (time.perf_counter() - started) / len(cases) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fuzz", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'case':<20} {'legacy':>7} {'new':>5}")
+    for name, text, expected in CORPUS:
+        legacy = "ok" if outcome(legacy_parse, text, expected) else "FAIL"
+        new = "ok" if outcome(new_parse, text, expected) else "FAIL"
+        print(f"{name:<20} {legacy:>7} {new:>5}")
+
+    fuzzed = fuzz_responses(args.fuzz, seed=args.seed)
+    print(f"\n{'parser':<8} {'corpus':>8} {'fuzzed':>8} {'us/parse':>9}")
+    for label, parse in (("legacy", legacy_parse), ("new", new_parse)):
+        corpus_rate, _ = timed_rate(parse, CORPUS)
+        fuzz_rate, micros = timed_rate(parse, fuzzed)
+        print(f"{label:<8} {corpus_rate:>7.0%} {fuzz_rate:>8.1%} {micros:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
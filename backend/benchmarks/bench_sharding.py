@@ -0,0 +1,54 @@
+"""
+Production runs split across worker processes, against a local fake model.
+
+    python -m benchmarks.bench_sharding --rows 40000 --workers 1 2 4 8
+
+With the default zero model latency the run is CPU-bound (observation
+building, prompt construction, JSON parsing and logging), which is the part
+sharding spreads across cores. "1" runs in-process, as an unsharded job
+does; worker start-up (spawning and importing) is included in every timing.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from functools import partial
+
+from src.adforge_agent import AdForgeAgent
+from .fake_gemini import make_fake_service
+from .synthetic_data import make_synthetic_dataset
+
+
+def run_campaign(dataset_path, workers, latency):
+    factory = partial(make_fake_service, latency=latency)
+    agent = AdForgeAgent(f"bench-sharding-{workers}", factory(), mode="production",
+                         shards=workers, shard_service_factory=factory)
+    started = time.perf_counter()
+    summary = asyncio.run(agent.run_intelligent_campaign(dataset_path))
+    return time.perf_counter() - started, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=40_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-sharding-")
+    os.chdir(workdir)  # Job logs go to ./logs
+    dataset_path = os.path.join(workdir, "dataset.csv")
+    make_synthetic_dataset(args.rows).to_csv(dataset_path, index=False)
+
+    print(f"{'workers':>8} {'seconds':>9} {'rows/sec':>10} {'speedup':>8} {'steps':>8}")
+    baseline = None
+    for workers in args.workers:
+        elapsed, summary = run_campaign(dataset_path, workers, args.latency)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>8.2f}s {args.rows / elapsed:>10.0f} {baseline / elapsed:>7.2f}x "
+              f"{summary['current_step']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Process start-up cost of the web backend, from `python -X importtime`.
+
+    python -m benchmarks.bench_startup --repeat 5 --output startup.json
+    python -m benchmarks.bench_startup --compare startup.json --budget-ms 400
+
+app      `import app` in a fresh interpreter: total import time, the slowest
+         direct imports, and whether any deferred module (pandas, numpy, the
+         Gemini SDK) was loaded anyway
+health   a fresh interpreter importing the app and answering one /health
+         request (wall clock, interpreter start-up included)
+deferred import time of the modules the app loads on first use, which the
+         warm-up (src/warmup.py) preloads in the background
+
+Each figure is the median over --repeat runs. The exit status is 1 when a
+deferred module is imported with the app, or the app import exceeds
+--budget-ms, so the benchmark can guard against start-up regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from .results import compare
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Must not be imported by `import app`
+DEFERRED_MODULES = ("pandas", "numpy", "google.generativeai")
+
+HEALTH_SCRIPT = """
+import app
+response = app.app.test_client().get("/health")
+assert response.status_code == 200, response.status_code
+"""
+DEFERRED_SCRIPT = """
+import importlib, json, time
+import app
+from src.warmup import HEAVY_MODULES
+timings = {}
+for name in HEAVY_MODULES:
+    started = time.perf_counter()
+    importlib.import_module(name)
+    timings[name] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def run_importtime(code):
+    """
+    Runs `code` in a fresh interpreter; returns wall seconds, its stdout and
+    (self_us, cumulative_us, depth, module) rows.
+    """
+    # The warm-up would start with the /health request; it is timed under "deferred"
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1", "AGENT_WARMUP": "0"}
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"Start-up run failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return wall, proc.stdout, rows
+
+
+def bench_app(repeat, top):
+    totals, walls = [], []
+    for _ in range(repeat):
+        wall, _, rows = run_importtime("import app")
+        walls.append(wall)
+        totals.append(next(cumulative for _, cumulative, depth, name in rows if depth == 0 and name == "app"))
+    # The slowest direct imports of the app module, from the last run
+    direct = sorted(((cumulative, name) for _, cumulative, depth, name in rows if depth == 1), reverse=True)
+    loaded = sorted({name for *_, name in rows} & set(DEFERRED_MODULES))
+
+    result = {
+        "import_ms": round(statistics.median(totals) / 1000, 1),
+        "process_ms": round(statistics.median(walls) * 1000, 1),
+        "modules": len(rows),
+        "slowest": [{"module": name, "ms": round(cumulative / 1000, 1)} for cumulative, name in direct[:top]],
+        "deferred_modules_loaded": loaded
+    }
+    print(f"  import app {result['import_ms']:>8.1f} ms   process {result['process_ms']:>8.1f} ms   "
+          f"{result['modules']} modules")
+    for item in result["slowest"]:
+        print(f"    {item['module']:<40} {item['ms']:>8.1f} ms")
+    if loaded:
+        print(f"  deferred modules imported with the app: {', '.join(loaded)}")
+    return result
+
+
+def bench_health(repeat):
+    walls = [run_importtime(HEALTH_SCRIPT)[0] for _ in range(repeat)]
+    result = {"process_ms": round(statistics.median(walls) * 1000, 1)}
+    print(f"  start + /health {result['process_ms']:>8.1f} ms")
+    return result
+
+
+def bench_deferred(repeat):
+    from src.warmup import HEAVY_MODULES
+
+    # Each module is timed after the ones before it, so shared dependencies
+    # count toward the first module that needs them
+    runs = [json.loads(run_importtime(DEFERRED_SCRIPT)[1]) for _ in range(repeat)]
+    result = {}
+    for name in HEAVY_MODULES:
+        result[name] = round(statistics.median(run[name] for run in runs) * 1000, 1)
+        print(f"  {name:<40} {result[name]:>8.1f} ms")
+    result["total"] = round(sum(result.values()), 1)
+    print(f"  {'total':<40} {result['total']:>8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", nargs="+", choices=["app", "health", "deferred"],
+                        default=["app", "health", "deferred"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of the app to list")
+    parser.add_argument("--budget-ms", type=float, help="Fail when `import app` takes longer than this")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="A previous --output file to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        }
+    }
+    if "app" in args.sections:
+        print("app")
+        results["app"] = bench_app(args.repeat, args.top)
+    if "health" in args.sections:
+        print("\nhealth")
+        results["health"] = bench_health(args.repeat)
+    if "deferred" in args.sections:
+        print("\ndeferred")
+        results["deferred"] = bench_deferred(args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results, ("app", "health", "deferred"))
+
+    app_result = results.get("app")
+    if app_result:
+        failures = []
+        if app_result["deferred_modules_loaded"]:
+            failures.append(f"deferred modules imported with the app: {app_result['deferred_modules_loaded']}")
+        if args.budget_ms is not None and app_result["import_ms"] > args.budget_ms:
+            failures.append(f"import app took {app_result['import_ms']} ms, budget {args.budget_ms} ms")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import math
+import random
+import threading
+import time
+
+from src.gemini_service import GeminiService
+
+FAKE_RESPONSE = '''```json
+{
+  "reasoning": "Fake model response for offline benchmarking.",
+  "confidence": 0.75,
+  "action": {
+    "tool_name": "continue_monitoring",
+    "parameters": {},
+    "expected_outcome": "No change"
+  }
+}```'''
+
+BATCH_TABLE_MARKER = "campaigns) ---\n"
+
+# How a malformed response is mangled; "unusable" carries no decision at all
+MALFORMATIONS = ("prose", "trailing_comma", "comment", "truncated", "unusable")
+
+
+class FakeAPIError(Exception):
+    """Mimics google.api_core errors, which expose the HTTP status as `code`."""
+
+    def __init__(self, code):
+        super().__init__(f"Fake API error {code}")
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel.
+    Sleeps per call like a network round trip (releasing the GIL): `latency`
+    seconds, or a lognormal draw with that median when `latency_spread`
+    (sigma) is set. Fails with `error_code` for a fraction `error_rate` of
+    calls and mangles a fraction `malformation_rate` of responses (see
+    MALFORMATIONS). Batch prompts get one decision per campaign_id in their
+    table, as a JSON array.
+    """
+
+    def __init__(self, latency=0.05, error_rate=0.0, error_code=429, response_text=FAKE_RESPONSE, seed=None,
+                 latency_spread=0.0, malformation_rate=0.0):
+        self.latency = latency
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.malformation_rate = malformation_rate
+        self.response_text = response_text
+        self.calls = 0
+        self.malformed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+            malformation = None
+            if self._random.random() < self.malformation_rate:
+                malformation = self._random.choice(MALFORMATIONS)
+                self.malformed += 1
+            delay = self.latency
+            if self.latency_spread and delay > 0:
+                delay = self._random.lognormvariate(math.log(delay), self.latency_spread)
+        time.sleep(delay)
+        if fail:
+            raise FakeAPIError(self.error_code)
+        text = self._batch_response(prompt) if BATCH_TABLE_MARKER in prompt else self.response_text
+        return FakeResponse(_malform(text, malformation) if malformation else text)
+
+    def _batch_response(self, prompt):
+        table = prompt.split(BATCH_TABLE_MARKER, 1)[1].split("\n--- END OF DATA", 1)[0].split("\n")
+        id_column = table[0].split("|").index("campaign_id")
+        decision = json.loads(self.response_text.strip("`").removeprefix("json"))
+        return json.dumps([{"campaign_id": row.split("|")[id_column], **decision} for row in table[1:]])
+
+
+def _malform(text, kind):
+    if kind == "prose":
+        return f"Here is my analysis:\n{text}\nLet me know if you need more."
+    if kind == "trailing_comma":
+        return text.replace("}", ",}", 1)
+    if kind == "comment":
+        return text.replace('"reasoning"', '// fake remark\n"reasoning"', 1)
+    if kind == "truncated":
+        return text[:len(text) - 12]
+    return "I cannot decide without more data."
+
+
+def make_fake_service(latency=0.05, max_concurrency=16, **model_options):
+    """A GeminiService on a FakeGenerativeModel (picklable via functools.partial)."""
+    return GeminiService(model=FakeGenerativeModel(latency=latency, **model_options), max_concurrency=max_concurrency)
@@ -0,0 +1,80 @@
+"""
+Model responses seen (or plausible) in the wild, for parser tests and benchmarks.
+
+Each case is (name, response_text, expected_tool_name); expected None means
+the response holds no usable decision and must be rejected.
+"""
+import json
+import random
+
+VALID = {
+    "reasoning": "ROI is deeply negative and cost per conversion far above target.",
+    "confidence": 0.82,
+    "action": {
+        "tool_name": "decrease_budget",
+        "parameters": {"amount": "25%"},
+        "expected_outcome": "Lower losses while targeting is reviewed"
+    }
+}
+VALID_JSON = json.dumps(VALID, indent=2)
+
+CORPUS = [
+    ("bare", VALID_JSON, "decrease_budget"),
+    ("fenced", f"```json\n{VALID_JSON}\n```", "decrease_budget"),
+    ("fenced_no_lang", f"```\n{VALID_JSON}\n```", "decrease_budget"),
+    ("prose_around", f"Here is my analysis:\n{VALID_JSON}\nLet me know if you need more.", "decrease_budget"),
+    ("trailing_comment", VALID_JSON + "  // chosen conservatively", "decrease_budget"),
+    ("inline_comments", VALID_JSON.replace('"confidence": 0.82,', '"confidence": 0.82, // fairly sure'),
+     "decrease_budget"),
+    ("block_comment", "/* decision */ " + VALID_JSON, "decrease_budget"),
+    ("trailing_commas", VALID_JSON.replace('"25%"\n', '"25%",\n').replace('reviewed"\n', 'reviewed",\n'),
+     "decrease_budget"),
+    ("python_literals", json.dumps({**VALID, "action": {**VALID["action"], "parameters": {"urgent": True}}})
+     .replace("true", "True"), "decrease_budget"),
+    ("literals_in_strings", VALID_JSON.replace(VALID["reasoning"], "None of the signals are True positives")
+     .replace('"25%"\n', '"25%",\n'), "decrease_budget"),
+    ("braces_in_strings", json.dumps({**VALID, "reasoning": "Spend {high} vs [low] } ]"}), "decrease_budget"),
+    ("truncated", VALID_JSON[:-40], "decrease_budget"),
+    ("tool_spelling", VALID_JSON.replace("decrease_budget", "Decrease Budget"), "decrease_budget"),
+    ("action_as_string", json.dumps({"reasoning": "r", "confidence": 0.7, "action": "pause_campaign"}),
+     "pause_campaign"),
+    ("flat_tool_name", json.dumps({"reasoning": "r", "tool_name": "optimize_targeting", "parameters": {}}),
+     "optimize_targeting"),
+    ("percent_confidence", VALID_JSON.replace("0.82", '"82%"'), "decrease_budget"),
+    ("missing_parameters", json.dumps({"reasoning": "r", "confidence": 0.6,
+                                       "action": {"tool_name": "continue_monitoring"}}), "continue_monitoring"),
+    ("two_objects", VALID_JSON + "\n" + VALID_JSON.replace("decrease_budget", "pause_campaign"), "decrease_budget"),
+    ("wrapped_in_array", f"[{VALID_JSON}]", "decrease_budget"),
+    ("unknown_tool", VALID_JSON.replace("decrease_budget", "launch_rocket"), None),
+    ("no_action", json.dumps({"reasoning": "r", "confidence": 0.5}), None),
+    ("no_json", "I cannot decide without more data.", None),
+    ("empty", "", None),
+]
+
+
+def fuzz_responses(count, seed=0):
+    """
+    `count` random corruptions of the valid response (fences, prose,
+    comments, trailing commas, truncation), each paired with the tool the
+    parser should still recover.
+    """
+    rng = random.Random(seed)
+    tools = ["increase_budget", "decrease_budget", "pause_campaign", "optimize_targeting",
+             "continue_monitoring", "request_human_input"]
+    cases = []
+    for i in range(count):
+        tool = rng.choice(tools)
+        text = json.dumps({**VALID, "action": {**VALID["action"], "tool_name": tool}},
+                          indent=rng.choice([None, 2]))
+        if rng.random() < 0.3:
+            text = text.replace("}", ",}", 1)
+        if rng.random() < 0.3:
+            text = text.replace('"confidence"', '// note\n"confidence"', 1)
+        if rng.random() < 0.2:
+            text = text[:rng.randint(len(text) - 30, len(text) - 1)]  # Cut off inside the closing part
+        if rng.random() < 0.5:
+            text = f"```json\n{text}\n```"
+        if rng.random() < 0.3:
+            text = "Analysis follows.\n" + text + "\nThanks!"
+        cases.append((f"fuzz_{i}", text, tool))
+    return cases
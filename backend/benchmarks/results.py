@@ -0,0 +1,24 @@
+"""Comparing a benchmark's --output JSON files, for the --compare option."""
+
+
+def flatten(value, prefix=""):
+    """(dotted.path, number) for every numeric leaf of a result."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from flatten(item, f"{prefix}[{index}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(baseline, current, sections):
+    """Prints every numeric result of `sections` present in both runs, with current/baseline."""
+    old = dict(flatten({key: baseline.get(key) for key in sections}))
+    new = dict(flatten({key: current.get(key) for key in sections}))
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key, value in new.items():
+        if key in old:
+            ratio = f"{value / old[key]:.2f}x" if old[key] else "-"
+            print(f"{key:<45} {old[key]:>12} {value:>12} {ratio:>7}")
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+CHANNELS = ["Email", "PPC", "Referral", "SEO", "Social Media"]
+CAMPAIGN_TYPES = ["Awareness", "Consideration", "Conversion", "Retention"]
+GENDERS = ["Female", "Male"]
+
+
+def make_synthetic_dataset(rows, seed=0):
+    """
+    A DataFrame with the schema and value ranges of
+    data/digital_marketing_campaign_dataset.csv, at any size.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "CustomerID": np.arange(8000, 8000 + rows),
+        "Age": rng.integers(18, 70, rows),
+        "Gender": rng.choice(GENDERS, rows),
+        "Income": rng.integers(20000, 150000, rows),
+        "CampaignChannel": rng.choice(CHANNELS, rows),
+        "CampaignType": rng.choice(CAMPAIGN_TYPES, rows),
+        "AdSpend": rng.uniform(100, 10000, rows),
+        "ClickThroughRate": rng.uniform(0.01, 0.3, rows),
+        "ConversionRate": rng.uniform(0.01, 0.2, rows),
+        "WebsiteVisits": rng.integers(0, 50, rows),
+        "PagesPerVisit": rng.uniform(1, 10, rows),
+        "TimeOnSite": rng.uniform(0.5, 15, rows),
+        "SocialShares": rng.integers(0, 100, rows),
+        "EmailOpens": rng.integers(0, 20, rows),
+        "EmailClicks": rng.integers(0, 10, rows),
+        "PreviousPurchases": rng.integers(0, 10, rows),
+        "LoyaltyPoints": rng.integers(0, 5000, rows),
+        "AdvertisingPlatform": "IsConfid",
+        "AdvertisingTool": "ToolConfid",
+        "Conversion": (rng.random(rows) < 0.88).astype("int64"),
+    })
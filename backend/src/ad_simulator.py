@@ -1,62 +1,140 @@
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime, timedelta
+from .dataset_registry import get_dataset_registry
+from .metrics import get_metrics
+from .records import OBSERVATION_FIELDS, Observation
+
+# Observations are materialized as records this many rows at a time
+OBSERVATION_CHUNK_ROWS = 4096
+# Rows read from disk at a time by the streaming simulator
+STREAM_CHUNK_ROWS = 50_000
+# Assumed revenue per conversion for ROI
+CONVERSION_VALUE = 50
+
+# Observation field -> (CSV column, coercion); the field order of an
+# observation is OBSERVATION_FIELDS (see src/records.py).
+# The coercion is `int`, `str` (passed through) or a number of decimals.
+FIELD_SOURCES = {
+    "ad_spend": ("AdSpend", 2),
+    "click_through_rate": ("ClickThroughRate", 4),
+    "conversion_rate": ("ConversionRate", 4),
+    "website_visits": ("WebsiteVisits", int),
+    "pages_per_visit": ("PagesPerVisit", 2),
+    "time_on_site": ("TimeOnSite", 2),
+    "social_shares": ("SocialShares", int),
+    "email_opens": ("EmailOpens", int),
+    "email_clicks": ("EmailClicks", int),
+    "conversions": ("Conversion", int),
+    "campaign_channel": ("CampaignChannel", str),
+    "campaign_type": ("CampaignType", str),
+    "advertising_platform": ("AdvertisingPlatform", str),
+    "customer_age": ("Age", int),
+    "customer_gender": ("Gender", str),
+    "customer_income": ("Income", int),
+    "previous_purchases": ("PreviousPurchases", int),
+    "loyalty_points": ("LoyaltyPoints", int),
+}
+DERIVED_FIELDS = ("cost_per_click", "cost_per_conversion", "roi")
+
+def _round(values, decimals):
+    """
+    Column-wise round() that agrees with Python's built-in round().
+    NumPy rounds the scaled binary value, which differs from round() when the
+    value is within float error of a tie; those few elements use round().
+    """
+    rounded = values.round(decimals)
+    scaled = values * 10 ** decimals
+    near_tie = (scaled - np.floor(scaled) - 0.5).abs() < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, decimals) for value in values[near_tie]]
+    return rounded
+
+
+def build_observation_frame(data):
+    """
+    Convert raw dataset rows into campaign-style observations.
+    
+    All type coercions and derived metrics are computed column-wise; the
+    result is a columnar frame whose rows are turned into Observation records
+    lazily (see `iter_observation_records`).
+    """
+    columns = {
+        # Hour offset of each row from base_date, formatted on demand
+        "hour": data.index.to_numpy(),
+        "customer_id": data["CustomerID"].to_numpy(),
+    }
+    for field, (source, coercion) in FIELD_SOURCES.items():
+        if coercion is int:
+            columns[field] = data[source].astype("int64").to_numpy()
+        elif coercion is str:
+            columns[field] = data[source].array  # Keeps categoricals compact
+        else:
+            columns[field] = _round(data[source].astype("float64"), coercion).to_numpy()
+    
+    frame = pd.DataFrame(columns)
+    
+    # Calculate some derived metrics
+    ad_spend = frame["ad_spend"]
+    conversions = frame["conversions"]
+    frame["cost_per_click"] = _round(ad_spend / frame["website_visits"].clip(lower=1), 2)
+    frame["cost_per_conversion"] = _round(ad_spend / conversions.clip(lower=1), 2).where(conversions > 0)
+    frame["roi"] = _round((conversions * CONVERSION_VALUE - ad_spend) / ad_spend * 100, 2)  # Assuming $50 per conversion
+    
+    return frame
+
+
+def iter_observation_records(frame):
+    """Yield Observation records for the rows of an observation frame, a chunk at a time."""
+    base_date = datetime(2024, 10, 19)  # Start from today
+    value_fields = OBSERVATION_FIELDS[2:]
+    
+    for chunk_start in range(0, len(frame), OBSERVATION_CHUNK_ROWS):
+        chunk = frame.iloc[chunk_start:chunk_start + OBSERVATION_CHUNK_ROWS]
+        hours = chunk["hour"].tolist()
+        customer_ids = chunk["customer_id"].tolist()
+        value_columns = [chunk[field].tolist() for field in value_fields]
+        
+        for hour, customer_id, values in zip(hours, customer_ids, zip(*value_columns)):
+            observation = Observation((base_date + timedelta(hours=hour)).strftime("%Y-%m-%d %H:%M:%S"),
+                                      f"CAMP_{customer_id}", *values)
+            if observation.cost_per_conversion != observation.cost_per_conversion:  # NaN: no conversions
+                observation.cost_per_conversion = None
+            yield observation
+
 
 class AdCampaignSimulator:
-    def __init__(self, dataset_path, demo_rows=3):
+    def __init__(self, dataset_path, demo_rows=3, data=None, row_range=None):
         """
         Initialize the simulator with the dataset.
-        For demo purposes, we'll only use the first few rows.
+        For demo purposes, we'll only use the first few rows;
+        pass demo_rows=None to simulate the full dataset.
+        An already loaded DataFrame can be passed as `data` instead of a path.
+        `row_range=(start, stop)` restricts the run to those rows (one shard).
         """
-        # Load the entire dataset
-        full_data = pd.read_csv(dataset_path)
+        # The dataset is parsed once per process and shared (read-only)
+        full_data = data if data is not None else get_dataset_registry().load(dataset_path)
         
-        # For demo, only use first N rows
-        self.data = full_data.head(demo_rows)
-        self.current_step = 0
+        # For demo, only use first N rows (a slice, not a copy)
+        self.data = full_data.iloc[:demo_rows] if demo_rows is not None else full_data
+        if row_range is not None:
+            self.data = self.data.iloc[row_range[0]:row_range[1]]
         self.total_steps = len(self.data)
         
         # Convert the data to a more campaign-friendly format
-        self.processed_data = self._process_data()
+        self.observations = self._process_data()
+        self.total_budget = float(self.observations["ad_spend"].sum())
+        self.reset()
         
     def _process_data(self):
-        """Convert the raw data into campaign-style observations"""
-        processed = []
-        base_date = datetime(2024, 10, 19)  # Start from today
-        
-        for idx, row in self.data.iterrows():
-            # Create a campaign observation from the CSV row
-            observation = {
-                "date": (base_date + timedelta(hours=idx)).strftime("%Y-%m-%d %H:%M:%S"),
-                "campaign_id": f"CAMP_{row['CustomerID']}",
-                "ad_spend": round(row['AdSpend'], 2),
-                "click_through_rate": round(row['ClickThroughRate'], 4),
-                "conversion_rate": round(row['ConversionRate'], 4),
-                "website_visits": int(row['WebsiteVisits']),
-                "pages_per_visit": round(row['PagesPerVisit'], 2),
-                "time_on_site": round(row['TimeOnSite'], 2),
-                "social_shares": int(row['SocialShares']),
-                "email_opens": int(row['EmailOpens']),
-                "email_clicks": int(row['EmailClicks']),
-                "conversions": int(row['Conversion']),
-                "campaign_channel": row['CampaignChannel'],
-                "campaign_type": row['CampaignType'],
-                "advertising_platform": row['AdvertisingPlatform'],
-                "customer_age": int(row['Age']),
-                "customer_gender": row['Gender'],
-                "customer_income": int(row['Income']),
-                "previous_purchases": int(row['PreviousPurchases']),
-                "loyalty_points": int(row['LoyaltyPoints'])
-            }
-            
-            # Calculate some derived metrics
-            observation["cost_per_click"] = round(observation["ad_spend"] / max(observation["website_visits"], 1), 2)
-            observation["cost_per_conversion"] = round(observation["ad_spend"] / max(observation["conversions"], 1), 2) if observation["conversions"] > 0 else None
-            observation["roi"] = round((observation["conversions"] * 50 - observation["ad_spend"]) / observation["ad_spend"] * 100, 2)  # Assuming $50 per conversion
-            
-            processed.append(observation)
-            
-        return processed
+        """Convert the raw data into a columnar frame of campaign-style observations"""
+        with get_metrics().span("adforge_dataset_seconds", stage="process_data"):
+            return build_observation_frame(self.data)
+    
+    def iter_observations(self, start=0):
+        """Yield Observation records from row `start` on."""
+        return iter_observation_records(self.observations.iloc[start:])
     
     def get_next_observation(self):
         """
@@ -67,27 +145,32 @@ class AdCampaignSimulator:
             return None  # The campaign is over
         
         # Get the data for the current time step
-        observation = self.processed_data[self.current_step]
+        if self._observation_iter is None:
+            self._observation_iter = self.iter_observations(self.current_step)
+        observation = next(self._observation_iter)
         self.current_step += 1
         
+        self.spent_budget += observation.ad_spend
+        self.total_conversions += observation.conversions
+        self.total_clicks += observation.website_visits
+        
         return observation
     
     def get_campaign_summary(self):
-        """Get overall campaign metrics"""
+        """Get overall campaign metrics (kept current by running totals)"""
         if self.current_step == 0:
             return {
-                "total_budget": sum(obs["ad_spend"] for obs in self.processed_data),
+                "total_budget": self.total_budget,
                 "total_steps": self.total_steps,
                 "current_step": 0,
                 "status": "READY"
             }
         
-        completed_observations = self.processed_data[:self.current_step]
         return {
-            "total_budget": sum(obs["ad_spend"] for obs in self.processed_data),
-            "spent_budget": sum(obs["ad_spend"] for obs in completed_observations),
-            "total_conversions": sum(obs["conversions"] for obs in completed_observations),
-            "total_clicks": sum(obs["website_visits"] for obs in completed_observations),
+            "total_budget": self.total_budget,
+            "spent_budget": self.spent_budget,
+            "total_conversions": self.total_conversions,
+            "total_clicks": self.total_clicks,
             "total_steps": self.total_steps,
             "current_step": self.current_step,
             "status": "RUNNING" if self.current_step < self.total_steps else "COMPLETE"
@@ -96,3 +179,67 @@ class AdCampaignSimulator:
     def reset(self):
         """Reset the simulator to the beginning"""
         self.current_step = 0
+        self.spent_budget = 0
+        self.total_conversions = 0
+        self.total_clicks = 0
+        self._observation_iter = None
+    
+    def seek(self, step, summary=None):
+        """
+        Continue from row `step` (a resumed run): earlier rows count as done,
+        with the running totals taken from `summary` (a checkpoint's).
+        """
+        if step > self.total_steps:
+            raise ValueError(f"Cannot resume at row {step}: the dataset has only {self.total_steps} rows")
+        self.reset()
+        self.current_step = step
+        summary = summary or {}
+        self.spent_budget = summary.get("spent_budget", 0)
+        self.total_conversions = summary.get("total_conversions", 0)
+        self.total_clicks = summary.get("total_clicks", 0)
+
+
+class StreamingAdCampaignSimulator(AdCampaignSimulator):
+    """
+    Simulator for datasets larger than memory.
+    
+    Rows are read `chunk_rows` at a time (from a valid Parquet sidecar when
+    one exists, otherwise from the CSV) and turned into observations chunk by
+    chunk, so memory stays bounded by the chunk size no matter how large the
+    file is. The total budget and step count come from one extra pass over
+    the AdSpend column only.
+    """
+    
+    def __init__(self, dataset_path, demo_rows=None, chunk_rows=STREAM_CHUNK_ROWS):
+        self.dataset_path = dataset_path
+        self.demo_rows = demo_rows
+        self.chunk_rows = chunk_rows
+        
+        total_steps = 0
+        total_budget = 0
+        for chunk in self._iter_chunks(columns=["AdSpend"]):
+            total_steps += len(chunk)
+            total_budget += float(_round(chunk["AdSpend"].astype("float64"), 2).sum())
+        self.total_steps = total_steps
+        self.total_budget = total_budget
+        self.reset()
+    
+    def _iter_chunks(self, columns=None):
+        """Raw dataset chunks, truncated to demo_rows if set."""
+        remaining = self.demo_rows
+        for chunk in get_dataset_registry().iter_chunks(self.dataset_path, self.chunk_rows, columns=columns):
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                chunk = chunk.iloc[:remaining]
+                remaining -= len(chunk)
+            yield chunk
+    
+    def iter_observations(self, start=0):
+        """Yield Observation records from row `start` on, reading the file chunk by chunk."""
+        for chunk in self._iter_chunks():
+            if chunk.index[-1] < start:
+                continue
+            if chunk.index[0] < start:
+                chunk = chunk.iloc[start - chunk.index[0]:]
+            yield from iter_observation_records(build_observation_frame(chunk))
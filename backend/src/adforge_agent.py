@@ -1,34 +1,40 @@
+import asyncio
+import cProfile
 import json
-import time
+import multiprocessing
 import os
-from datetime import datetime
-from .ad_simulator import AdCampaignSimulator
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from .ad_simulator import AdCampaignSimulator, StreamingAdCampaignSimulator
+from .checkpoint import DEFAULT_CHECKPOINT_ROWS, CampaignCheckpoint, checkpoint_path, load_checkpoint, truncate_log
+from .clock import PhaseLatency, make_clock
+from .log_sink import JsonlLogSink
+from .metrics import get_metrics
+from .portfolio import DecisionTally, portfolio_frame
+from .prompt_builder import PromptBuilder, TokenUsage
+from .records import LogEntry
+from .response_parser import ParseStats, ResponseParseError, parse_batch, parse_decision, validate_decision
+from .sharding import init_shard_worker, merge_summaries, run_shard, shard_job_id, shard_ranges
 
-class AdForgeAgent:
-    def __init__(self, job_id, gemini_service):
-        self.job_id = job_id
-        self.gemini_service = gemini_service
-        self.log_file_path = f"logs/{job_id}.jsonlog"
-        
-        # Ensure logs directory exists
-        os.makedirs("logs", exist_ok=True)
-        
-        # Clear any existing log file
-        if os.path.exists(self.log_file_path):
-            os.remove(self.log_file_path)
-    
-    def write_log_entry(self, entry_data):
-        """Appends a new JSON object to the job's log file."""
-        entry_data["timestamp"] = datetime.now().isoformat()
-        with open(self.log_file_path, "a") as f:
-            f.write(json.dumps(entry_data) + "\n")
-    
-    def construct_reasoning_prompt(self, observation):
-        """
-        Constructs a unique prompt for Gemini by combining a fixed meta-prompt
-        with live, real-time data.
-        """
-        meta_prompt = """
+# "demo" runs a few rows one at a time (paced for the live dashboard by
+# default); "production" runs the whole dataset as fast as Gemini allows.
+AGENT_MODES = ("demo", "production")
+DEFAULT_MAX_CONCURRENCY = 8
+# How many steps may be scheduled per in-flight Gemini slot before the
+# pipeline waits for the oldest step to be written out.
+PIPELINE_WINDOW_FACTOR = 4
+# Observations read ahead and scored by the rules engine in one go
+RULES_BLOCK_ROWS = 256
+# Cap on steps per pipeline unit (times batch_size) when rule-decided rows
+# pile up between escalations
+UNIT_MAX_STEPS = 64
+# Shard log lines copied between checks for cancellation
+SHARD_LOG_CANCEL_CHECK_LINES = 256
+
+# Role, tools and decision criteria shared by single and batched prompts
+AGENT_BRIEF = """
 You are AdForge, an expert AI marketing agent. Your sole objective is to maximize product sales by intelligently managing advertising campaigns.
 
 You have the following tools available:
@@ -45,7 +51,9 @@ DECISION CRITERIA:
 - Cost per conversion > $30: Needs optimization
 - Click-through rate < 2%: Poor targeting, needs optimization
 - High engagement but low conversions: Optimize landing page
+"""
 
+SINGLE_RESPONSE_FORMAT = """
 Analyze the campaign data below. Provide clear reasoning and choose the single best action.
 Your response MUST be valid JSON with this exact structure:
 {
@@ -58,21 +66,191 @@ Your response MUST be valid JSON with this exact structure:
   }
 }
 """
-        
-        # Convert observation to readable format
-        current_state = json.dumps(observation, indent=2)
-        
-        full_prompt = f"""
-{meta_prompt}
 
---- CURRENT CAMPAIGN DATA ---
-{current_state}
---- END OF DATA ---
+# Fixed part of every reasoning prompt (also part of the response cache key)
+META_PROMPT = AGENT_BRIEF + SINGLE_RESPONSE_FORMAT
 
-Provide your reasoning and next action as JSON:
+BATCH_RESPONSE_FORMAT = """
+The data below lists several campaigns as a table: one row per campaign,
+pipe-separated, header row first. Analyze each campaign independently and
+choose the single best action for each one.
+Your response MUST be a valid JSON array with exactly one object per campaign,
+each with this exact structure:
+[
+  {
+    "campaign_id": "campaign_id from the table",
+    "reasoning": "Your detailed analysis of this campaign",
+    "confidence": 0.85,
+    "action": {
+      "tool_name": "tool_to_execute",
+      "parameters": {"key": "value"},
+      "expected_outcome": "What you expect this action to achieve"
+    }
+  }
+]
 """
+# Re-query rounds for rows missing from (or misaligned in) a batch response
+BATCH_MAX_REQUERIES = 2
+
+class AdForgeAgent:
+    def __init__(self, job_id, gemini_service, mode="demo", max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 response_cache=None, batch_size=1, streaming=False, event_sink=None, log_sink=None,
+                 shards=1, row_range=None, shard_service_factory=None, rules_engine=None,
+                 prompt_encoding="json", prompt_fields=None, json_output=True, clock=None, profile=False,
+                 checkpoint_every=None, resume=False, portfolio_optimizer=None, segment_index=None):
+        if mode not in AGENT_MODES:
+            raise ValueError(f"Unknown agent mode '{mode}', expected one of {AGENT_MODES}")
+        if streaming and shards > 1:
+            raise ValueError("Sharded runs load the dataset in memory and cannot be combined with streaming")
+        
+        self.job_id = job_id
+        self.gemini_service = gemini_service
+        self.mode = mode
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.response_cache = response_cache
+        # Observations per Gemini request in production mode (1 = one prompt per row)
+        self.batch_size = max(1, int(batch_size))
+        # Read the dataset in chunks instead of loading it (for files larger than memory)
+        self.streaming = streaming
+        # Called as event_sink(seq, entry) for every log entry, after it is written
+        self.event_sink = event_sink
+        # Production runs with shards > 1 split the rows across worker processes
+        self.shards = max(1, int(shards))
+        self.shard_service_factory = shard_service_factory
+        # (start, stop) rows handled by this agent when it runs one shard
+        self.row_range = row_range
+        # Clear-cut rows are decided locally; only the rest go to Gemini
+        self.rules_engine = rules_engine
+        self.routing = {"rule_decided": 0, "escalated": 0, "rule_actions": {}}
+        # Budget reallocation across campaign groups once every row is decided
+        self.portfolio_optimizer = portfolio_optimizer
+        self.decision_tally = DecisionTally()
+        # Live per-segment totals of the observed rows (see src/segment_index.py)
+        self.segment_index = segment_index
+        # How observations are written into prompts, and what the calls cost
+        self.prompt_builder = PromptBuilder(META_PROMPT, AGENT_BRIEF + "\n" + BATCH_RESPONSE_FORMAT,
+                                            encoding=prompt_encoding, fields=prompt_fields)
+        self.token_usage = TokenUsage()
+        # Ask the API for JSON output (where supported) and count unusable responses
+        self.json_output = json_output
+        self.parse_stats = ParseStats()
+        # Pauses and timestamps come from the clock ("demo", "realtime" or
+        # "virtual", see src/clock.py); measured phase times go to `latency`
+        if clock is None:
+            clock = "demo" if mode == "demo" else "realtime"
+        self.clock = make_clock(clock) if isinstance(clock, str) else clock
+        self.latency = PhaseLatency(metrics=get_metrics())
+        # Write a cProfile of the run to logs/<job_id>.prof
+        self.profile = profile
+        self.profile_path = f"logs/{job_id}.prof"
+        self._next_seq = 0
+        self._ai_slots = None
+        self.log_file_path = f"logs/{job_id}.jsonlog"
+        self.dataset_path = None
+        self.demo_rows = None
+        
+        # Ensure logs directory exists
+        os.makedirs("logs", exist_ok=True)
+        
+        # Committed progress is saved every `checkpoint_every` rows (None: never).
+        # `resume` continues from the job's last checkpoint instead of row 0,
+        # which also picks up rows appended to the dataset since then.
+        self.checkpoint = None
+        self.resumed = resume
+        if resume:
+            state = load_checkpoint(job_id)
+            if state is None:
+                raise ValueError(f"No checkpoint to resume job {job_id} from")
+            # Entries of steps that never committed are dropped
+            truncate_log(self.log_file_path, state["log_offset"])
+            if segment_index is not None and os.path.exists(self.log_file_path):
+                self._replay_segments()
+            self._next_seq = state["log_entries"]
+            self.token_usage.merge(state["token_usage"])
+            self.parse_stats.merge(state["response_parsing"])
+            # Only committed rows: the rest are routed again
+            self._merge_routing(state["routing"])
+            self.decision_tally.merge(state.get("decision_counts", []))
+            self.checkpoint = CampaignCheckpoint(job_id, checkpoint_every or DEFAULT_CHECKPOINT_ROWS, state)
+        else:
+            # Clear any existing log file (and checkpoint)
+            for path in (self.log_file_path, checkpoint_path(job_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+            if checkpoint_every:
+                self.checkpoint = CampaignCheckpoint(job_id, checkpoint_every)
         
-        return full_prompt
+        # Demo entries are written one by one so pollers see them at once;
+        # production runs group-commit them
+        self.log_sink = log_sink or JsonlLogSink(self.log_file_path, flush_every=1 if mode == "demo" else 64)
+    
+    def write_log_entry(self, entry_data):
+        """
+        Appends a new JSON object to the job's log file and publishes it.
+        Entries are numbered in write order, which is also their line number
+        in the log, so log readers and live subscribers share one cursor.
+        Step entries are LogEntry records and run-level ones plain dicts;
+        both are turned into JSON only by the log sink and the SSE stream.
+        """
+        with self.latency.measure("log_write"):
+            entry_data.setdefault("timestamp", self.clock.timestamp())
+            self.log_sink.write(entry_data)
+            
+            seq = self._next_seq
+            self._next_seq += 1
+            if self.event_sink is not None:
+                self.event_sink(seq, entry_data)
+        
+        if self.portfolio_optimizer is not None:
+            self.decision_tally.track(entry_data)
+        if self.segment_index is not None and entry_data.get("step") == "OBSERVE":
+            self.segment_index.add(entry_data["data"])
+        if self.checkpoint is not None and self.checkpoint.track(entry_data):
+            self.save_checkpoint()
+    
+    def _replay_segments(self):
+        """Adds the observations of the committed steps kept in the log to the segment index."""
+        with open(self.log_file_path, "r") as f:
+            for line in f:
+                if '"OBSERVE"' in line:
+                    entry = json.loads(line)
+                    if entry.get("step") == "OBSERVE":
+                        self.segment_index.add(entry["data"])
+    
+    def save_checkpoint(self, completed=False):
+        """Flushes the log and records every step written so far as committed."""
+        self.log_sink.flush()
+        self.checkpoint.save(self.log_sink.offset, self._next_seq, completed=completed,
+                             options=self.run_options(), token_usage=self.token_usage.summary(),
+                             response_parsing=self.parse_stats.summary(),
+                             decision_counts=self.decision_tally.summary())
+    
+    def run_options(self):
+        """The settings a resumed run of this job is rebuilt with."""
+        return {
+            "mode": self.mode,
+            "max_concurrency": self.max_concurrency,
+            "batch_size": self.batch_size,
+            "streaming": self.streaming,
+            "shards": self.shards,
+            "rules": self.rules_engine.thresholds() if self.rules_engine is not None else None,
+            "portfolio": self.portfolio_optimizer.settings() if self.portfolio_optimizer is not None else None,
+            "prompt_encoding": self.prompt_builder.encoding,
+            "prompt_fields": list(self.prompt_builder.fields) if self.prompt_builder.fields else None,
+            "json_output": self.json_output,
+            "clock": self.clock.mode,
+            "profile": self.profile,
+            "checkpoint_every": self.checkpoint.every_rows if self.checkpoint is not None else None,
+            "dataset_path": self.dataset_path,
+            "demo_rows": self.demo_rows
+        }
+    
+    def construct_reasoning_prompt(self, observation):
+        """
+        Constructs a unique prompt for Gemini by combining a fixed meta-prompt
+        with live, real-time data.
+        """
+        return self.prompt_builder.build(observation)
     
     def execute_action(self, action_decision):
         """
@@ -94,163 +272,689 @@ Provide your reasoning and next action as JSON:
         
         result = action_results.get(tool_name, f"Executed {tool_name} with parameters {parameters}")
         
-        # Add some realistic delay
-        time.sleep(0.5)
-        
         return {
             "tool_executed": tool_name,
             "parameters_used": parameters,
             "result": result,
-            "execution_time": datetime.now().isoformat()
+            "execution_time": self.clock.timestamp()
         }
     
-    async def run_intelligent_campaign(self, dataset_path):
+    async def _emit_paced(self, entry_data, pause):
+        """Writes a log entry immediately, then pauses (for as long as the clock says)."""
+        self.write_log_entry(entry_data)
+        await self.clock.pause(pause)
+    
+    async def run_intelligent_campaign(self, dataset_path, demo_rows=3):
         """
         Main agent loop implementing the OODA cycle:
         Observe -> Orient -> Decide -> Act
+        
+        In demo mode only the first `demo_rows` observations are processed, one
+        at a time. In production mode the whole dataset runs through a
+        bounded-concurrency pipeline (see `_run_pipeline`), split across worker
+        processes when `shards` > 1 (see `_run_sharded`).
+        """
+        self.dataset_path = dataset_path
+        self.demo_rows = demo_rows
+        profiler = self._start_profile() if self.profile else None
+        try:
+            return await self._run_campaign(dataset_path, demo_rows)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.profile_path)
+            # Flush buffered log entries whether the run completed or failed
+            self.log_sink.close()
+    
+    def _start_profile(self):
         """
-        # Initialize the simulator
-        simulator = AdCampaignSimulator(dataset_path, demo_rows=3)
+        Profiles the event loop thread for the duration of the run. Jobs
+        sharing that loop show up in the profile too; shard worker processes
+        do not. Returns None if another profiler is already active.
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            print(f"Profiling disabled for job {self.job_id}: {str(e)}")
+            return None
+        return profiler
+    
+    async def _run_campaign(self, dataset_path, demo_rows):
+        # Initialize the simulator. Loading the dataset (or, when streaming,
+        # a pass over the whole file) runs on a worker thread so the other
+        # jobs on the shared event loop keep going meanwhile.
+        rows = demo_rows if self.mode == "demo" else None
+        if self.streaming:
+            simulator = await asyncio.to_thread(StreamingAdCampaignSimulator, dataset_path, demo_rows=rows)
+        else:
+            simulator = await asyncio.to_thread(AdCampaignSimulator, dataset_path, demo_rows=rows,
+                                                row_range=self.row_range)
         
         # Log campaign start
-        campaign_summary = simulator.get_campaign_summary()
-        start_log = {
-            "step": "INITIALIZE",
-            "message": "AdForge Agent starting campaign analysis",
-            "campaign_summary": campaign_summary
-        }
+        if self.resumed:
+            simulator.seek(self.checkpoint.next_row, self.checkpoint.state["summary"])
+            start_log = {
+                "step": "RESUME",
+                "message": f"AdForge Agent resuming campaign analysis at row {simulator.current_step + 1}",
+                "resumed_from_row": simulator.current_step
+            }
+        else:
+            start_log = {
+                "step": "INITIALIZE",
+                "message": "AdForge Agent starting campaign analysis"
+            }
+        start_log.update(mode=self.mode, clock=self.clock.mode, campaign_summary=simulator.get_campaign_summary())
         self.write_log_entry(start_log)
-        time.sleep(1)
-        
-        step_number = 1
+        await self.clock.pause(1)
         
-        # Main OODA loop
-        while True:
-            # --- 1. OBSERVE ---
-            observation = simulator.get_next_observation()
-            if observation is None:
-                break  # Campaign finished
+        if self.mode == "production" and self.shards > 1:
+            final_summary = await self._run_sharded(dataset_path, simulator)
+        elif self.mode == "production":
+            await self._run_pipeline(simulator)
+            final_summary = simulator.get_campaign_summary()
+        else:
+            step_number = simulator.current_step + 1
             
-            observe_log = {
-                "step": "OBSERVE",
-                "step_number": step_number,
-                "sub_step": "data_received",
-                "message": f"Receiving campaign data for step {step_number}",
-                "data": observation
-            }
-            self.write_log_entry(observe_log)
-            time.sleep(1.5)  # Demo effect
+            # Main OODA loop
+            while True:
+                with self.latency.measure("observe"):
+                    observation = simulator.get_next_observation()
+                if observation is None:
+                    break  # Campaign finished
+                
+                rule_decision = self._route([observation])[0]
+                if rule_decision is not None:
+                    await self._run_rule_step(step_number, observation, rule_decision, self._emit_paced)
+                else:
+                    await self._run_step(step_number, observation, self._emit_paced)
+                step_number += 1
+            final_summary = simulator.get_campaign_summary()
+        if self.portfolio_optimizer is not None:
+            final_summary["portfolio"] = await self._optimize_portfolio(simulator)
+        final_summary["token_usage"] = self.token_usage.summary()
+        final_summary["response_parsing"] = self.parse_stats.summary()
+        final_summary["phase_latency"] = self.latency.summary()
+        if self.profile:
+            final_summary["profile"] = self.profile_path
+        
+        # Campaign complete
+        complete_log = {
+            "step": "COMPLETE",
+            "message": "Campaign analysis complete",
+            "final_summary": final_summary
+        }
+        if self.rules_engine is not None:
+            complete_log["routing"] = self.routing_stats()
+        self.write_log_entry(complete_log)
+        if self.checkpoint is not None:
+            self.save_checkpoint(completed=True)
+        
+        return final_summary
+    
+    async def _optimize_portfolio(self, simulator):
+        """
+        Logs the budget reallocation over every row of the dataset, per group
+        next to the actions taken for its rows; returns the portfolio totals.
+        The optimization runs on a worker thread, off the shared event loop.
+        """
+        with self.latency.measure("portfolio"):
+            portfolio = await asyncio.to_thread(
+                lambda: self.portfolio_optimizer.optimize(portfolio_frame(simulator), self.decision_tally.counts))
+        self.write_log_entry({
+            "step": "PORTFOLIO",
+            "message": f"Budget reallocation across {portfolio['totals']['groups']} campaign groups",
+            "portfolio": portfolio
+        })
+        return portfolio["totals"]
+    
+    async def _run_pipeline(self, simulator):
+        """
+        Runs the OODA steps concurrently while keeping the log in step order.
+        
+        At most `max_concurrency` Gemini calls are in flight. Observations are
+        grouped into units of `batch_size` steps; each unit buffers its own log
+        entries and finished units are flushed strictly in order, so every
+        step's entries stay contiguous and the dashboard can rebuild them.
+        The window of scheduled units is bounded, which keeps memory flat on
+        full-dataset runs.
+        """
+        self._ai_slots = asyncio.Semaphore(self.max_concurrency)
+        window = self.max_concurrency * PIPELINE_WINDOW_FACTOR
+        pending = deque()
+        
+        async def run_buffered(steps):
+            buffers = {step_number: [] for step_number, _, _ in steps}
             
-            # --- 2. ORIENT ---
-            # Sub-step 1: Construct prompt
-            prompt = self.construct_reasoning_prompt(observation)
-            orient_log_1 = {
-                "step": "ORIENT", 
-                "step_number": step_number,
-                "sub_step": "prompt_constructed",
-                "message": "Analyzing data and preparing query for AI reasoning engine",
-                "prompt": prompt[:500] + "..." if len(prompt) > 500 else prompt  # Truncate for display
-            }
-            self.write_log_entry(orient_log_1)
-            time.sleep(1)
+            def buffer_for(step_number):
+                async def buffer(entry_data, pause):
+                    entry_data["timestamp"] = self.clock.timestamp()
+                    buffers[step_number].append(entry_data)
+                return buffer
             
-            # Sub-step 2: Get AI response
-            orient_log_2 = {
-                "step": "ORIENT",
-                "step_number": step_number, 
-                "sub_step": "consulting_ai",
-                "message": "Consulting Gemini AI for strategic analysis..."
-            }
-            self.write_log_entry(orient_log_2)
-            time.sleep(2)
+            ai_steps = []
+            for step_number, observation, rule_decision in steps:
+                if rule_decision is not None:
+                    await self._run_rule_step(step_number, observation, rule_decision, buffer_for(step_number))
+                else:
+                    ai_steps.append((step_number, observation))
             
-            try:
-                gemini_response_str = await self.gemini_service.generate_content(prompt)
-                # Clean up the response to extract JSON
-                if "```json" in gemini_response_str:
-                    json_start = gemini_response_str.find("```json") + 7
-                    json_end = gemini_response_str.find("```", json_start)
-                    gemini_response_str = gemini_response_str[json_start:json_end].strip()
-                
-                gemini_response = json.loads(gemini_response_str)
-                
-                orient_log_3 = {
-                    "step": "ORIENT",
-                    "step_number": step_number,
-                    "sub_step": "ai_response_received", 
-                    "message": "AI analysis complete",
-                    "ai_response": gemini_response
-                }
-                self.write_log_entry(orient_log_3)
-                time.sleep(1)
+            if len(ai_steps) == 1:
+                step_number, observation = ai_steps[0]
+                await self._run_step(step_number, observation, buffer_for(step_number))
+            elif ai_steps:
+                await self._run_batch(ai_steps, buffer_for)
+            return [entry for step_number, _, _ in steps for entry in buffers[step_number]]
+        
+        async def flush_oldest():
+            if not pending[0].done():
+                # About to wait: make everything logged so far visible to readers
+                self.log_sink.flush()
+            for entry in await pending.popleft():
+                self.write_log_entry(entry)
+        
+        # Shards number their steps by dataset row, like an unsharded run
+        step_number = (self.row_range[0] if self.row_range else simulator.current_step) + 1
+        # A unit closes once it holds `batch_size` steps for Gemini; rule-decided
+        # steps ride along in order so the log stays sorted by step
+        steps = []
+        escalated = 0
+        unit_max_steps = UNIT_MAX_STEPS * self.batch_size
+        block = deque()
+        try:
+            while True:
+                if not block:
+                    block = self._read_block(simulator)
+                observation, rule_decision = block.popleft() if block else (None, None)
+                if observation is not None:
+                    steps.append((step_number, observation, rule_decision))
+                    step_number += 1
+                    if rule_decision is None:
+                        escalated += 1
                 
-            except Exception as e:
-                # Fallback decision if AI fails
-                gemini_response = {
-                    "reasoning": f"AI service unavailable. Using fallback logic based on ROI: {observation.get('roi', 0)}%",
-                    "confidence": 0.6,
-                    "action": {
-                        "tool_name": "continue_monitoring",
-                        "parameters": {},
-                        "expected_outcome": "Maintain current strategy until AI service is restored"
-                    }
-                }
+                if steps and (escalated >= self.batch_size or len(steps) >= unit_max_steps or observation is None):
+                    pending.append(asyncio.ensure_future(run_buffered(steps)))
+                    steps = []
+                    escalated = 0
+                    if len(pending) >= window:
+                        await flush_oldest()
                 
-                orient_log_3 = {
-                    "step": "ORIENT",
-                    "step_number": step_number,
-                    "sub_step": "ai_fallback",
-                    "message": f"AI service error, using fallback logic: {str(e)}",
-                    "ai_response": gemini_response
-                }
-                self.write_log_entry(orient_log_3)
-                time.sleep(1)
+                if observation is None:
+                    break  # Campaign finished
             
-            # --- 3. DECIDE ---
-            decision = gemini_response.get('action', {})
-            decide_log = {
-                "step": "DECIDE",
-                "step_number": step_number,
-                "message": f"Decision made: {decision.get('tool_name', 'unknown')}",
-                "decision": decision,
-                "reasoning": gemini_response.get('reasoning', ''),
-                "confidence": gemini_response.get('confidence', 0.5)
-            }
-            self.write_log_entry(decide_log)
-            time.sleep(1)
+            while pending:
+                await flush_oldest()
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+        finally:
+            self._ai_slots = None
+    
+    def _read_block(self, simulator):
+        """The next RULES_BLOCK_ROWS observations, each paired with its rule decision (or None)."""
+        observations = []
+        started = time.perf_counter()
+        while len(observations) < RULES_BLOCK_ROWS:
+            observation = simulator.get_next_observation()
+            if observation is None:
+                break
+            observations.append(observation)
+        self.latency.record("observe", time.perf_counter() - started, len(observations))
+        return deque(zip(observations, self._route(observations)))
+    
+    def _route(self, observations):
+        """Rule decisions for a block of observations (None = ask Gemini), counted for the routing stats."""
+        if self.rules_engine is None:
+            return [None] * len(observations)
+        with self.latency.measure("rules", len(observations)):
+            decisions = self.rules_engine.decide(observations)
+        for decision in decisions:
+            if decision is None:
+                self.routing["escalated"] += 1
+            else:
+                self.routing["rule_decided"] += 1
+                tool_name = decision["action"]["tool_name"]
+                self.routing["rule_actions"][tool_name] = self.routing["rule_actions"].get(tool_name, 0) + 1
+        return decisions
+    
+    def routing_stats(self):
+        """How many rows the rules decided locally vs. escalated to Gemini."""
+        total = self.routing["rule_decided"] + self.routing["escalated"]
+        return {
+            **self.routing,
+            "escalation_rate": round(self.routing["escalated"] / total, 4) if total else 0.0,
+            "thresholds": self.rules_engine.thresholds() if self.rules_engine is not None else None
+        }
+    
+    async def _run_sharded(self, dataset_path, simulator):
+        """
+        Runs the campaign as `shards` deterministic row ranges, one worker
+        process each, so prompt building, parsing and observation building use
+        every core. Each shard runs its own production pipeline (with its own
+        `max_concurrency` Gemini slots) and logs to a file of its own; shard
+        logs are appended to the job log in shard order as soon as each shard
+        and all shards before it have finished. A resumed run splits only the
+        rows after the checkpoint. Returns the merged summary.
+        
+        Shard logs are copied on a thread of their own, so other jobs on the
+        shared event loop keep running meanwhile. If the job is cancelled or a
+        shard fails, the shards and the copy are told to stop, both are waited
+        for, and leftover shard logs removed.
+        """
+        resumed_summary = simulator.get_campaign_summary()
+        ranges = shard_ranges(simulator.total_steps, self.shards, start=simulator.current_step)
+        options = {
+            "max_concurrency": self.max_concurrency,
+            "batch_size": self.batch_size,
+            "use_response_cache": self.response_cache is not None,
+            "rules_engine": self.rules_engine,
+            "prompt_encoding": self.prompt_builder.encoding,
+            "prompt_fields": self.prompt_builder.fields,
+            "json_output": self.json_output
+        }
+        loop = asyncio.get_running_loop()
+        # Forking a process that runs threads is unsafe, so workers are spawned
+        context = multiprocessing.get_context("spawn")
+        cancel_event = context.Event()
+        executor = ProcessPoolExecutor(max_workers=len(ranges), mp_context=context,
+                                       initializer=init_shard_worker, initargs=(cancel_event,))
+        futures = [
+            loop.run_in_executor(executor, partial(run_shard, self.job_id, index, row_range, dataset_path,
+                                                   options, self.shard_service_factory))
+            for index, row_range in enumerate(ranges)
+        ]
+        copier = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shard-log")
+        try:
+            summaries = []
+            for index, future in enumerate(futures):
+                summary, routing = await future
+                summaries.append(summary)
+                self.token_usage.merge(summary["token_usage"])
+                self.parse_stats.merge(summary["response_parsing"])
+                self.latency.merge(summary["phase_latency"])
+                self._merge_routing(routing)
+                await loop.run_in_executor(copier, self._append_shard_log, index, cancel_event)
+        finally:
+            # A started run_shard (or copy) cannot be cancelled from here:
+            # signal it, then wait (off the event loop) until it has stopped
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            await asyncio.to_thread(copier.shutdown, wait=True)
+            for index in range(len(ranges)):
+                path = f"logs/{shard_job_id(self.job_id, index)}.jsonlog"
+                if os.path.exists(path):
+                    os.remove(path)
+        merged = merge_summaries(summaries)
+        if simulator.current_step:
+            # Rows committed before the resume count toward the job's totals
+            for field in ("spent_budget", "total_conversions", "total_clicks", "current_step"):
+                merged[field] += resumed_summary[field]
+            merged["total_budget"] = simulator.total_budget
+            merged["total_steps"] = simulator.total_steps
+            merged["status"] = "COMPLETE" if merged["current_step"] >= simulator.total_steps else "RUNNING"
+        return merged
+    
+    def _merge_routing(self, routing):
+        self.routing["rule_decided"] += routing["rule_decided"]
+        self.routing["escalated"] += routing["escalated"]
+        for tool_name, count in routing["rule_actions"].items():
+            self.routing["rule_actions"][tool_name] = self.routing["rule_actions"].get(tool_name, 0) + count
+    
+    def _append_shard_log(self, shard_index, cancel_event):
+        """
+        Copies a finished shard's step entries into the job log, then removes
+        its file. Runs on a worker thread while the agent awaits it; stops
+        early once `cancel_event` is set.
+        """
+        path = f"logs/{shard_job_id(self.job_id, shard_index)}.jsonlog"
+        with open(path, "r") as f:
+            for count, line in enumerate(f):
+                if count % SHARD_LOG_CANCEL_CHECK_LINES == 0 and cancel_event.is_set():
+                    return
+                entry = json.loads(line)
+                if entry.get("step") in ("INITIALIZE", "COMPLETE"):
+                    continue  # Shard-local; the job has its own
+                entry["shard"] = shard_index
+                self.write_log_entry(entry)
+        self.log_sink.flush()
+        os.remove(path)
+    
+    async def _call_gemini(self, prompt):
+        """
+        Calls Gemini, holding one of the pipeline's in-flight slots if any.
+        Returns (response_text, estimated_tokens) and adds the call to the
+        job's token usage.
+        """
+        if self._ai_slots is None:
+            response = await self.gemini_service.generate_content(prompt, use_fallback=False,
+                                                                  json_output=self.json_output)
+        else:
+            async with self._ai_slots:
+                response = await self.gemini_service.generate_content(prompt, use_fallback=False,
+                                                                      json_output=self.json_output)
+        return response, self.token_usage.record(prompt, response)
+    
+    async def _consult_ai(self, observation, prompt):
+        """
+        Returns (decision, cached, estimated_tokens, repaired). Answers from
+        the response cache when possible (no tokens); otherwise calls Gemini
+        and parses the response. API errors and unusable responses propagate
+        so the step can log its fallback decision, and are never cached.
+        """
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.make_key(self.gemini_service.model_name,
+                                                     META_PROMPT + self.prompt_builder.cache_scope, observation)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                decision, _ = parse_decision(cached)
+                return decision, True, None, False
+        
+        response, tokens = await self._call_gemini(prompt)
+        try:
+            with self.latency.measure("parse"):
+                decision, repaired = parse_decision(response)
+        except ResponseParseError:
+            self.parse_stats.record(failed=True)
+            raise
+        self.parse_stats.record(repaired=repaired)
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, json.dumps(decision))
+        return decision, False, tokens, repaired
+    
+    async def _run_step(self, step_number, observation, emit):
+        """
+        Runs one OODA cycle for a single observation.
+        
+        `emit(entry, pause)` receives every log entry in order together with the
+        demo pause that follows it, so the same step logic serves both the
+        paced demo loop and the buffered production pipeline.
+        """
+        # --- 1. OBSERVE ---
+        await emit(self._observe_entry(step_number, observation), 1.5)  # Demo effect
+        
+        # --- 2. ORIENT ---
+        # Sub-step 1: Construct prompt
+        with self.latency.measure("prompt"):
+            prompt = self.construct_reasoning_prompt(observation)
+        orient_log_1 = LogEntry(
+            step="ORIENT",
+            step_number=step_number,
+            sub_step="prompt_constructed",
+            message="Analyzing data and preparing query for AI reasoning engine",
+            prompt=prompt[:500] + "..." if len(prompt) > 500 else prompt  # Truncate for display
+        )
+        await emit(orient_log_1, 1)
+        
+        # Sub-step 2: Get AI response
+        orient_log_2 = LogEntry(
+            step="ORIENT",
+            step_number=step_number,
+            sub_step="consulting_ai",
+            message="Consulting Gemini AI for strategic analysis..."
+        )
+        await emit(orient_log_2, 2)
+        
+        try:
+            with self.latency.measure("ai"):
+                gemini_response, cached, tokens, repaired = await self._consult_ai(observation, prompt)
             
-            # --- 4. ACT ---
-            act_log_1 = {
-                "step": "ACT",
-                "step_number": step_number,
-                "sub_step": "executing",
-                "message": f"Executing action: {decision.get('tool_name', 'unknown')}"
-            }
-            self.write_log_entry(act_log_1)
-            time.sleep(1)
+            orient_log_3 = LogEntry(
+                step="ORIENT",
+                step_number=step_number,
+                sub_step="ai_response_received",
+                message="AI analysis complete (cached)" if cached else "AI analysis complete",
+                cached=cached,
+                repaired=repaired,
+                tokens=tokens,
+                ai_response=gemini_response
+            )
             
+        except Exception as e:
+            gemini_response, orient_log_3 = self._fallback(step_number, observation, e)
+        await emit(orient_log_3, 1)
+        
+        await self._decide_and_act(step_number, gemini_response, emit)
+    
+    async def _run_rule_step(self, step_number, observation, rule_decision, emit):
+        """OODA cycle for a row the rules engine settled; Gemini is not consulted."""
+        await emit(self._observe_entry(step_number, observation), 1.5)
+        
+        orient_log = LogEntry(
+            step="ORIENT",
+            step_number=step_number,
+            sub_step="rule_decision",
+            message="Clear-cut case decided by local rules",
+            rule_based=True,
+            ai_response=rule_decision
+        )
+        await emit(orient_log, 1)
+        
+        await self._decide_and_act(step_number, rule_decision, emit)
+    
+    def _observe_entry(self, step_number, observation):
+        return LogEntry(
+            step="OBSERVE",
+            step_number=step_number,
+            sub_step="data_received",
+            message=f"Receiving campaign data for step {step_number}",
+            data=observation
+        )
+    
+    def _fallback(self, step_number, observation, error):
+        """Fallback decision (and its ORIENT log entry) if AI fails."""
+        gemini_response = {
+            "reasoning": f"AI service unavailable. Using fallback logic based on ROI: {observation.get('roi', 0)}%",
+            "confidence": 0.6,
+            "action": {
+                "tool_name": "continue_monitoring",
+                "parameters": {},
+                "expected_outcome": "Maintain current strategy until AI service is restored"
+            }
+        }
+        
+        orient_log_3 = LogEntry(
+            step="ORIENT",
+            step_number=step_number,
+            sub_step="ai_fallback",
+            message=f"AI service error, using fallback logic: {str(error)}",
+            ai_response=gemini_response
+        )
+        return gemini_response, orient_log_3
+    
+    async def _decide_and_act(self, step_number, gemini_response, emit):
+        """DECIDE and ACT phases for one step."""
+        # --- 3. DECIDE ---
+        decision = gemini_response.get('action', {})
+        decide_log = LogEntry(
+            step="DECIDE",
+            step_number=step_number,
+            message=f"Decision made: {decision.get('tool_name', 'unknown')}",
+            decision=decision,
+            reasoning=gemini_response.get('reasoning', ''),
+            confidence=gemini_response.get('confidence', 0.5)
+        )
+        await emit(decide_log, 1)
+        
+        # --- 4. ACT ---
+        act_log_1 = LogEntry(
+            step="ACT",
+            step_number=step_number,
+            sub_step="executing",
+            message=f"Executing action: {decision.get('tool_name', 'unknown')}"
+        )
+        await emit(act_log_1, 1)
+        
+        with self.latency.measure("act"):
             action_result = self.execute_action(decision)
+        await self.clock.pause(0.5)  # Add some realistic delay
+        
+        act_log_2 = LogEntry(
+            step="ACT",
+            step_number=step_number,
+            sub_step="completed",
+            message="Action executed successfully",
+            action_taken=decision,
+            result=action_result
+        )
+        await emit(act_log_2, 1)
+    
+    def construct_batch_prompt(self, observations):
+        """
+        Builds one prompt for several observations. The agent brief is sent
+        once and the campaigns are encoded as a compact pipe-separated table
+        (header row first) instead of one indented JSON object each.
+        """
+        return self.prompt_builder.build_batch(observations)
+    
+    def _validate_batch_response(self, response_str, expected_ids):
+        """
+        Maps campaign_id -> decision for every well-formed entry of a batch
+        response. Entries for unknown or duplicate campaign ids, and entries
+        that fail the decision schema, are dropped so those rows get re-queried.
+        Raises ResponseParseError when the response holds no JSON array at all.
+        """
+        with self.latency.measure("parse"):
+            try:
+                items, repaired = parse_batch(response_str)
+            except ResponseParseError:
+                self.parse_stats.record(failed=True)
+                raise
             
-            act_log_2 = {
-                "step": "ACT",
-                "step_number": step_number,
-                "sub_step": "completed",
-                "message": "Action executed successfully",
-                "action_taken": decision,
-                "result": action_result
-            }
-            self.write_log_entry(act_log_2)
-            time.sleep(1)
+            decisions = {}
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                campaign_id = item.get("campaign_id")
+                if campaign_id not in expected_ids or campaign_id in decisions:
+                    continue
+                try:
+                    decisions[campaign_id], item_repaired = validate_decision(item)
+                except ResponseParseError:
+                    continue
+                repaired |= item_repaired
+        self.parse_stats.record(repaired=repaired, failed=not decisions)
+        return decisions
+    
+    async def _consult_ai_batch(self, observations):
+        """
+        Returns ({campaign_id: decision}, cached_ids, requeried_ids, error, tokens),
+        `tokens` being the estimated total over this batch's calls.
+        
+        Rows with a cached batch decision are not sent. Rows missing from (or
+        misaligned in) a response are re-queried on their own, up to
+        BATCH_MAX_REQUERIES times; rows still undecided after that are left
+        out of the mapping, and `error` says why.
+        """
+        decisions = {}
+        cached_ids = set()
+        requeried_ids = set()
+        cache_keys = {}
+        tokens = {"input": 0, "output": 0}
+        
+        remaining = []
+        for observation in observations:
+            campaign_id = observation["campaign_id"]
+            if self.response_cache is not None:
+                cache_keys[campaign_id] = self.response_cache.make_key(
+                    self.gemini_service.model_name,
+                    AGENT_BRIEF + BATCH_RESPONSE_FORMAT + self.prompt_builder.cache_scope, observation)
+                cached = self.response_cache.get(cache_keys[campaign_id])
+                if cached is not None:
+                    decisions[campaign_id] = json.loads(cached)
+                    cached_ids.add(campaign_id)
+                    continue
+            remaining.append(observation)
+        
+        error = None
+        for attempt in range(BATCH_MAX_REQUERIES + 1):
+            if not remaining:
+                break
+            if attempt > 0:
+                requeried_ids.update(observation["campaign_id"] for observation in remaining)
             
-            step_number += 1
+            expected_ids = {observation["campaign_id"] for observation in remaining}
+            try:
+                response_str, call_tokens = await self._call_gemini(self.construct_batch_prompt(remaining))
+            except Exception as e:
+                error = e
+                break  # The API itself failed (after the service's own retries)
+            tokens["input"] += call_tokens["input"]
+            tokens["output"] += call_tokens["output"]
+            
+            try:
+                received = self._validate_batch_response(response_str, expected_ids)
+            except ValueError as e:
+                error = e
+                continue
+            
+            for campaign_id, decision in received.items():
+                decisions[campaign_id] = decision
+                if campaign_id in cache_keys:
+                    self.response_cache.set(cache_keys[campaign_id], json.dumps(decision))
+            remaining = [observation for observation in remaining if observation["campaign_id"] not in received]
+            error = ValueError(f"No valid decision returned for {len(remaining)} campaign(s)") if remaining else None
         
-        # Campaign complete
-        final_summary = simulator.get_campaign_summary()
-        complete_log = {
-            "step": "COMPLETE",
-            "message": "Campaign analysis complete",
-            "final_summary": final_summary
-        }
-        self.write_log_entry(complete_log)
+        return decisions, cached_ids, requeried_ids, error, tokens
+    
+    async def _run_batch(self, steps, emit_for):
+        """
+        Runs OODA cycles for several steps with a single batched Gemini query.
+        `emit_for(step_number)` returns the emit callback for that step's log.
+        """
+        observations = [observation for _, observation in steps]
         
-        return final_summary
+        # --- 1. OBSERVE ---
+        for step_number, observation in steps:
+            await emit_for(step_number)(self._observe_entry(step_number, observation), 1.5)
+        
+        # --- 2. ORIENT ---
+        with self.latency.measure("prompt", len(steps)):
+            prompt = self.construct_batch_prompt(observations)
+        for step_number, _ in steps:
+            emit = emit_for(step_number)
+            await emit(LogEntry(
+                step="ORIENT",
+                step_number=step_number,
+                sub_step="prompt_constructed",
+                message=f"Analyzing data and preparing batched query ({len(steps)} campaigns) for AI reasoning engine",
+                batch_size=len(steps),
+                prompt=prompt[:500] + "..." if len(prompt) > 500 else prompt  # Truncate for display
+            ), 1)
+            await emit(LogEntry(
+                step="ORIENT",
+                step_number=step_number,
+                sub_step="consulting_ai",
+                message="Consulting Gemini AI for strategic analysis..."
+            ), 2)
+        
+        with self.latency.measure("ai", len(steps)):
+            decisions, cached_ids, requeried_ids, error, batch_tokens = await self._consult_ai_batch(observations)
+        
+        for step_number, observation in steps:
+            emit = emit_for(step_number)
+            campaign_id = observation["campaign_id"]
+            gemini_response = decisions.get(campaign_id)
+            
+            if gemini_response is None:
+                gemini_response, orient_log_3 = self._fallback(step_number, observation, error)
+            else:
+                cached = campaign_id in cached_ids
+                orient_log_3 = LogEntry(
+                    step="ORIENT",
+                    step_number=step_number,
+                    sub_step="ai_response_received",
+                    message="AI analysis complete (cached)" if cached else "AI analysis complete",
+                    cached=cached,
+                    batched=True,
+                    requeried=campaign_id in requeried_ids,
+                    batch_tokens=batch_tokens,
+                    ai_response=gemini_response
+                )
+            await emit(orient_log_3, 1)
+            
+            await self._decide_and_act(step_number, gemini_response, emit)
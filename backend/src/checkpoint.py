@@ -0,0 +1,97 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DEFAULT_CHECKPOINT_ROWS = 256
+# Running totals of the committed rows, as in AdCampaignSimulator.get_campaign_summary()
+SUMMARY_FIELDS = ("spent_budget", "total_conversions", "total_clicks")
+
+
+def checkpoint_path(job_id: str) -> str:
+    return f"logs/{job_id}.checkpoint.json"
+
+
+def load_checkpoint(job_id: str) -> Optional[Dict[str, Any]]:
+    """The job's last saved checkpoint, or None if it never saved one."""
+    try:
+        with open(checkpoint_path(job_id), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def truncate_log(path: str, offset: int):
+    """Drop everything after byte `offset`: entries of steps that never committed."""
+    if os.path.exists(path) and os.path.getsize(path) > offset:
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+
+
+class CampaignCheckpoint:
+    """
+    Committed progress of one job: the next dataset row to process, the
+    running summary and rule routing of the rows before it, and how much of
+    the log (bytes and entries) belongs to them. The agent adds its own
+    run-wide state (per-group decision counts, token usage, ...) on save.
+
+    A step is committed once its ACT "completed" entry is written; log
+    entries arrive in step order, so tracking them as they are written is
+    enough, whichever way the job runs. `save()` must only be called right
+    after the log was flushed, and replaces the file atomically.
+    """
+
+    def __init__(self, job_id: str, every_rows: int = DEFAULT_CHECKPOINT_ROWS, state: Dict[str, Any] = None):
+        self.path = checkpoint_path(job_id)
+        self.every_rows = max(1, int(every_rows))
+        self.state = state or {
+            "job_id": job_id,
+            "next_row": 0,
+            "summary": {field: 0 for field in SUMMARY_FIELDS},
+            "routing": {"rule_decided": 0, "escalated": 0, "rule_actions": {}},
+            "completed": False
+        }
+        self._observation = None
+        self._rule_based = False
+        self._rows_since_save = 0
+
+    @property
+    def next_row(self) -> int:
+        return self.state["next_row"]
+
+    def track(self, entry: Dict[str, Any]) -> bool:
+        """Follow one written log entry; True when enough rows committed to save."""
+        step = entry.get("step")
+        if step == "OBSERVE":
+            self._observation = entry.get("data")
+            self._rule_based = False
+        elif step == "ORIENT" and entry.get("sub_step") == "rule_decision":
+            self._rule_based = True
+        elif step == "ACT" and entry.get("sub_step") == "completed" and self._observation is not None:
+            summary = self.state["summary"]
+            summary["spent_budget"] += self._observation.get("ad_spend", 0)
+            summary["total_conversions"] += self._observation.get("conversions", 0)
+            summary["total_clicks"] += self._observation.get("website_visits", 0)
+            tool_name = entry.get("action_taken", {}).get("tool_name", "unknown")
+            routing = self.state["routing"]
+            if self._rule_based:
+                routing["rule_decided"] += 1
+                routing["rule_actions"][tool_name] = routing["rule_actions"].get(tool_name, 0) + 1
+            else:
+                routing["escalated"] += 1
+            # Step numbers are 1-based dataset rows
+            self.state["next_row"] = entry.get("step_number", self.state["next_row"] + 1)
+            self._observation = None
+            self._rows_since_save += 1
+            return self._rows_since_save >= self.every_rows
+        return False
+
+    def save(self, log_offset: int, log_entries: int, completed: bool = False, **extra):
+        """Write the checkpoint; `extra` holds run-wide state (token usage, options, ...)."""
+        self.state.update(extra, log_offset=log_offset, log_entries=log_entries, completed=completed,
+                          saved_at=datetime.now().isoformat())
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.path)
+        self._rows_since_save = 0
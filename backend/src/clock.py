@@ -0,0 +1,118 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+# "demo": the dashboard cadence (real sleeps between log entries);
+# "realtime": no artificial delays; "virtual": pauses advance a simulated
+# clock instantly, so runs and their timestamps are reproducible
+CLOCK_MODES = ("demo", "realtime", "virtual")
+
+
+class RealtimeClock:
+    """Wall-clock timestamps and no pauses: a run spends time only on real work."""
+
+    mode = "realtime"
+
+    def timestamp(self) -> str:
+        return datetime.now().isoformat()
+
+    async def pause(self, seconds: float):
+        pass
+
+
+class DemoClock(RealtimeClock):
+    """Sleeps for every pause so the live dashboard can follow along."""
+
+    mode = "demo"
+
+    async def pause(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(RealtimeClock):
+    """
+    Simulated time: pauses advance it instantly and timestamps are derived
+    from it, so a run produces the demo's timeline without waiting.
+    """
+
+    mode = "virtual"
+
+    def __init__(self, start: datetime = datetime(2024, 10, 19)):
+        self.start = start
+        self.elapsed = 0.0
+
+    def advance(self, seconds: float):
+        self.elapsed += seconds
+
+    def timestamp(self) -> str:
+        return (self.start + timedelta(seconds=self.elapsed)).isoformat()
+
+    async def pause(self, seconds: float):
+        self.advance(seconds)
+
+
+def make_clock(mode: str) -> RealtimeClock:
+    if mode not in CLOCK_MODES:
+        raise ValueError(f"Unknown clock mode '{mode}', expected one of {CLOCK_MODES}")
+    return {"demo": DemoClock, "realtime": RealtimeClock, "virtual": VirtualClock}[mode]()
+
+
+class PhaseLatency:
+    """
+    Measured wall time per OODA phase (count, total and max), independent
+    of the clock's pauses. In the concurrent pipeline phases overlap, so
+    totals can exceed the run's elapsed time. With a `metrics` registry
+    every record also lands in its adforge_phase_seconds histogram.
+    """
+
+    def __init__(self, metrics=None):
+        self._phases: Dict[str, list] = {}
+        self.metrics = metrics
+
+    def record(self, phase: str, seconds: float, count: int = 1):
+        """Add `seconds` spent on `count` items (e.g. a block of rows) of a phase."""
+        if count <= 0:
+            return
+        stats = self._phases.get(phase)
+        if stats is None:
+            stats = self._phases[phase] = [0, 0.0, 0.0]
+        stats[0] += count
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds / count)
+        if self.metrics is not None:
+            self.metrics.observe("adforge_phase_seconds", seconds / count, count, phase=phase)
+
+    @contextmanager
+    def measure(self, phase: str, count: int = 1):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started, count)
+
+    def merge(self, summary: Dict[str, Dict[str, Any]]):
+        """
+        Add another run's (or shard's) `summary()`. The histograms get its
+        items at their mean time, since the summary keeps no distribution.
+        """
+        for phase, stats in summary.items():
+            own = self._phases.setdefault(phase, [0, 0.0, 0.0])
+            own[0] += stats["count"]
+            own[1] += stats["total_seconds"]
+            own[2] = max(own[2], stats["max_ms"] / 1000)
+            if self.metrics is not None and stats["count"] > 0:
+                self.metrics.observe("adforge_phase_seconds", stats["total_seconds"] / stats["count"], stats["count"],
+                                     phase=phase)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            phase: {
+                "count": count,
+                "total_seconds": round(total, 6),
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                "max_ms": round(longest * 1000, 3)
+            }
+            for phase, (count, total, longest) in self._phases.items()
+        }
@@ -0,0 +1,176 @@
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .metrics import get_metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet sidecars are optional
+    pa = None
+    pq = None
+
+# Compact dtypes for the campaign CSV. Every float column stays float64:
+# AdSpend is money summed into budget totals, and the others are rounded
+# into observations, where float32 error can move the rounded value (and so
+# the prompt and its response cache key). The space goes to ints and categories.
+DATASET_DTYPES = {
+    "CustomerID": "int32",
+    "Age": "int32",
+    "Gender": "category",
+    "Income": "int32",
+    "CampaignChannel": "category",
+    "CampaignType": "category",
+    "AdSpend": "float64",
+    "ClickThroughRate": "float64",
+    "ConversionRate": "float64",
+    "WebsiteVisits": "int32",
+    "PagesPerVisit": "float64",
+    "TimeOnSite": "float64",
+    "SocialShares": "int32",
+    "EmailOpens": "int32",
+    "EmailClicks": "int32",
+    "PreviousPurchases": "int32",
+    "LoyaltyPoints": "int32",
+    "AdvertisingPlatform": "category",
+    "AdvertisingTool": "category",
+    "Conversion": "int32",
+}
+
+SIDECAR_SUFFIX = ".parquet"
+# Parquet schema metadata key holding the source file's signature
+SIDECAR_SOURCE_KEY = b"adforge_source_signature"
+# Part of that signature; bumped when DATASET_DTYPES change so older sidecars are rebuilt
+SIDECAR_FORMAT = 2
+
+
+class DatasetRegistry:
+    """
+    Parses each dataset once per process and hands the same DataFrame to
+    every simulator. Entries are keyed by absolute path and invalidated when
+    the file's mtime or size changes. With `sidecar=True` (and pyarrow
+    installed) a Parquet copy is written next to the CSV so a fresh process
+    can skip CSV parsing; the sidecar is only used if it was built from the
+    current version of the file.
+
+    Callers must treat returned frames as read-only, since they are shared.
+    """
+
+    def __init__(self, sidecar: bool = False):
+        self.sidecar = sidecar and pq is not None
+        self._datasets: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _signature_bytes(signature: Tuple[int, int]) -> bytes:
+        return f"{SIDECAR_FORMAT}:{signature[0]}:{signature[1]}".encode()
+
+    def load(self, path: str) -> pd.DataFrame:
+        """Return the parsed dataset at `path`, reading it only if it changed."""
+        key = os.path.abspath(path)
+        signature = self._signature(key)
+
+        with self._lock:
+            entry = self._datasets.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+
+            frame = self._read(key, signature)
+            self._datasets[key] = (signature, frame)
+            self.loads += 1
+            return frame
+
+    def _read(self, path: str, signature: Tuple[int, int]) -> pd.DataFrame:
+        sidecar_path = path + SIDECAR_SUFFIX
+        signature_bytes = self._signature_bytes(signature)
+
+        if self.sidecar and os.path.exists(sidecar_path):
+            try:
+                metadata = pq.read_schema(sidecar_path).metadata or {}
+                if metadata.get(SIDECAR_SOURCE_KEY) == signature_bytes:
+                    with get_metrics().span("adforge_dataset_seconds", stage="read_parquet"):
+                        return pq.read_table(sidecar_path).to_pandas()
+            except Exception as e:
+                print(f"Ignoring unreadable dataset sidecar {sidecar_path}: {str(e)}")
+
+        with get_metrics().span("adforge_dataset_seconds", stage="read_csv"):
+            frame = pd.read_csv(path, dtype=DATASET_DTYPES)
+
+        if self.sidecar:
+            try:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                metadata = {**(table.schema.metadata or {}), SIDECAR_SOURCE_KEY: signature_bytes}
+                temp_path = sidecar_path + ".tmp"
+                pq.write_table(table.replace_schema_metadata(metadata), temp_path)
+                os.replace(temp_path, sidecar_path)
+            except Exception as e:
+                print(f"Could not write dataset sidecar {sidecar_path}: {str(e)}")
+
+        return frame
+
+    def iter_chunks(self, path: str, chunk_rows: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream the dataset `chunk_rows` rows at a time without loading it all.
+        A Parquet sidecar built from the current file is read batch by batch
+        (memory-mapped); otherwise the CSV is parsed in chunks. Chunk indexes
+        continue across chunks, like row numbers in the full file.
+        """
+        path = os.path.abspath(path)
+        sidecar_path = path + SIDECAR_SUFFIX
+        signature_bytes = self._signature_bytes(self._signature(path))
+
+        if pq is not None and os.path.exists(sidecar_path):
+            parquet_file = pq.ParquetFile(sidecar_path, memory_map=True)
+            if (parquet_file.schema_arrow.metadata or {}).get(SIDECAR_SOURCE_KEY) == signature_bytes:
+                start = 0
+                for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+                    chunk = batch.to_pandas()
+                    chunk.index = pd.RangeIndex(start, start + len(chunk))
+                    start += len(chunk)
+                    yield chunk
+                return
+
+        dtypes = DATASET_DTYPES if columns is None else {column: DATASET_DTYPES[column] for column in columns}
+        yield from pd.read_csv(path, dtype=dtypes, usecols=columns, chunksize=chunk_rows)
+
+    def invalidate(self, path: Optional[str] = None):
+        """Forget one dataset (or all of them)."""
+        with self._lock:
+            if path is None:
+                self._datasets.clear()
+            else:
+                self._datasets.pop(os.path.abspath(path), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "datasets": len(self._datasets),
+                "loads": self.loads,
+                "memory_bytes": int(sum(frame.memory_usage(deep=True).sum() for _, frame in self._datasets.values())),
+                "sidecar": self.sidecar
+            }
+
+
+_shared_registry: Optional[DatasetRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_dataset_registry() -> DatasetRegistry:
+    """
+    Return the process-wide dataset registry.
+    Set DATASET_SIDECAR=1 to persist Parquet sidecars (requires pyarrow).
+    """
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = DatasetRegistry(sidecar=os.getenv('DATASET_SIDECAR', '0') == '1')
+        return _shared_registry
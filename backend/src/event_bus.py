@@ -0,0 +1,135 @@
+import queue
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 1000
+# Recent events kept per running job so a reconnecting client can resume
+DEFAULT_REPLAY_EVENTS = 512
+
+# Queued after a job's last event
+END_OF_STREAM = object()
+
+
+class Subscription:
+    """
+    One consumer of a job's log events.
+
+    Events arrive on a bounded queue. A subscriber that falls more than
+    `max_queue` events behind is dropped rather than slowing the agent down:
+    `overflowed` is set and no further events are delivered. The client is
+    expected to reconnect and resume from the last event id it saw.
+    """
+
+    def __init__(self, job_id: str, max_queue: int, backlog: List[Tuple[int, Any]], closed: bool):
+        self.job_id = job_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.backlog = backlog
+        self.closed = closed
+        self.overflowed = False
+
+    def get(self, timeout: float):
+        """
+        Next (seq, entry) pair, END_OF_STREAM, or None if nothing arrived in
+        time. Once overflowed, returns None as soon as the queue is drained.
+        """
+        try:
+            if self.overflowed:
+                return self.queue.get_nowait()
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _offer(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+
+class LogEventBus:
+    """
+    In-process pub/sub for agent log entries, keyed by job id.
+
+    `publish` never blocks: each subscriber has its own bounded queue, and
+    slow subscribers are disconnected (see Subscription). A short replay
+    buffer of each running job's latest events is handed to new subscribers
+    so they can fill the gap between what the log file already holds and
+    what will be published next.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE, replay_events: int = DEFAULT_REPLAY_EVENTS):
+        self.max_queue = max_queue
+        self.replay_events = replay_events
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._recent: Dict[str, deque] = {}
+        self._closed: Set[str] = set()
+        self._lock = threading.Lock()
+        self.dropped_subscribers = 0
+
+    def subscribe(self, job_id: str) -> Subscription:
+        with self._lock:
+            backlog = list(self._recent.get(job_id, ()))
+            subscription = Subscription(job_id, self.max_queue, backlog, job_id in self._closed)
+            if not subscription.closed:
+                self._subscribers.setdefault(job_id, set()).add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.job_id]
+
+    def publish(self, job_id: str, seq: int, entry: Dict[str, Any]):
+        """Deliver one log entry (with its sequence number) to the job's subscribers."""
+        with self._lock:
+            recent = self._recent.get(job_id)
+            if recent is None:
+                recent = self._recent[job_id] = deque(maxlen=self.replay_events)
+            recent.append((seq, entry))
+
+            for subscription in list(self._subscribers.get(job_id, ())):
+                if not subscription._offer((seq, entry)):
+                    self._subscribers[job_id].discard(subscription)
+                    self.dropped_subscribers += 1
+
+    def close(self, job_id: str):
+        """Mark a job finished: subscribers get END_OF_STREAM and its replay buffer is freed."""
+        with self._lock:
+            self._closed.add(job_id)
+            self._recent.pop(job_id, None)
+            for subscription in self._subscribers.pop(job_id, ()):
+                subscription._offer(END_OF_STREAM)
+
+    def discard(self, job_id: str):
+        """Forget everything about a job (e.g. once it is evicted)."""
+        with self._lock:
+            self._closed.discard(job_id)
+            self._recent.pop(job_id, None)
+            self._subscribers.pop(job_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+                "streaming_jobs": len(self._recent),
+                "dropped_subscribers": self.dropped_subscribers
+            }
+
+
+_shared_bus: Optional[LogEventBus] = None
+_shared_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> LogEventBus:
+    """Return the process-wide log event bus."""
+    global _shared_bus
+    with _shared_bus_lock:
+        if _shared_bus is None:
+            _shared_bus = LogEventBus()
+        return _shared_bus
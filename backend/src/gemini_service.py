@@ -1,43 +1,129 @@
-import google.generativeai as genai
+import asyncio
+import inspect
 import json
 import os
-from typing import Dict, Any
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from .metrics import get_metrics
+
+DEFAULT_MODEL_NAME = 'gemini-2.5-flash'
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 4
+
+# HTTP status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Structured output: the model returns bare JSON instead of fenced prose
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
 
 class GeminiService:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, model: Any = None, model_name: str = DEFAULT_MODEL_NAME,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base: float = 0.5, backoff_cap: float = 16.0):
         """
         Initialize Gemini service with API key.
         API key can be passed directly or set as environment variable GEMINI_API_KEY
-        """
-        self.api_key = api_key or os.getenv('GEMINI_API_KEY') or os.getenv('API_KEY')
         
-        if not self.api_key:
-            raise ValueError(
-                "Gemini API key is required. Please set GEMINI_API_KEY environment variable "
-                "or pass api_key parameter to GeminiService constructor."
-            )
+        `model` may be any object with a `generate_content(prompt)` method returning
+        something with a `.text` attribute; it skips API configuration entirely,
+        which lets benchmarks run against a local fake model.
+        """
+        self.model_name = model_name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
         
-        # Configure the Gemini API
-        genai.configure(api_key=self.api_key)
+        if model is None:
+            self.api_key = api_key or os.getenv('GEMINI_API_KEY') or os.getenv('API_KEY')
+            
+            if not self.api_key:
+                raise ValueError(
+                    "Gemini API key is required. Please set GEMINI_API_KEY environment variable "
+                    "or pass api_key parameter to GeminiService constructor."
+                )
+            
+            # The SDK (with grpc and protobuf) takes most of a second to import,
+            # so it is only loaded once a real client is needed
+            import google.generativeai as genai
+            
+            # Configure the Gemini API
+            genai.configure(api_key=self.api_key)
+            
+            # Initialize the model
+            model = genai.GenerativeModel(model_name)
+        else:
+            self.api_key = api_key
         
-        # Initialize the model
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = model
+        # Decided once from the model's signature, so an unrelated TypeError
+        # inside a call can never switch JSON mode off for every later job
+        self.supports_json_output = _accepts_generation_config(model)
         
-    async def generate_content(self, prompt: str) -> str:
+        # The SDK call is synchronous, so it runs on a dedicated thread pool.
+        # The pool size is the concurrency limit: it is shared by every job and
+        # event loop in the process, and the model (and its channel) is reused.
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+    
+    async def generate_content(self, prompt: str, use_fallback: bool = True, json_output: bool = False) -> str:
         """
-        Generate content using Gemini API
+        Generate content using Gemini API without blocking the event loop.
+        Rate limits and transient server errors are retried with jittered
+        exponential backoff before falling back to a canned response
+        (or re-raising, when use_fallback is False). `json_output` requests
+        JSON structured output where the model supports it.
         """
-        try:
-            # Generate content using Gemini
+        loop = asyncio.get_running_loop()
+        metrics = get_metrics()
+        attempt = 0
+        
+        while True:
+            # Each attempt is timed, including any wait for a free pool thread
+            started = time.perf_counter()
+            try:
+                # Generate content using Gemini
+                text = await loop.run_in_executor(self._executor, self._generate_sync, prompt, json_output)
+                metrics.observe("gemini_request_seconds", time.perf_counter() - started, outcome="ok")
+                return text
+                
+            except Exception as e:
+                if attempt < self.max_retries and self._is_retryable(e):
+                    metrics.observe("gemini_request_seconds", time.perf_counter() - started, outcome="retried")
+                    metrics.inc("gemini_retries_total")
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                
+                metrics.observe("gemini_request_seconds", time.perf_counter() - started, outcome="error")
+                print(f"Error calling Gemini API: {str(e)}")
+                if not use_fallback:
+                    raise
+                # Fallback to mock response if API fails
+                metrics.inc("gemini_fallbacks_total")
+                return self._get_fallback_response(prompt)
+    
+    def _generate_sync(self, prompt: str, json_output: bool = False) -> str:
+        """Blocking model call; runs on the service's thread pool."""
+        if json_output and self.supports_json_output:
+            response = self.model.generate_content(prompt, generation_config=JSON_GENERATION_CONFIG)
+        else:
             response = self.model.generate_content(prompt)
-            
-            # Return the generated text
-            return response.text
-            
-        except Exception as e:
-            print(f"Error calling Gemini API: {str(e)}")
-            # Fallback to mock response if API fails
-            return self._get_fallback_response(prompt)
+        
+        # Return the generated text
+        return response.text
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """True for 429/5xx errors (google.api_core exceptions carry an HTTP `code`)."""
+        return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
     
     def _get_fallback_response(self, prompt: str) -> str:
         """
@@ -88,3 +174,32 @@ class GeminiService:
         except Exception as e:
             print(f"Gemini API connection test failed: {str(e)}")
             return False
+
+
+def _accepts_generation_config(model: Any) -> bool:
+    """True if model.generate_content takes a generation_config argument."""
+    try:
+        parameters = inspect.signature(model.generate_content).parameters.values()
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return any(parameter.name == "generation_config" or parameter.kind is inspect.Parameter.VAR_KEYWORD
+               for parameter in parameters)
+
+
+_shared_service: Optional[GeminiService] = None
+_shared_service_lock = threading.Lock()
+
+
+def get_gemini_service() -> GeminiService:
+    """
+    Return the process-wide GeminiService, creating it on first use.
+    Jobs share one configured client, thread pool and connection.
+    """
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            _shared_service = GeminiService(
+                max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+                max_retries=int(os.getenv('GEMINI_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+            )
+        return _shared_service
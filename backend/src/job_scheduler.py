@@ -0,0 +1,189 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 100
+# Wait-time samples kept for the percentile metrics
+WAIT_SAMPLES = 1000
+
+
+class QueueFullError(Exception):
+    """Raised by JobScheduler.submit when the queue is at capacity."""
+
+
+class _QueuedJob:
+    __slots__ = ("job_id", "tenant", "run", "on_cancel", "enqueued_at")
+
+    def __init__(self, job_id, tenant, run, on_cancel):
+        self.job_id = job_id
+        self.tenant = tenant
+        self.run = run
+        self.on_cancel = on_cancel
+        self.enqueued_at = time.monotonic()
+
+
+class JobScheduler:
+    """
+    Runs campaign jobs on a fixed pool of workers sharing one event loop.
+
+    The event loop lives on a single background thread. `submit` is called
+    from request threads and never blocks: a job is queued, or rejected with
+    QueueFullError once `max_queue` jobs are waiting (admission control).
+    Each tenant has its own FIFO and workers take jobs from tenants in
+    round-robin order, so one busy tenant cannot starve the others.
+    Queued and running jobs can be cancelled.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+
+        self._tenants: "OrderedDict[str, deque]" = OrderedDict()
+        self._queued = 0
+        self._running: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._wait_samples = deque(maxlen=WAIT_SAMPLES)
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+        self._available = asyncio.Semaphore(0)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        for _ in range(self.workers):
+            self.loop.create_task(self._worker())
+        self.loop.run_forever()
+
+    def submit(self, job_id: str, run: Callable[[], Awaitable[Any]], tenant: str = "default",
+               on_cancel: Optional[Callable[[], None]] = None) -> int:
+        """
+        Queue `run()` (a coroutine function) for execution and return the
+        job's position in the queue. `on_cancel` is called if the job is
+        cancelled before it starts.
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise QueueFullError(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._tenants.setdefault(tenant, deque()).append(_QueuedJob(job_id, tenant, run, on_cancel))
+            self._queued += 1
+            self._counters["submitted"] += 1
+            position = self._queued
+        self.loop.call_soon_threadsafe(self._available.release)
+        return position
+
+    def _next_job(self) -> Optional[_QueuedJob]:
+        """Head of the next tenant's queue, rotating that tenant to the back."""
+        with self._lock:
+            while self._tenants:
+                tenant, jobs = self._tenants.popitem(last=False)
+                if not jobs:
+                    continue
+                job = jobs.popleft()
+                if jobs:
+                    self._tenants[tenant] = jobs
+                self._queued -= 1
+                return job
+            return None
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            job = self._next_job()
+            if job is None:
+                continue  # The job was cancelled while queued
+
+            self._wait_samples.append(time.monotonic() - job.enqueued_at)
+            task = asyncio.ensure_future(job.run())
+            self._running[job.job_id] = task
+            try:
+                await task
+                outcome = "completed"
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+            except Exception:
+                outcome = "failed"
+            finally:
+                self._running.pop(job.job_id, None)
+            with self._lock:
+                self._counters[outcome] += 1
+
+    def is_active(self, job_id: str) -> bool:
+        """True while the job is queued or running in this process."""
+        with self._lock:
+            if any(job.job_id == job_id for jobs in self._tenants.values() for job in jobs):
+                return True
+        return job_id in self._running
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it is neither."""
+        with self._lock:
+            for tenant, jobs in self._tenants.items():
+                for job in jobs:
+                    if job.job_id == job_id:
+                        jobs.remove(job)
+                        self._queued -= 1
+                        self._counters["cancelled"] += 1
+                        break
+                else:
+                    continue
+                if not jobs:
+                    del self._tenants[tenant]
+                if job.on_cancel is not None:
+                    job.on_cancel()
+                return True
+
+        task = self._running.get(job_id)
+        if task is None:
+            return False
+        self.loop.call_soon_threadsafe(task.cancel)
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, running jobs, outcome counters and queue wait times."""
+        with self._lock:
+            queue_depth = {tenant: len(jobs) for tenant, jobs in self._tenants.items() if jobs}
+            waits = sorted(self._wait_samples)
+            counters = dict(self._counters)
+
+        def percentile(fraction):
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 4) if waits else 0.0
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": sum(queue_depth.values()),
+            "queue_depth_by_tenant": queue_depth,
+            "running": len(self._running),
+            **counters,
+            "wait_seconds": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(waits[-1], 4) if waits else 0.0
+            }
+        }
+
+
+_shared_scheduler: Optional[JobScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler() -> JobScheduler:
+    """
+    Return the process-wide scheduler, sized by SCHEDULER_WORKERS and
+    SCHEDULER_MAX_QUEUE. Size the worker count to the Gemini quota.
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = JobScheduler(
+                workers=int(os.getenv('SCHEDULER_WORKERS', DEFAULT_WORKERS)),
+                max_queue=int(os.getenv('SCHEDULER_MAX_QUEUE', DEFAULT_MAX_QUEUE))
+            )
+        return _shared_scheduler
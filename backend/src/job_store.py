@@ -0,0 +1,316 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Job states after which nothing else will happen
+FINISHED_STATUSES = ("COMPLETED", "ERROR", "CANCELLED")
+# Job states in which a server process holds the job (queued or running it)
+ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_FINISHED = 1000
+DEFAULT_PAGE_SIZE = 50
+# Expired finished jobs are swept once every this many writes
+EVICTION_INTERVAL = 64
+
+
+def current_owner() -> Dict[str, Any]:
+    """The "owner" recorded on jobs this process queues, so other processes can tell when it died."""
+    return {"host": socket.gethostname(), "pid": os.getpid()}
+
+
+def owner_alive(owner: Dict[str, Any]) -> bool:
+    """
+    Whether the process in a job's "owner" field may still be running. Only
+    processes on this host can be checked; others are assumed alive.
+    """
+    if owner.get("host") != socket.gethostname():
+        return True
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, run by another user
+    return True
+
+
+class InMemoryJobStore:
+    """
+    Job records held in process memory.
+
+    Every job gets an increasing sequence number (its creation order).
+    Sorted per-status lists of those numbers make `list()` a bisect plus a
+    slice, so a page costs O(log n + limit) however long the history is.
+    Finished jobs are evicted after `ttl_seconds`, and beyond
+    `max_finished` the least recently read ones go first. `on_evict(job_id)`
+    callbacks let other components drop per-job state.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_finished: int = DEFAULT_MAX_FINISHED):
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max(0, int(max_finished))
+        self.on_evict: List[Callable[[str], None]] = []
+
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._seq_of: Dict[str, int] = {}
+        self._id_of: Dict[int, str] = {}
+        self._all: List[int] = []
+        self._by_status: Dict[str, List[int]] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # job_id -> finished_at, LRU order
+        self._next_seq = 1
+        self._writes = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._records
+
+    def create(self, job_id: str, record: Dict[str, Any]):
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._records[job_id] = dict(record)
+            self._seq_of[job_id] = seq
+            self._id_of[seq] = job_id
+            self._all.append(seq)
+            self._by_status.setdefault(record.get("status"), []).append(seq)
+            self._after_write()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A copy of the job's record, or None."""
+        with self._lock:
+            record = self._records.get(job_id)
+            if record is None:
+                return None
+            if job_id in self._finished:
+                self._finished.move_to_end(job_id)
+            return dict(record)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            record = self._records.get(job_id)
+            if record is None:
+                return
+            old_status = record.get("status")
+            record.update(fields)
+            new_status = record.get("status")
+            if new_status != old_status:
+                seq = self._seq_of[job_id]
+                self._remove_seq(self._by_status[old_status], seq)
+                insort(self._by_status.setdefault(new_status, []), seq)
+                if new_status in FINISHED_STATUSES:
+                    self._finished[job_id] = time.time()
+                else:
+                    # Running again (a resumed job): not evictable until it finishes
+                    self._finished.pop(job_id, None)
+            self._after_write()
+
+    def delete(self, job_id: str):
+        with self._lock:
+            if job_id in self._records:
+                self._delete(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+             cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Newest jobs first, optionally filtered by status. Pass the returned
+        cursor back to get the next (older) page; it is None on the last page.
+        """
+        with self._lock:
+            seqs = self._all if status is None else self._by_status.get(status, [])
+            end = len(seqs) if cursor is None else bisect_left(seqs, cursor)
+            start = max(0, end - limit)
+            page = [{"job_id": self._id_of[seq], **self._records[self._id_of[seq]]}
+                    for seq in reversed(seqs[start:end])]
+            return page, (seqs[start] if start > 0 else None)
+
+    def count(self, status: Optional[str] = None) -> int:
+        with self._lock:
+            return len(self._all if status is None else self._by_status.get(status, []))
+
+    def evict(self) -> int:
+        """Drop finished jobs past their TTL or over the size cap; returns how many."""
+        evicted = []
+        with self._lock:
+            cutoff = time.time() - self.ttl_seconds
+            for job_id, finished_at in list(self._finished.items()):
+                if finished_at < cutoff or len(self._finished) > self.max_finished:
+                    self._delete(job_id)
+                    evicted.append(job_id)
+        for job_id in evicted:
+            for callback in self.on_evict:
+                callback(job_id)
+        return len(evicted)
+
+    def _delete(self, job_id: str):
+        record = self._records.pop(job_id)
+        seq = self._seq_of.pop(job_id)
+        del self._id_of[seq]
+        self._remove_seq(self._all, seq)
+        self._remove_seq(self._by_status[record.get("status")], seq)
+        self._finished.pop(job_id, None)
+
+    @staticmethod
+    def _remove_seq(seqs: List[int], seq: int):
+        index = bisect_left(seqs, seq)
+        if index < len(seqs) and seqs[index] == seq:
+            del seqs[index]
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % EVICTION_INTERVAL == 0:
+            self.evict()
+
+
+class SQLiteJobStore:
+    """
+    Job records in a SQLite file, so they survive restarts and can be shared
+    by several server processes. Same interface and eviction policy as
+    InMemoryJobStore; lookups by status and creation order use indexes.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_finished: int = DEFAULT_MAX_FINISHED):
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max(0, int(max_finished))
+        self.on_evict: List[Callable[[str], None]] = []
+        self._writes = 0
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL UNIQUE,
+                status TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                last_access REAL NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_seq ON jobs (status, seq);
+            CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+            CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at, last_access);
+        """)
+        self._db.commit()
+
+    def __contains__(self, job_id: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def create(self, job_id: str, record: Dict[str, Any]):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, status, created_at, last_access, record) VALUES (?, ?, ?, ?, ?)",
+                (job_id, record.get("status"), now, now, json.dumps(record))
+            )
+        self._after_write()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT record, finished_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None:
+                self._db.execute("UPDATE jobs SET last_access = ? WHERE job_id = ?", (time.time(), job_id))
+            return json.loads(row[0])
+
+    def update(self, job_id: str, **fields):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT record FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            record = {**json.loads(row[0]), **fields}
+            status = record.get("status")
+            now = time.time()
+            self._db.execute(
+                "UPDATE jobs SET record = ?, status = ?, last_access = ?, "
+                "finished_at = CASE WHEN ? THEN COALESCE(finished_at, ?) ELSE NULL END WHERE job_id = ?",
+                (json.dumps(record), status, now, status in FINISHED_STATUSES, now, job_id)
+            )
+        self._after_write()
+
+    def delete(self, job_id: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def list(self, status: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+             cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Newest jobs first, optionally filtered by status; see InMemoryJobStore.list."""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor is not None:
+            clauses.append("seq < ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT seq, job_id, record FROM jobs {where} ORDER BY seq DESC LIMIT ?", (*params, limit + 1)
+            ).fetchall()
+        page = [{"job_id": job_id, **json.loads(record)} for _, job_id, record in rows[:limit]]
+        return page, (rows[limit - 1][0] if len(rows) > limit else None)
+
+    def count(self, status: Optional[str] = None) -> int:
+        with self._lock:
+            if status is None:
+                return self._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop finished jobs past their TTL or over the size cap; returns how many."""
+        with self._lock, self._db:
+            expired = self._db.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).fetchall()
+            finished = self._db.execute("SELECT COUNT(*) FROM jobs WHERE finished_at IS NOT NULL").fetchone()[0]
+            excess = max(0, finished - len(expired) - self.max_finished)
+            overflow = self._db.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at >= ? "
+                "ORDER BY last_access LIMIT ?", (time.time() - self.ttl_seconds, excess)
+            ).fetchall() if excess else []
+            evicted = [row[0] for row in expired + overflow]
+            self._db.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in evicted])
+        for job_id in evicted:
+            for callback in self.on_evict:
+                callback(job_id)
+        return len(evicted)
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % EVICTION_INTERVAL == 0:
+            self.evict()
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """
+    Return the process-wide job store: SQLite when JOB_STORE_PATH is set,
+    in-memory otherwise. JOB_TTL_SECONDS and JOB_MAX_FINISHED control how
+    long finished jobs are kept.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            ttl_seconds = float(os.getenv('JOB_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+            max_finished = int(os.getenv('JOB_MAX_FINISHED', DEFAULT_MAX_FINISHED))
+            path = os.getenv('JOB_STORE_PATH')
+            if path:
+                _shared_store = SQLiteJobStore(path, ttl_seconds=ttl_seconds, max_finished=max_finished)
+            else:
+                _shared_store = InMemoryJobStore(ttl_seconds=ttl_seconds, max_finished=max_finished)
+        return _shared_store
@@ -0,0 +1,116 @@
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+from .records import json_default, plain
+
+DEFAULT_FLUSH_EVERY = 64
+DEFAULT_FLUSH_INTERVAL = 0.5
+# "never": leave durability to the OS, "flush": fsync after every group
+# commit, "always": fsync after every entry
+FSYNC_POLICIES = ("never", "flush", "always")
+
+
+def _dumps_json(entry: Dict[str, Any]) -> bytes:
+    return (json.dumps(plain(entry), default=json_default) + "\n").encode("utf-8")
+
+
+def _dumps_orjson(entry: Dict[str, Any]) -> bytes:
+    # Records become dicts first (orjson would serialize unset LogEntry fields too)
+    return orjson.dumps(plain(entry), default=json_default,
+                        option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+class JsonlLogSink:
+    """
+    Append-only JSONL writer with group commit.
+
+    The file is opened once (on the first write) and kept open. Serialized
+    entries are buffered and written together once `flush_every` entries are
+    pending or `flush_interval` seconds have passed since the last flush,
+    whichever comes first. `close()` flushes whatever is left, so callers
+    must close the sink when the job finishes or fails.
+    """
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, fsync: str = None, serializer: str = "auto"):
+        fsync = fsync or os.getenv("LOG_FSYNC", "never")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        if serializer not in ("auto", "json", "orjson"):
+            raise ValueError(f"Unknown serializer '{serializer}'")
+        if serializer == "orjson" and orjson is None:
+            raise ValueError("The orjson serializer requires the orjson package")
+
+        self.path = path
+        self.flush_every = 1 if fsync == "always" else max(1, int(flush_every))
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._dumps = _dumps_orjson if orjson is not None and serializer != "json" else _dumps_json
+
+        self._file = None
+        self._buffer: List[bytes] = []
+        self._last_flush = time.monotonic()
+        self.entries_written = 0
+        self.flushes = 0
+
+    def write(self, entry: Dict[str, Any]):
+        self._buffer.append(self._dumps(entry))
+        if (len(self._buffer) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write out buffered entries (one write call) and apply the fsync policy."""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(self._buffer))
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self.entries_written += len(self._buffer)
+        self.flushes += 1
+        self._buffer.clear()
+
+    @property
+    def offset(self) -> int:
+        """Size of the file in bytes; after a flush it covers every entry written."""
+        if self._file is not None:
+            return self._file.tell()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MemoryLogSink:
+    """Keeps entries in a list instead of a file (tests and benchmarks)."""
+
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self.closed = False
+
+    def write(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+
+    @property
+    def offset(self) -> int:
+        return len(self.entries)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
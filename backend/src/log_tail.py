@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+from array import array
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+# Most recently appended entries kept parsed per job; older pages are read
+# back from the file
+DEFAULT_WINDOW = 256
+
+
+class JobLogTail:
+    """
+    Incrementally indexed view of one job's JSONL log.
+
+    Each refresh reads only the bytes appended since the previous one, parses
+    the complete lines among them and updates the progress counters, so a
+    poll costs O(new entries) instead of re-reading the whole history. A
+    trailing partial line is left for the next refresh. If the file is
+    replaced or truncated, the tail starts over.
+
+    Only the byte offset of each entry is kept for the whole log, plus the
+    last `window` entries parsed; older pages are read back from the file
+    on demand, so memory does not grow with the length of the run.
+    """
+
+    def __init__(self, path: str, window: int = DEFAULT_WINDOW):
+        self.path = path
+        self.window = max(0, int(window))
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, file_id):
+        self._file_id = file_id
+        self.offset = 0
+        # Start of each entry's line in the file, by sequence number
+        self._offsets = array("q")
+        self._recent: deque = deque(maxlen=self.window)
+        self.total_steps = 0
+        self.completed_steps = 0
+
+    def refresh(self):
+        """Index whatever has been appended to the log since the last call."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id or stat.st_size < self.offset:
+                self._reset(file_id)
+            if stat.st_size == self.offset:
+                return
+
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read(stat.st_size - self.offset)
+
+            complete = chunk.rfind(b"\n") + 1
+            if complete == 0:
+                return  # Only a partial line so far
+
+            position = self.offset
+            for line in chunk[:complete].splitlines(keepends=True):
+                start = position
+                position += len(line)
+                entry = _parse(line)
+                if entry is None:
+                    continue
+                self._count(entry)
+                self._offsets.append(start)
+                self._recent.append(entry)
+            self.offset += complete
+
+    def _count(self, entry: Dict[str, Any]):
+        step = entry.get("step")
+        if step in ("INITIALIZE", "RESUME"):
+            self.total_steps = entry.get("campaign_summary", {}).get("total_steps", 0)
+        elif step == "ACT" and entry.get("sub_step") == "completed":
+            self.completed_steps += 1
+
+    def read(self, cursor: int = 0, limit: int = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Entries from sequence number `cursor` on (at most `limit`), and the next cursor."""
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        self.refresh()
+        with self._lock:
+            total = len(self._offsets)
+            cursor = max(0, min(cursor, total))
+            end = total if limit is None else min(total, cursor + limit)
+            first_recent = total - len(self._recent)
+            if cursor >= first_recent:
+                return [self._recent[seq - first_recent] for seq in range(cursor, end)], end
+            return self._read_file(cursor, end), end
+
+    def _read_file(self, cursor: int, end: int) -> List[Dict[str, Any]]:
+        """Entries cursor..end-1, parsed again from their lines in the file."""
+        if cursor == end:
+            return []
+        stop = self._offsets[end] if end < len(self._offsets) else self.offset
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[cursor])
+            chunk = f.read(stop - self._offsets[cursor])
+        # Lines skipped when indexing (blank or invalid) are skipped again
+        entries = [entry for entry in map(_parse, chunk.splitlines()) if entry is not None]
+        return entries[:end - cursor]
+
+    def release(self):
+        """Drop the parsed entries (a finished job read to the end); the index stays."""
+        with self._lock:
+            self._recent.clear()
+
+    @property
+    def total_entries(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def progress(self) -> float:
+        if self.total_steps <= 0:
+            return 0
+        return min(100, (self.completed_steps / self.total_steps) * 100)
+
+
+def _parse(line: bytes):
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+class LogTailRegistry:
+    """One JobLogTail per job, created on first use."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._tails: Dict[str, JobLogTail] = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str, path: str) -> JobLogTail:
+        with self._lock:
+            tail = self._tails.get(job_id)
+            if tail is None or tail.path != path:
+                tail = self._tails[job_id] = JobLogTail(path, window=self.window)
+            return tail
+
+    def discard(self, job_id: str):
+        with self._lock:
+            self._tails.pop(job_id, None)
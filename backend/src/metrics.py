@@ -0,0 +1,131 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "adforge_phase_seconds": "Time spent per item in each agent phase",
+    "adforge_dataset_seconds": "Time spent loading and preparing datasets",
+    "gemini_request_seconds": "Gemini request latency by outcome, per attempt",
+    "gemini_retries_total": "Gemini requests retried after a retryable error",
+    "adforge_warmup_seconds": "Time the startup warm-up took to preload modules, dataset and client",
+    "adforge_response_cache_hits_total": "Gemini responses served from the response cache",
+    "adforge_response_cache_misses_total": "Response cache lookups that had to call Gemini",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Process-wide histograms, counters and gauges, rendered in the
+    Prometheus text exposition format. Recording is a bisect and a few
+    additions under a lock, cheap enough for per-step spans.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, count: int = 1, **labels):
+        """Record `count` observations of `seconds` each."""
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            histogram.counts[index] += count
+            histogram.sum += seconds * count
+            histogram.count += count
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Times the enclosed block into histogram `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_counter(self, name: str, value: float, **labels):
+        """Set a counter that is kept elsewhere (a running total) to its current value."""
+        with self._lock:
+            self._counters.setdefault(name, {})[_label_key(labels)] = value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets + (float("inf"),), histogram.counts):
+                        cumulative += bucket_count
+                        le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                        lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(metrics.items()):
+                    self._header(lines, name, kind)
+                    for key, value in series.items():
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines, name, kind):
+        if name in HELP:
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+_shared_registry: Optional[MetricsRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = MetricsRegistry()
+        return _shared_registry
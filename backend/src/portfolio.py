@@ -0,0 +1,201 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ad_simulator import CONVERSION_VALUE, build_observation_frame
+
+GROUP_FIELDS = ("campaign_channel", "campaign_type", "advertising_platform")
+# Spend quantile bins per group for fitting its response curve
+CURVE_BINS = 8
+# Fitted spend elasticities are kept in this range, so every curve shows
+# diminishing returns and the allocation has a unique optimum
+MIN_ELASTICITY = 0.05
+MAX_ELASTICITY = 0.95
+BISECTION_STEPS = 100
+# Spend multipliers at which each group's marginal ROI curve is reported
+CURVE_POINTS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+
+class PortfolioOptimizer:
+    """
+    Budget reallocation across campaign groups (channel x type x platform).
+
+    Each group's revenue is modelled as R(s) = a * s^b in its total spend s:
+    b is the slope of log revenue over log spend across the group's spend
+    quantiles, and a puts the curve through the group's current totals.
+    Maximizing total revenue for a fixed total spend equalizes marginal
+    revenue b * R(s) / s across groups; the common value (the Lagrange
+    multiplier) is found by bisection, evaluated for all groups at once.
+    Each group may move at most `max_shift` (a fraction) from its current
+    spend. `budget` is the total to allocate (default: current total spend).
+    """
+
+    def __init__(self, max_shift: float = 0.5, budget: Optional[float] = None):
+        if not 0 <= max_shift < 1:
+            raise ValueError("max_shift must be in [0, 1)")
+        self.max_shift = max_shift
+        self.budget = budget
+
+    def settings(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def fit_curves(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Per-group spend, revenue, row count and fitted elasticity, one row per group."""
+        data = frame.loc[:, list(GROUP_FIELDS) + ["ad_spend"]].copy()
+        data["revenue"] = frame["conversions"] * CONVERSION_VALUE
+        keys = list(GROUP_FIELDS)
+
+        # Mean spend and revenue per spend quantile bin, then a least-squares
+        # slope of log revenue on log spend per group, all from grouped sums
+        data["bin"] = np.minimum((data.groupby(keys, observed=True)["ad_spend"].rank(pct=True) * CURVE_BINS)
+                                 .astype("int64"), CURVE_BINS - 1)
+        bins = data.groupby(keys + ["bin"], observed=True)[["ad_spend", "revenue"]].mean()
+        x = np.log(bins["ad_spend"].clip(lower=1e-9))
+        y = np.log1p(bins["revenue"])
+        sums = pd.DataFrame({"n": 1, "x": x, "y": y, "xx": x * x, "xy": x * y}).groupby(level=keys).sum()
+        variance = sums["xx"] - sums["x"] ** 2 / sums["n"]
+        slope = (sums["xy"] - sums["x"] * sums["y"] / sums["n"]) / variance.where(variance > 1e-12)
+
+        groups = data.groupby(keys, observed=True).agg(rows=("ad_spend", "size"), spend=("ad_spend", "sum"),
+                                                       revenue=("revenue", "sum"))
+        groups["elasticity"] = slope.reindex(groups.index).fillna(MIN_ELASTICITY).clip(MIN_ELASTICITY, MAX_ELASTICITY)
+        return groups
+
+    def allocate(self, spend: np.ndarray, revenue: np.ndarray, elasticity: np.ndarray,
+                 budget: float) -> Tuple[np.ndarray, float]:
+        """Optimal spend per group for `budget` within the shift bounds, and the multiplier."""
+        scale = np.where(spend > 0, revenue / np.maximum(spend, 1e-9) ** elasticity, 0.0)
+        low = spend * (1 - self.max_shift)
+        high = spend * (1 + self.max_shift)
+        budget = min(max(budget, low.sum()), high.sum())
+
+        def spend_at(multiplier):
+            # Where marginal revenue a * b * s^(b - 1) equals the multiplier
+            with np.errstate(divide="ignore", over="ignore"):
+                unconstrained = (scale * elasticity / multiplier) ** (1 / (1 - elasticity))
+            return np.clip(unconstrained, low, high)
+
+        # Marginal revenue is decreasing in spend, so total spend is
+        # decreasing in the multiplier: bisect it in log space
+        with np.errstate(divide="ignore"):
+            marginal_high = scale * elasticity * np.maximum(low, 1e-9) ** (elasticity - 1)
+            marginal_low = scale * elasticity * np.maximum(high, 1e-9) ** (elasticity - 1)
+        lo = np.log(max(marginal_low[marginal_low > 0].min(initial=1.0), 1e-12)) - 1
+        hi = np.log(max(marginal_high.max(initial=1.0), 1e-12)) + 1
+        for _ in range(BISECTION_STEPS):
+            mid = (lo + hi) / 2
+            if spend_at(np.exp(mid)).sum() > budget:
+                lo = mid
+            else:
+                hi = mid
+        multiplier = float(np.exp(hi))
+        allocation = spend_at(multiplier)
+        # Spread any rounding remainder over the groups not at a bound
+        free = (allocation > low) & (allocation < high)
+        if free.any():
+            allocation[free] += (budget - allocation.sum()) / free.sum()
+        return allocation, multiplier
+
+    def optimize(self, frame: pd.DataFrame,
+                 decisions: Optional[Dict[Tuple[str, ...], Dict[str, int]]] = None) -> Dict[str, Any]:
+        """
+        The reallocation report: one entry per group (current and projected
+        spend, revenue, ROI and marginal ROI, plus the marginal ROI curve and
+        the per-row decisions made for the group), and portfolio totals.
+        """
+        groups = self.fit_curves(frame)
+        spend = groups["spend"].to_numpy(dtype="float64")
+        revenue = groups["revenue"].to_numpy(dtype="float64")
+        elasticity = groups["elasticity"].to_numpy()
+        budget = self.budget if self.budget is not None else float(spend.sum())
+        allocation, multiplier = self.allocate(spend, revenue, elasticity, budget)
+
+        ratio = np.divide(allocation, spend, out=np.ones_like(spend), where=spend > 0)
+        projected = revenue * ratio ** elasticity
+        points = np.asarray(CURVE_POINTS)
+        # Marginal ROI (%) of each group at each curve point: rows x points
+        curve = (elasticity[:, None] * np.divide(revenue, spend, out=np.zeros_like(spend), where=spend > 0)[:, None]
+                 * points[None, :] ** (elasticity[:, None] - 1) - 1) * 100
+
+        def roi(gain, cost):
+            return np.divide(gain - cost, cost, out=np.zeros_like(cost), where=cost > 0) * 100
+
+        current_roi = roi(revenue, spend)
+        projected_roi = roi(projected, allocation)
+        report_groups: List[Dict[str, Any]] = []
+        for index, key in enumerate(groups.index):
+            report_groups.append({
+                **dict(zip(GROUP_FIELDS, key)),
+                "rows": int(groups["rows"].iat[index]),
+                "spend": round(float(spend[index]), 2),
+                "revenue": round(float(revenue[index]), 2),
+                "roi": round(float(current_roi[index]), 2),
+                "elasticity": round(float(elasticity[index]), 4),
+                "marginal_roi": round(float(curve[index, CURVE_POINTS.index(1.0)]), 2),
+                "recommended_spend": round(float(allocation[index]), 2),
+                "spend_change_pct": round(float((ratio[index] - 1) * 100), 2),
+                "projected_revenue": round(float(projected[index]), 2),
+                "projected_roi": round(float(projected_roi[index]), 2),
+                "marginal_roi_curve": [{"spend_multiplier": point, "marginal_roi": round(float(value), 2)}
+                                       for point, value in zip(CURVE_POINTS, curve[index])],
+                "row_decisions": (decisions or {}).get(tuple(key), {})
+            })
+
+        total_projected = float(projected.sum())
+        return {
+            "groups": report_groups,
+            "totals": {
+                "groups": len(report_groups),
+                "spend": round(float(spend.sum()), 2),
+                "recommended_spend": round(float(allocation.sum()), 2),
+                "revenue": round(float(revenue.sum()), 2),
+                "projected_revenue": round(total_projected, 2),
+                "revenue_change": round(total_projected - float(revenue.sum()), 2),
+                "equalized_marginal_roi": round((multiplier - 1) * 100, 2)
+            },
+            "settings": self.settings()
+        }
+
+
+def portfolio_frame(simulator) -> pd.DataFrame:
+    """
+    The columns the optimizer needs for every row of the simulator's
+    dataset; a streaming simulator is read chunk by chunk.
+    """
+    columns = list(GROUP_FIELDS) + ["ad_spend", "conversions"]
+    observations = getattr(simulator, "observations", None)
+    if observations is not None:
+        return observations[columns]
+    return pd.concat([build_observation_frame(chunk)[columns] for chunk in simulator._iter_chunks()],
+                     ignore_index=True)
+
+
+class DecisionTally:
+    """Per-group counts of the actions the agent took, followed from its log entries."""
+
+    def __init__(self):
+        self.counts: Dict[Tuple[str, ...], Dict[str, int]] = {}
+        self._group = None
+
+    def track(self, entry: Dict[str, Any]):
+        step = entry.get("step")
+        if step == "OBSERVE":
+            data = entry.get("data", {})
+            self._group = tuple(data.get(field) for field in GROUP_FIELDS)
+        elif step == "ACT" and entry.get("sub_step") == "completed" and self._group is not None:
+            tool_name = entry.get("action_taken", {}).get("tool_name", "unknown")
+            counts = self.counts.setdefault(self._group, {})
+            counts[tool_name] = counts.get(tool_name, 0) + 1
+            self._group = None
+
+    def merge(self, summary: List[Dict[str, Any]]):
+        """Add the counts from another run's (or a checkpoint's) `summary()`."""
+        for item in summary:
+            counts = self.counts.setdefault(tuple(item["group"]), {})
+            for tool_name, count in item["counts"].items():
+                counts[tool_name] = counts.get(tool_name, 0) + count
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """The counts in JSON form: group keys are tuples, so each group is listed with its key."""
+        return [{"group": list(group), "counts": dict(counts)} for group, counts in self.counts.items()]
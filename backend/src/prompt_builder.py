@@ -0,0 +1,122 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from .records import Observation, json_default
+
+# "json": the whole observation as indented JSON (the original format);
+# "compact": selected fields as single-line JSON
+PROMPT_ENCODINGS = ("json", "compact")
+
+# Fields the decision criteria actually use, sent by the compact encoding
+COMPACT_FIELDS = (
+    "campaign_id", "ad_spend", "click_through_rate", "conversion_rate", "website_visits",
+    "pages_per_visit", "time_on_site", "conversions", "cost_per_click", "cost_per_conversion",
+    "roi", "campaign_channel", "campaign_type",
+)
+
+# Rough size of a Gemini token in characters of English/JSON text
+CHARS_PER_TOKEN = 4
+# gemini-2.5-flash list prices, USD per million tokens
+DEFAULT_INPUT_PRICE_PER_MTOK = 0.30
+DEFAULT_OUTPUT_PRICE_PER_MTOK = 2.50
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptBuilder:
+    """
+    Builds reasoning prompts from a fixed prefix, the encoded data and a
+    fixed suffix.
+
+    The static parts are assembled once, so a prompt is three string
+    concatenations. Keeping the meta-prompt as an unchanging prefix is also
+    what lets Gemini's implicit prefix caching apply. (It is too short for
+    explicit context caching, which needs at least 1024 tokens.)
+    """
+
+    def __init__(self, meta_prompt: str, batch_instructions: str, encoding: str = "json",
+                 fields: Optional[Sequence[str]] = None):
+        if encoding not in PROMPT_ENCODINGS:
+            raise ValueError(f"Unknown prompt encoding '{encoding}', expected one of {PROMPT_ENCODINGS}")
+        self.encoding = encoding
+        self.fields = tuple(fields) if fields else (COMPACT_FIELDS if encoding == "compact" else None)
+
+        self._single_prefix = f"\n{meta_prompt}\n\n--- CURRENT CAMPAIGN DATA ---\n"
+        self._single_suffix = "\n--- END OF DATA ---\n\nProvide your reasoning and next action as JSON:\n"
+        self._batch_prefix = f"\n{batch_instructions}\n\n--- CURRENT CAMPAIGN DATA ("
+        self._batch_suffix = ("\n--- END OF DATA ---\n\n"
+                              "Provide your reasoning and next action for every campaign as a JSON array:\n")
+        self.prefix_tokens = estimate_tokens(self._single_prefix)
+
+        # Responses depend on what the model was shown, so a non-default
+        # encoding gets its own response cache entries
+        self.cache_scope = "" if encoding == "json" and self.fields is None else \
+            f"\n[{encoding}:{','.join(self.fields)}]"
+
+    def _select(self, observation: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fields is None:
+            return observation.to_dict() if type(observation) is Observation else observation
+        return {field: observation.get(field) for field in self.fields}
+
+    def encode(self, observation: Dict[str, Any]) -> str:
+        if self.encoding == "compact":
+            return json.dumps(self._select(observation), separators=(",", ":"), default=json_default)
+        return json.dumps(self._select(observation), indent=2, default=json_default)
+
+    def build(self, observation: Dict[str, Any]) -> str:
+        return self._single_prefix + self.encode(observation) + self._single_suffix
+
+    def build_batch(self, observations: List[Dict[str, Any]]) -> str:
+        """
+        Several observations as a pipe-separated table, header row first.
+        campaign_id always leads: it is how batch decisions are matched to rows.
+        """
+        columns = ["campaign_id"] + [column for column in self.fields or observations[0].keys()
+                                     if column != "campaign_id"]
+        rows = ["|".join(columns)]
+        for observation in observations:
+            values = [observation.get(column) for column in columns]
+            rows.append("|".join("" if value is None else str(value) for value in values))
+        table = "\n".join(rows)
+        return f"{self._batch_prefix}{len(observations)} campaigns) ---\n{table}{self._batch_suffix}"
+
+
+class TokenUsage:
+    """
+    Estimated Gemini token usage and cost of one job. Prices come from
+    GEMINI_INPUT_PRICE_PER_MTOK / GEMINI_OUTPUT_PRICE_PER_MTOK (USD per
+    million tokens).
+    """
+
+    def __init__(self):
+        self.input_price = float(os.getenv('GEMINI_INPUT_PRICE_PER_MTOK', DEFAULT_INPUT_PRICE_PER_MTOK))
+        self.output_price = float(os.getenv('GEMINI_OUTPUT_PRICE_PER_MTOK', DEFAULT_OUTPUT_PRICE_PER_MTOK))
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, prompt: str, response: str) -> Dict[str, int]:
+        """Count one call; returns its estimated token counts."""
+        tokens = {"input": estimate_tokens(prompt), "output": estimate_tokens(response)}
+        self.calls += 1
+        self.input_tokens += tokens["input"]
+        self.output_tokens += tokens["output"]
+        return tokens
+
+    def merge(self, summary: Dict[str, Any]):
+        """Add the counts from another job's (or shard's) `summary()`."""
+        self.calls += summary["calls"]
+        self.input_tokens += summary["input_tokens"]
+        self.output_tokens += summary["output_tokens"]
+
+    def summary(self) -> Dict[str, Any]:
+        cost = (self.input_tokens * self.input_price + self.output_tokens * self.output_price) / 1_000_000
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "estimated_cost_usd": round(cost, 6)
+        }
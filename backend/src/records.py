@@ -0,0 +1,163 @@
+from collections.abc import Mapping, MutableMapping
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import Any, Dict, Optional
+
+
+@dataclass(slots=True, eq=False)
+class Observation(Mapping):
+    """
+    One campaign observation (a dataset row), stored in slots instead of a
+    23-key dict. It reads like a read-only dict (observation["roi"],
+    .get(), **observation), so code written for dicts keeps working;
+    `to_dict()` is for serializing it.
+    """
+    date: str
+    campaign_id: str
+    ad_spend: float
+    click_through_rate: float
+    conversion_rate: float
+    website_visits: int
+    pages_per_visit: float
+    time_on_site: float
+    social_shares: int
+    email_opens: int
+    email_clicks: int
+    conversions: int
+    campaign_channel: str
+    campaign_type: str
+    advertising_platform: str
+    customer_age: int
+    customer_gender: str
+    customer_income: int
+    previous_purchases: int
+    loyalty_points: int
+    cost_per_click: float
+    cost_per_conversion: Optional[float]
+    roi: float
+
+    def __getitem__(self, key):
+        if key in _OBSERVATION_FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    # Direct versions of the Mapping mixins, which go through __getitem__
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _OBSERVATION_FIELD_SET else default
+
+    def __contains__(self, key):
+        return key in _OBSERVATION_FIELD_SET
+
+    def __iter__(self):
+        return iter(OBSERVATION_FIELDS)
+
+    def __len__(self):
+        return len(OBSERVATION_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The plain dict, for serializing."""
+        return dict(zip(OBSERVATION_FIELDS, _observation_values(self)))
+
+
+class _Unset:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<unset>"
+
+    def __reduce__(self):
+        return "UNSET"  # Unpickles as the module's singleton
+
+
+# Default of the LogEntry fields an entry does not have
+UNSET = _Unset()
+
+
+# Key order of an observation
+OBSERVATION_FIELDS = tuple(field.name for field in fields(Observation))
+_OBSERVATION_FIELD_SET = frozenset(OBSERVATION_FIELDS)
+_observation_values = attrgetter(*OBSERVATION_FIELDS)
+
+
+@dataclass(slots=True, eq=False)
+class LogEntry(MutableMapping):
+    """
+    One log entry of an OODA step (OBSERVE, ORIENT, DECIDE or ACT), stored
+    in slots. Only the fields that were set belong to the entry, in field
+    order, so it behaves like the dict it replaces; `to_dict()` is for
+    serializing it. Run-level entries (INITIALIZE, COMPLETE, ...) are rare
+    and stay plain dicts.
+    """
+    step: str
+    step_number: int
+    sub_step: Any = UNSET
+    message: Any = UNSET
+    data: Any = UNSET
+    batch_size: Any = UNSET
+    prompt: Any = UNSET
+    cached: Any = UNSET
+    repaired: Any = UNSET
+    batched: Any = UNSET
+    requeried: Any = UNSET
+    tokens: Any = UNSET
+    batch_tokens: Any = UNSET
+    rule_based: Any = UNSET
+    ai_response: Any = UNSET
+    decision: Any = UNSET
+    reasoning: Any = UNSET
+    confidence: Any = UNSET
+    action_taken: Any = UNSET
+    result: Any = UNSET
+    timestamp: Any = UNSET
+
+    def __getitem__(self, key):
+        if key in _LOG_ENTRY_FIELD_SET:
+            value = getattr(self, key)
+            if value is not UNSET:
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in _LOG_ENTRY_FIELD_SET:
+            raise KeyError(f"LogEntry has no field '{key}'")
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        self[key]  # KeyError if not set
+        setattr(self, key, UNSET)
+
+    def __iter__(self):
+        return (name for name, value in zip(LOG_ENTRY_FIELDS, _log_entry_values(self)) if value is not UNSET)
+
+    def __len__(self):
+        return sum(value is not UNSET for value in _log_entry_values(self))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The set fields as a plain dict, for serializing."""
+        return {name: value for name, value in zip(LOG_ENTRY_FIELDS, _log_entry_values(self)) if value is not UNSET}
+
+
+LOG_ENTRY_FIELDS = tuple(field.name for field in fields(LogEntry))
+_LOG_ENTRY_FIELD_SET = frozenset(LOG_ENTRY_FIELDS)
+_log_entry_values = attrgetter(*LOG_ENTRY_FIELDS)
+
+
+def plain(entry: Any) -> Any:
+    """
+    A log entry as plain dicts, its observation included, for a JSON encoder.
+    Converting up front is cheaper than the encoder calling json_default
+    for the entry and again for its data.
+    """
+    if type(entry) is LogEntry:
+        entry = entry.to_dict()
+        data = entry.get("data")
+        if type(data) is Observation:
+            entry["data"] = data.to_dict()
+    return entry
+
+
+def json_default(value: Any) -> Dict[str, Any]:
+    """`default` hook for json/orjson: serializes records as the dicts they stand for."""
+    if isinstance(value, (Observation, LogEntry)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
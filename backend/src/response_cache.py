@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .records import json_default
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_DISK_ENTRIES = 200_000
+# Expired/oversized disk rows are purged once every this many writes
+DISK_PRUNE_INTERVAL = 256
+
+
+def _canonical_default(value: Any) -> Any:
+    """Observation records key like the dicts they stand for; anything else as str()."""
+    try:
+        return json_default(value)
+    except TypeError:
+        return str(value)
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of raw Gemini responses.
+
+    Keys hash the model name, the meta-prompt and a canonical form of the
+    observation, so reruns over the same data (or A/B runs that share a
+    meta-prompt) skip the API call. Entries live in an in-memory LRU tier and,
+    when `disk_path` is set, in a SQLite tier that survives restarts. Both
+    tiers honour `ttl_seconds`; each tier is capped by entry count.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, disk_path: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None, max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self.disk_path = disk_path
+
+        self._memory = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model_name: str, meta_prompt: str, observation: Dict[str, Any]) -> str:
+        """Stable key: key order and whitespace in the observation do not matter."""
+        canonical = json.dumps([model_name, meta_prompt, observation], sort_keys=True,
+                               separators=(",", ":"), default=_canonical_default)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, row[0], row[1])
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return row[0]
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a response in every configured tier."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._db.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= DISK_PRUNE_INTERVAL:
+                    self._prune_disk(now)
+
+    def _remember(self, key: str, value: str, created_at: float):
+        if self.max_entries == 0:
+            return
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _prune_disk(self, now: float):
+        """Drop expired rows, then the least recently used rows over the size cap."""
+        self._writes_since_prune = 0
+        if self.ttl_seconds is not None:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        excess = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)", (excess,)
+            )
+            self._counters["evictions"] += excess
+        self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes (served by /health)."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            stats = {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self._db is not None
+            }
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return stats
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Return the process-wide response cache, configured from the environment:
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_PATH (enables the SQLite tier),
+    RESPONSE_CACHE_TTL_SECONDS and RESPONSE_CACHE_MAX_DISK_ENTRIES.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            ttl = os.getenv('RESPONSE_CACHE_TTL_SECONDS')
+            _shared_cache = ResponseCache(
+                max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                disk_path=os.getenv('RESPONSE_CACHE_PATH') or None,
+                ttl_seconds=float(ttl) if ttl else None,
+                max_disk_entries=int(os.getenv('RESPONSE_CACHE_MAX_DISK_ENTRIES', DEFAULT_MAX_DISK_ENTRIES))
+            )
+        return _shared_cache
@@ -0,0 +1,224 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# The tools offered in the meta-prompt
+TOOL_NAMES = (
+    "increase_budget", "decrease_budget", "pause_campaign",
+    "optimize_targeting", "continue_monitoring", "request_human_input",
+)
+DEFAULT_CONFIDENCE = 0.5
+
+_CLOSERS = {"{": "}", "[": "]"}
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_PYTHON_LITERALS = re.compile(r"\b(True|False|None)\b")
+_PYTHON_JSON = {"True": "true", "False": "false", "None": "null"}
+_DECODER = json.JSONDecoder()
+# Strings (possibly unterminated), comments and brackets, in scan order
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"?|//[^\n]*|/\*.*?(?:\*/|$)|[{}\[\]]', re.S)
+_CLOSED_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+# A key whose value was cut off, at the end of a truncated object
+_DANGLING_KEY = re.compile(r'([,{])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+# The unfinished end of a number cut off mid-way ("0.", "1e", "-")
+_PARTIAL_NUMBER = re.compile(r'(?<=\d)[.eE+-]+$|(?<=:)\s*-$')
+# What may follow the last token of a truncated value: separators and a bare scalar
+_SCALAR_TAIL = re.compile(r'[\s,:]*(?:-?[\d.eE+]+|true|false|null|True|False|None)?')
+
+
+class ResponseParseError(ValueError):
+    """The model response holds no usable decision."""
+
+
+def extract_json(text: str, openers: str = "{[") -> Tuple[str, bool]:
+    """
+    The first balanced JSON object or array in `text` (fences, prose and
+    trailing remarks around it are ignored), and whether it had to be
+    closed because the response was cut off. Brackets inside strings are
+    skipped; `//` and `/* */` comments outside strings are dropped.
+    """
+    start = next((i for i, char in enumerate(text) if char in openers), -1)
+    if start < 0:
+        raise ResponseParseError("No JSON object in response")
+
+    pieces = []
+    stack = []
+    pos = last_end = start
+    for match in _TOKEN.finditer(text, start):
+        token = match.group()
+        last_end = match.end()
+        if token[0] == "/":
+            pieces.append(text[pos:match.start()])
+            pos = match.end()
+        elif token[0] == '"':
+            if match.end() == len(text) and not _CLOSED_STRING.fullmatch(token):
+                # Cut off inside a string: keep what came before any closing fence
+                pieces.append(text[pos:match.start()] + token.split("```")[0].rstrip() + '"')
+                pos = len(text)
+        elif token in _CLOSERS:
+            stack.append(_CLOSERS[token])
+        elif not stack or stack.pop() != token:
+            raise ResponseParseError("Unbalanced brackets in response")
+        elif not stack:
+            pieces.append(text[pos:match.end()])
+            return "".join(pieces), False
+
+    # Truncated: keep at most a bare scalar after the last token, drop a
+    # dangling key or separator, then close whatever is still open
+    if pos < len(text):
+        pieces.append(text[pos:last_end] + _SCALAR_TAIL.match(text, last_end).group())
+    body = _PARTIAL_NUMBER.sub("", "".join(pieces).rstrip())
+    body = _DANGLING_KEY.sub(lambda match: match.group(1).replace(",", ""), body)
+    return body.rstrip(",:") + "".join(reversed(stack)), True
+
+
+def loads_lenient(candidate: str) -> Tuple[Any, bool]:
+    """
+    json.loads (allowing raw newlines in strings), retried after fixing
+    trailing commas and Python literals outside strings; returns (value,
+    repaired).
+    """
+    try:
+        return json.loads(candidate, strict=False), False
+    except json.JSONDecodeError:
+        pass
+    # String contents are kept as they are ("None of the signals are True positives,]")
+    pieces = []
+    pos = 0
+    for match in _CLOSED_STRING.finditer(candidate):
+        pieces += [_repair_syntax(candidate[pos:match.start()]), match.group()]
+        pos = match.end()
+    pieces.append(_repair_syntax(candidate[pos:]))
+    repaired = "".join(pieces)
+    try:
+        return json.loads(repaired, strict=False), True
+    except json.JSONDecodeError as e:
+        raise ResponseParseError(f"Invalid JSON in response: {e}") from e
+
+
+def _repair_syntax(text: str) -> str:
+    """Drop trailing commas and turn Python literals into JSON in text between strings."""
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    return _PYTHON_LITERALS.sub(lambda match: _PYTHON_JSON[match.group(1)], text)
+
+
+def normalize_tool_name(name: Any) -> Optional[str]:
+    if not isinstance(name, str):
+        return None
+    name = name.strip().strip("`'\"").lower().replace("-", "_").replace(" ", "_")
+    return name if name in TOOL_NAMES else None
+
+
+def _confidence(value: Any) -> Tuple[float, bool]:
+    """Confidence as a 0-1 float (accepts "85%" and 85); returns (value, repaired)."""
+    original = value
+    if isinstance(value, str):
+        try:
+            value = float(value.strip().rstrip("%"))
+        except ValueError:
+            return DEFAULT_CONFIDENCE, True
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return DEFAULT_CONFIDENCE, True
+    if value > 1:
+        value = value / 100
+    value = min(1.0, max(0.0, float(value)))
+    return value, value != original
+
+
+def validate_decision(data: Any) -> Tuple[Dict[str, Any], bool]:
+    """
+    Check a parsed response against the decision schema and fill in what
+    can be inferred: a bare tool name as the action, the tool name at the
+    top level, tool names in other spellings, missing parameters,
+    confidence as a percentage. Returns (decision, repaired).
+    """
+    if not isinstance(data, dict):
+        raise ResponseParseError("Decision is not a JSON object")
+    repaired = False
+    action = data.get("action")
+    if isinstance(action, str):
+        action, repaired = {"tool_name": action}, True
+    elif action is None and "tool_name" in data:
+        action, repaired = {key: data[key] for key in ("tool_name", "parameters", "expected_outcome") if key in data}, True
+    if not isinstance(action, dict):
+        raise ResponseParseError("Decision has no action")
+
+    tool_name = normalize_tool_name(action.get("tool_name"))
+    if tool_name is None:
+        raise ResponseParseError(f"Unknown tool '{action.get('tool_name')}'")
+    repaired |= tool_name != action.get("tool_name")
+    parameters = action.get("parameters")
+    if not isinstance(parameters, dict):
+        parameters, repaired = {}, repaired or "parameters" in action
+
+    confidence, confidence_repaired = _confidence(data.get("confidence", DEFAULT_CONFIDENCE))
+    decision = {
+        **data,
+        "reasoning": data.get("reasoning") if isinstance(data.get("reasoning"), str) else "",
+        "confidence": confidence,
+        "action": {**action, "tool_name": tool_name, "parameters": parameters,
+                   "expected_outcome": action.get("expected_outcome", "")}
+    }
+    return decision, repaired or confidence_repaired
+
+
+def _load_first(text: str, openers: str) -> Tuple[Any, bool]:
+    """
+    The first JSON value in `text` starting with one of `openers`; returns
+    (value, repaired). Well-formed JSON is decoded straight from the text by
+    the C decoder; only malformed responses take the slower repair path.
+    """
+    start = next((i for i, char in enumerate(text) if char in openers), -1)
+    if start >= 0:
+        try:
+            return _DECODER.raw_decode(text, start)[0], False
+        except json.JSONDecodeError:
+            pass
+    candidate, truncated = extract_json(text, openers)
+    data, repaired = loads_lenient(candidate)
+    return data, truncated or repaired
+
+
+def parse_decision(text: str) -> Tuple[Dict[str, Any], bool]:
+    """A validated single decision from a raw model response; returns (decision, repaired)."""
+    data, repaired = _load_first(text, "{")
+    decision, normalized = validate_decision(data)
+    return decision, repaired or normalized
+
+
+def parse_batch(text: str) -> Tuple[List[Any], bool]:
+    """
+    The list of items in a batch response (an array, or an object holding
+    one under "decisions", or a single decision object); returns
+    (items, repaired). Items are not validated.
+    """
+    data, repaired = _load_first(text, "{[")
+    if isinstance(data, dict):
+        data = data.get("decisions", [data])
+    if not isinstance(data, list):
+        raise ResponseParseError("Batch response is not a JSON array")
+    return data, repaired
+
+
+class ParseStats:
+    """Per-job counts of clean, repaired and unusable model responses."""
+
+    def __init__(self):
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def record(self, repaired: bool = False, failed: bool = False):
+        if failed:
+            self.failed += 1
+        elif repaired:
+            self.repaired += 1
+        else:
+            self.parsed += 1
+
+    def merge(self, summary: Dict[str, int]):
+        self.parsed += summary["parsed"]
+        self.repaired += summary["repaired"]
+        self.failed += summary["failed"]
+
+    def summary(self) -> Dict[str, int]:
+        return {"parsed": self.parsed, "repaired": self.repaired, "failed": self.failed}
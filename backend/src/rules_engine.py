@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+# Actions the rules can take on their own, in code order
+RULE_ACTIONS = ("increase_budget", "decrease_budget", "pause_campaign", "optimize_targeting")
+# Code for rows the rules cannot settle; they go to Gemini
+ESCALATE = -1
+INCREASE, DECREASE, PAUSE, OPTIMIZE = range(len(RULE_ACTIONS))
+
+RULE_CONFIDENCE = 0.9
+
+REASONING = {
+    "increase_budget": "ROI of {roi}% is above the {high_roi}% threshold with healthy click-through "
+                       "and conversion costs: scale up spend.",
+    "decrease_budget": "ROI of {roi}% is below the {low_roi}% threshold: reduce spend to limit losses.",
+    "pause_campaign": "ROI of {roi}% is at or below {pause_roi}%: the campaign is losing almost all of its spend.",
+    "optimize_targeting": "ROI of {roi}% is acceptable, but click-through rate ({click_through_rate}) "
+                          "or cost per conversion ({cost_per_conversion}) misses its target: adjust targeting.",
+}
+EXPECTED_OUTCOME = {
+    "increase_budget": "More conversions at a similar return",
+    "decrease_budget": "Lower losses while performance is reviewed",
+    "pause_campaign": "No further spend until the campaign is reviewed",
+    "optimize_targeting": "Better click-through and cheaper conversions",
+}
+
+
+class RulesEngine:
+    """
+    Vectorized version of the meta-prompt's decision criteria.
+
+    `classify` scores a whole block of observations at once and returns an
+    action code per row. A row gets a local decision only when its signals
+    agree and sit clearly away from every threshold (by `roi_margin` points
+    of ROI and `ctr_margin` of click-through rate). Conflicting, borderline
+    or unremarkable rows are marked ESCALATE and left to Gemini.
+    """
+
+    def __init__(self, high_roi: float = 20.0, low_roi: float = -10.0, pause_roi: float = -90.0,
+                 max_cost_per_conversion: float = 30.0, min_click_through_rate: float = 0.02,
+                 roi_margin: float = 2.0, ctr_margin: float = 0.002):
+        self.high_roi = high_roi
+        self.low_roi = low_roi
+        self.pause_roi = pause_roi
+        self.max_cost_per_conversion = max_cost_per_conversion
+        self.min_click_through_rate = min_click_through_rate
+        self.roi_margin = roi_margin
+        self.ctr_margin = ctr_margin
+
+    def thresholds(self) -> Dict[str, float]:
+        return dict(vars(self))
+
+    def classify(self, roi, click_through_rate, cost_per_conversion) -> np.ndarray:
+        """Action codes (indexes into RULE_ACTIONS, or ESCALATE) for arrays of metrics."""
+        roi = np.asarray(roi, dtype=float)
+        ctr = np.asarray(click_through_rate, dtype=float)
+        cost = np.asarray(cost_per_conversion, dtype=float)  # NaN: no conversions
+
+        borderline = np.abs(ctr - self.min_click_through_rate) < self.ctr_margin
+        for threshold in (self.high_roi, self.low_roi, self.pause_roi):
+            borderline |= np.abs(roi - threshold) < self.roi_margin
+        low_ctr = ctr < self.min_click_through_rate
+        costly = cost > self.max_cost_per_conversion
+        high = roi > self.high_roi
+        low = roi < self.low_roi
+
+        return np.select(
+            [borderline, high & (low_ctr | costly), high, low & low_ctr, roi <= self.pause_roi, low, low_ctr | costly],
+            [ESCALATE, ESCALATE, INCREASE, ESCALATE, PAUSE, DECREASE, OPTIMIZE],
+            default=ESCALATE
+        )
+
+    def classify_observations(self, observations: List[Dict[str, Any]]) -> np.ndarray:
+        return self.classify(
+            [observation["roi"] for observation in observations],
+            [observation["click_through_rate"] for observation in observations],
+            [observation["cost_per_conversion"] for observation in observations]
+        )
+
+    def decide(self, observations: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        A decision per observation, shaped like a parsed Gemini response, or
+        None where the row has to be escalated.
+        """
+        codes = self.classify_observations(observations) if observations else []
+        return [None if code == ESCALATE else self._decision(RULE_ACTIONS[code], observation)
+                for code, observation in zip(codes, observations)]
+
+    def _decision(self, tool_name: str, observation: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "reasoning": REASONING[tool_name].format(**self.thresholds(), **observation),
+            "confidence": RULE_CONFIDENCE,
+            "action": {
+                "tool_name": tool_name,
+                "parameters": {},
+                "expected_outcome": EXPECTED_OUTCOME[tool_name]
+            }
+        }
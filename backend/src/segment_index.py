@@ -0,0 +1,200 @@
+import itertools
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .ad_simulator import CONVERSION_VALUE, STREAM_CHUNK_ROWS, build_observation_frame
+from .dataset_registry import get_dataset_registry
+
+# Segment dimension (query parameter) -> observation field
+DIMENSIONS = {
+    "channel": "campaign_channel",
+    "type": "campaign_type",
+    "platform": "advertising_platform",
+    "gender": "customer_gender",
+    "age_band": "customer_age",
+    "income_band": "customer_income",
+}
+# Banded dimensions: (upper bounds, labels); the last band is open-ended
+BANDS = {
+    "age_band": ((25, 35, 45, 55, 65), ("<25", "25-34", "35-44", "45-54", "55-64", "65+")),
+    "income_band": ((30_000, 50_000, 75_000, 100_000, 150_000),
+                    ("<30k", "30k-50k", "50k-75k", "75k-100k", "100k-150k", "150k+")),
+}
+MEASURES = ("rows", "spend", "conversions", "visits", "revenue")
+# Slot 0 of every dimension holds the total over all of its values
+ALL = 0
+DEFAULT_MAX_JOB_INDEXES = 64
+
+
+class SegmentIndex:
+    """
+    Spend, conversions, visits and revenue summed per segment, in one dense
+    NumPy cube with an axis per dimension. Every axis has an ALL slot, so
+    the totals for any combination of filters are already in the cube and
+    a query is a single lookup. Adding an observation updates the 2^d cells
+    it contributes to; categorical values seen for the first time grow
+    their axis.
+    """
+
+    def __init__(self):
+        self.labels: Dict[str, List[str]] = {dim: list(BANDS[dim][1]) if dim in BANDS else []
+                                             for dim in DIMENSIONS}
+        self._codes = {dim: {label: code for code, label in enumerate(labels, start=1)}
+                       for dim, labels in self.labels.items()}
+        self.cube = np.zeros(tuple(len(labels) + 1 for labels in self.labels.values()) + (len(MEASURES),))
+        # Which dimensions each of the cells an observation adds to keeps (the rest are ALL)
+        self._keep = np.array(list(itertools.product((False, True), repeat=len(DIMENSIONS))))
+        self._lock = threading.Lock()
+
+    def _code(self, dim: str, value: Any) -> int:
+        """Cube slot of a value, adding a new label (and slot) for unseen categories."""
+        if dim in BANDS:
+            return bisect_right(BANDS[dim][0], value) + 1
+        label = str(value)
+        code = self._codes[dim].get(label)
+        if code is None:
+            self.labels[dim].append(label)
+            code = self._codes[dim][label] = len(self.labels[dim])
+            pad = [(0, 0)] * self.cube.ndim
+            pad[list(DIMENSIONS).index(dim)] = (0, 1)
+            self.cube = np.pad(self.cube, pad)
+        return code
+
+    def add(self, observation: Dict[str, Any]):
+        conversions = observation["conversions"]
+        values = np.array([1, observation["ad_spend"], conversions, observation["website_visits"],
+                           conversions * CONVERSION_VALUE], dtype="float64")
+        with self._lock:
+            codes = np.array([self._code(dim, observation.get(field)) for dim, field in DIMENSIONS.items()])
+            cells = np.where(self._keep, codes, ALL)
+            flat = np.ravel_multi_index(cells.T, self.cube.shape[:-1])
+            self.cube.reshape(-1, len(MEASURES))[flat] += values
+
+    def add_frame(self, frame: pd.DataFrame):
+        """Add every row of an observation frame (see build_observation_frame) at once."""
+        conversions = frame["conversions"].to_numpy(dtype="float64")
+        measures = (np.ones(len(frame)), frame["ad_spend"].to_numpy(dtype="float64"), conversions,
+                    frame["website_visits"].to_numpy(dtype="float64"), conversions * CONVERSION_VALUE)
+        with self._lock:
+            codes = []
+            for dim, field in DIMENSIONS.items():
+                if dim in BANDS:
+                    codes.append(np.searchsorted(BANDS[dim][0], frame[field].to_numpy(), side="right") + 1)
+                else:
+                    value_codes, uniques = pd.factorize(frame[field])
+                    codes.append(np.array([self._code(dim, value) for value in uniques], dtype="int64")[value_codes])
+            shape = self.cube.shape[:-1]
+            flat = np.ravel_multi_index(codes, shape)
+            size = int(np.prod(shape))
+            delta = np.stack([np.bincount(flat, weights=weights, minlength=size) for weights in measures], axis=-1)
+            delta = delta.reshape(self.cube.shape)
+            # Fill the ALL slots axis by axis; later axes sum over earlier ALL slots too
+            for axis in range(len(shape)):
+                index = (slice(None),) * axis + (ALL,)
+                delta[index] = delta.sum(axis=axis)
+            self.cube += delta
+
+    def _slot(self, dim: str, label: Optional[str]) -> Optional[int]:
+        if label is None:
+            return ALL
+        if dim in BANDS and label not in self._codes[dim]:
+            raise ValueError(f"Unknown {dim} '{label}', expected one of {list(BANDS[dim][1])}")
+        return self._codes[dim].get(label)
+
+    def query(self, **filters: Optional[str]) -> Dict[str, Any]:
+        """Totals for the rows matching every given dimension=label filter."""
+        unknown = set(filters) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown segment dimensions {sorted(unknown)}, expected {list(DIMENSIONS)}")
+        with self._lock:
+            index = tuple(self._slot(dim, filters.get(dim)) for dim in DIMENSIONS)
+            values = np.zeros(len(MEASURES)) if None in index else self.cube[index].copy()
+        return _totals(values)
+
+    def breakdown(self, dimension: str, **filters: Optional[str]) -> List[Dict[str, Any]]:
+        """`query()` for each value of `dimension`, within the other filters."""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown segment dimension '{dimension}', expected one of {list(DIMENSIONS)}")
+        return [{dimension: label, **self.query(**{**filters, dimension: label})}
+                for label in list(self.labels[dimension])]
+
+
+def _totals(values: np.ndarray) -> Dict[str, Any]:
+    rows, spend, conversions, visits, revenue = values.tolist()
+    return {
+        "rows": int(rows),
+        "spend": round(spend, 2),
+        "conversions": int(conversions),
+        "visits": int(visits),
+        "revenue": round(revenue, 2),
+        "roi": round((revenue - spend) / spend * 100, 2) if spend else 0.0,
+        "cost_per_conversion": round(spend / conversions, 2) if conversions else None
+    }
+
+
+class SegmentIndexRegistry:
+    """
+    Segment indexes of whole datasets, built once per version of the file
+    (read in chunks), and live indexes of the rows each job has observed,
+    kept for the `max_jobs` most recently started jobs.
+    """
+
+    def __init__(self, max_jobs: int = DEFAULT_MAX_JOB_INDEXES):
+        self.max_jobs = max(1, int(max_jobs))
+        self._datasets: Dict[str, tuple] = {}
+        self._jobs: "OrderedDict[str, SegmentIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_dataset(self, path: str) -> SegmentIndex:
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._datasets.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            index = SegmentIndex()
+            for chunk in get_dataset_registry().iter_chunks(key, STREAM_CHUNK_ROWS):
+                index.add_frame(build_observation_frame(chunk))
+            self._datasets[key] = (signature, index)
+            return index
+
+    def create_job(self, job_id: str) -> SegmentIndex:
+        """A fresh index for a job (replacing any earlier one), evicting the oldest beyond max_jobs."""
+        with self._lock:
+            index = self._jobs[job_id] = SegmentIndex()
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            return index
+
+    def for_job(self, job_id: str) -> Optional[SegmentIndex]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+_shared_registry: Optional[SegmentIndexRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_segment_indexes() -> SegmentIndexRegistry:
+    """
+    Return the process-wide segment index registry.
+    SEGMENT_INDEX_JOBS sets how many jobs keep a live index.
+    """
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = SegmentIndexRegistry(
+                max_jobs=int(os.getenv('SEGMENT_INDEX_JOBS', DEFAULT_MAX_JOB_INDEXES)))
+        return _shared_registry
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Campaign summary fields that add up across shards, in summary key order
+SUMMED_FIELDS = ("total_budget", "spent_budget", "total_conversions", "total_clicks", "total_steps", "current_step")
+# How often a shard checks whether the job was cancelled
+CANCEL_POLL_SECONDS = 0.2
+
+# Set by the parent process when the job is cancelled (see init_shard_worker)
+_cancel_event = None
+
+
+class ShardCancelledError(Exception):
+    """The job was cancelled while this shard was running."""
+
+
+def init_shard_worker(cancel_event):
+    """ProcessPoolExecutor initializer: hands each worker the job's cancel event."""
+    global _cancel_event
+    _cancel_event = cancel_event
+
+
+def shard_ranges(total_rows: int, shards: int, start: int = 0) -> List[Tuple[int, int]]:
+    """
+    Split rows start..total_rows into at most `shards` contiguous (start, stop)
+    ranges of near-equal size. Depends only on its arguments, so a rerun with
+    the same shard count processes exactly the same partitions.
+    """
+    if start >= total_rows:
+        return []
+    shards = max(1, min(int(shards), total_rows - start))
+    base, extra = divmod(total_rows - start, shards)
+    ranges = []
+    for index in range(shards):
+        stop = start + base + (1 if index < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def shard_job_id(job_id: str, shard_index: int) -> str:
+    return f"{job_id}.shard{shard_index}"
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-shard `get_campaign_summary()` results into one."""
+    merged = {field: sum(summary.get(field, 0) for summary in summaries) for field in SUMMED_FIELDS}
+    merged["status"] = "COMPLETE" if all(summary.get("status") == "COMPLETE" for summary in summaries) else "RUNNING"
+    return merged
+
+
+def run_shard(job_id: str, shard_index: int, row_range: Tuple[int, int], dataset_path: str,
+              options: Dict[str, Any], service_factory: Optional[Callable[[], Any]] = None
+              ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run one shard's OODA loop to completion in a worker process.
+
+    The shard logs to its own file (see `shard_job_id`) and returns its
+    campaign summary and rule routing counts. `service_factory` builds the
+    Gemini service inside the worker (it must be picklable); by default the
+    process-wide one is used. The run stops with ShardCancelledError once
+    the worker's cancel event is set.
+    """
+    from .adforge_agent import AdForgeAgent
+    from .gemini_service import get_gemini_service
+    from .response_cache import get_response_cache
+
+    gemini_service = (service_factory or get_gemini_service)()
+    agent = AdForgeAgent(
+        shard_job_id(job_id, shard_index), gemini_service, mode="production",
+        max_concurrency=options.get("max_concurrency", 8),
+        batch_size=options.get("batch_size", 1),
+        response_cache=get_response_cache() if options.get("use_response_cache") else None,
+        row_range=row_range,
+        rules_engine=options.get("rules_engine"),
+        prompt_encoding=options.get("prompt_encoding", "json"),
+        prompt_fields=options.get("prompt_fields"),
+        json_output=options.get("json_output", True)
+    )
+    summary = asyncio.run(_run_until_cancelled(agent.run_intelligent_campaign(dataset_path)))
+    return summary, agent.routing
+
+
+async def _run_until_cancelled(run):
+    task = asyncio.ensure_future(run)
+    while not task.done():
+        if _cancel_event is not None and _cancel_event.is_set():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            raise ShardCancelledError("Job cancelled")
+        await asyncio.wait({task}, timeout=CANCEL_POLL_SECONDS)
+    return task.result()
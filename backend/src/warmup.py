@@ -0,0 +1,69 @@
+import importlib
+import os
+import threading
+import time
+
+from .metrics import get_metrics
+
+# Modules the web process only imports when a campaign first needs them
+# (pandas, numpy and the Gemini SDK come in with these)
+HEAVY_MODULES = (
+    "src.adforge_agent",
+    "src.rules_engine",
+    "src.portfolio",
+    "src.segment_index",
+    "google.generativeai",
+)
+
+# Process that started the warm-up; a forked worker starts its own
+_started_pid = None
+_started_lock = threading.Lock()
+
+
+def warm_up(dataset_path: str, delay: float = 0.0):
+    """
+    Import the heavy modules, load the dataset (and its segment index) and
+    create the shared Gemini client, so the first campaign request does not
+    pay for them. A step that fails is reported and skipped; the request
+    that needs it will retry and surface the error.
+    """
+    if delay:
+        time.sleep(delay)
+    started = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Warm-up: could not import {name}: {e}")
+
+    try:
+        from .dataset_registry import get_dataset_registry
+        from .segment_index import get_segment_indexes
+        get_dataset_registry().load(dataset_path)
+        get_segment_indexes().for_dataset(dataset_path)
+    except Exception as e:
+        print(f"Warm-up: could not load dataset {dataset_path}: {e}")
+
+    try:
+        from .gemini_service import get_gemini_service
+        get_gemini_service()
+    except Exception as e:
+        print(f"Warm-up: could not create the Gemini client: {e}")
+
+    elapsed = time.perf_counter() - started
+    get_metrics().set_gauge("adforge_warmup_seconds", elapsed)
+    print(f"Warm-up finished in {elapsed:.2f}s")
+
+
+def start_warm_up(dataset_path: str, delay: float = 0.0) -> bool:
+    """Run warm_up() once per process on a daemon thread; False if it already started."""
+    global _started_pid
+    pid = os.getpid()
+    if _started_pid == pid:
+        return False
+    with _started_lock:
+        if _started_pid == pid:
+            return False
+        _started_pid = pid
+    threading.Thread(target=warm_up, args=(dataset_path, delay), name="warm-up", daemon=True).start()
+    return True
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests import `src` and `benchmarks` the way the app does, from backend/
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# No background warm-up (dataset load, Gemini client) under the test client
+os.environ["AGENT_WARMUP"] = "0"
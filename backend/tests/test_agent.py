@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from benchmarks.fake_gemini import make_fake_service
+from benchmarks.synthetic_data import make_synthetic_dataset
+from src.adforge_agent import AdForgeAgent
+
+
+def read_log(job_id):
+    with open(f"logs/{job_id}.jsonlog") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_production_run_on_fake_model(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(40).to_csv("data.csv", index=False)
+    agent = AdForgeAgent("job", make_fake_service(latency=0), mode="production")
+    asyncio.run(agent.run_intelligent_campaign("data.csv", None))
+
+    entries = read_log("job")
+    completed = [entry for entry in entries if entry["step"] == "ACT" and entry.get("sub_step") == "completed"]
+    assert len(completed) == 40
+    assert [entry["step_number"] for entry in completed] == list(range(1, 41))
+    assert entries[-1]["step"] == "COMPLETE"
+
+
+def test_dataset_loading_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    import time
+    from src import adforge_agent
+
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(10).to_csv("data.csv", index=False)
+
+    class SlowSimulator(adforge_agent.StreamingAdCampaignSimulator):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.3)  # A long synchronous pass over a large file
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(adforge_agent, "StreamingAdCampaignSimulator", SlowSimulator)
+    agent = AdForgeAgent("job", make_fake_service(latency=0), mode="production", streaming=True)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await agent.run_intelligent_campaign("data.csv", None)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 15
+    assert read_log("job")[-1]["step"] == "COMPLETE"
+
+
+def test_batches_match_rows_with_custom_prompt_fields(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(40).to_csv("data.csv", index=False)
+    service = make_fake_service(latency=0)
+    agent = AdForgeAgent("job", service, mode="production", batch_size=8, prompt_fields=["roi", "ad_spend"])
+    summary = asyncio.run(agent.run_intelligent_campaign("data.csv", None))
+
+    entries = read_log("job")
+    assert not [entry for entry in entries if entry.get("sub_step") == "ai_fallback"]
+    assert service.model.calls == 5
+    assert summary["token_usage"]["calls"] == 5
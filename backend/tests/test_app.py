@@ -0,0 +1,157 @@
+import json
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+import app as backend
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(backend, "SSE_KEEPALIVE_SECONDS", 0.05)
+    (tmp_path / "logs").mkdir()
+    return backend.app.test_client()
+
+
+def make_job(status="COMPLETED", entries=()):
+    job_id = str(uuid.uuid4())
+    backend.job_store.create(job_id, {"status": status, "tenant": "default", "progress": 0})
+    with open(f"logs/{job_id}.jsonlog", "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return job_id
+
+
+ENTRIES = [{"step": "ACT", "sub_step": "completed", "step_number": i} for i in range(1, 6)]
+
+
+def test_status_pages_through_the_log(client):
+    job_id = make_job(entries=ENTRIES)
+    body = client.get(f"/get-campaign-status/{job_id}?cursor=1&limit=2").get_json()
+    assert body["log_entries"] == ENTRIES[1:3]
+    assert body["next_cursor"] == 3
+    body = client.get(f"/get-campaign-status/{job_id}?cursor=3").get_json()
+    assert body["log_entries"] == ENTRIES[3:]
+    # Read to the end of a finished job: later reads come from the file
+    assert client.get(f"/get-campaign-status/{job_id}?cursor=0").get_json()["log_entries"] == ENTRIES
+
+
+def test_status_rejects_negative_limit(client):
+    job_id = make_job(entries=ENTRIES)
+    response = client.get(f"/get-campaign-status/{job_id}?cursor=4&limit=-2")
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def read_events(response):
+    return [block for block in response.get_data(as_text=True).split("\n\n") if block]
+
+
+def test_stream_replays_after_last_event_id(client):
+    job_id = make_job(entries=ENTRIES)
+    events = read_events(client.get(f"/stream-campaign/{job_id}", headers={"Last-Event-ID": "2"}))
+    assert [event.split("\n")[0] for event in events[:-1]] == ["id: 3", "id: 4"]
+    assert events[-1].startswith("event: end")
+    events = read_events(client.get(f"/stream-campaign/{job_id}?last_event_id=0"))
+    assert events[0].startswith("id: 1\n")
+
+
+@pytest.mark.parametrize("value", ["abc", "-1", "-5", "1.5", " "])
+def test_stream_rejects_malformed_last_event_id(client, value):
+    job_id = make_job(entries=ENTRIES)
+    response = client.get(f"/stream-campaign/{job_id}", headers={"Last-Event-ID": value})
+    assert response.status_code == 400
+    response = client.get(f"/stream-campaign/{job_id}", query_string={"last_event_id": value})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("options", [
+    {"shards": 0},
+    {"shards": -3},
+    {"shards": "many"},
+    {"shards": 2.5},
+    {"shards": True},
+    {"batch_size": 0},
+    {"max_concurrency": "x"},
+    {"mode": "turbo"},
+    {"prompt_encoding": "xml"},
+    {"clock": "sundial"},
+    {"prompt_fields": "roi"},
+    {"prompt_fields": ["bogus"]},
+    {"prompt_fields": ["roi", 5]},
+    {"prompt_fields": 5},
+    {"streaming": True, "shards": 2, "mode": "production"},
+    {"rules": {"no_such_threshold": 1}},
+])
+def test_start_rejects_bad_options(client, options):
+    jobs = backend.job_store.count()
+    response = client.post("/start-campaign", json=options)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+    assert backend.job_store.count() == jobs
+
+
+def test_start_clamps_shards_to_cpus(client, monkeypatch):
+    monkeypatch.setattr(backend.os, "cpu_count", lambda: 2)
+    scheduled = {}
+
+    def fake_schedule(job_id, tenant, build_agent, *args):
+        scheduled["agent"] = build_agent(None)
+        return 0
+
+    monkeypatch.setattr(backend, "_schedule_agent", fake_schedule)
+    response = client.post("/start-campaign", json={"mode": "production", "shards": 5000})
+    assert response.status_code == 200
+    assert scheduled["agent"].shards == 2
+
+
+def make_checkpointed_job(owner):
+    job_id = make_job(status="RUNNING")
+    backend.job_store.update(job_id, owner=owner)
+    with open(f"logs/{job_id}.checkpoint.json", "w") as f:
+        json.dump({"completed": False, "next_row": 10,
+                   "options": {"mode": "production", "dataset_path": "data.csv", "demo_rows": None}}, f)
+    return job_id
+
+
+def test_resume_refuses_a_job_running_in_another_live_process(client, monkeypatch):
+    monkeypatch.setattr(backend, "_schedule_agent", lambda *args: pytest.fail("scheduled a running job"))
+    # The job store is shared with the parent process, which is alive
+    job_id = make_checkpointed_job({**backend.current_owner(), "pid": os.getppid()})
+    response = client.post(f"/resume-campaign/{job_id}")
+    assert response.status_code == 409
+    assert backend.job_store.get(job_id)["status"] == "RUNNING"
+
+
+def test_resume_takes_over_a_job_whose_process_died(client, monkeypatch):
+    monkeypatch.setattr(backend, "_schedule_agent", lambda *args: 0)
+    process = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    job_id = make_checkpointed_job({**backend.current_owner(), "pid": int(process.stdout)})
+    response = client.post(f"/resume-campaign/{job_id}")
+    assert response.status_code == 200
+    record = backend.job_store.get(job_id)
+    assert record["status"] == "QUEUED"
+    assert record["owner"] == backend.current_owner()
+
+
+def test_start_accepts_observation_prompt_fields(client, monkeypatch):
+    scheduled = {}
+
+    def fake_schedule(job_id, tenant, build_agent, *args):
+        scheduled["agent"] = build_agent(None)
+        return 0
+
+    monkeypatch.setattr(backend, "_schedule_agent", fake_schedule)
+    response = client.post("/start-campaign", json={"prompt_fields": ["roi", "click_through_rate"]})
+    assert response.status_code == 200
+    assert scheduled["agent"].prompt_builder.fields == ("roi", "click_through_rate")
+
+
+def test_metrics_export_response_cache_totals_as_counters(client):
+    body = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE adforge_response_cache_hits_total counter" in body
+    assert "# TYPE adforge_response_cache_misses_total counter" in body
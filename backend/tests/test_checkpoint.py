@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fake_gemini import make_fake_service
+from benchmarks.synthetic_data import make_synthetic_dataset
+from src.adforge_agent import AdForgeAgent
+from src.portfolio import PortfolioOptimizer
+from src.rules_engine import RulesEngine
+
+ROWS = 400
+CHECKPOINT_ROWS = 50
+
+
+class Crash(Exception):
+    """The process dying mid-run."""
+
+
+def crash_at(step_number):
+    """An event sink that fails once step `step_number` has been logged as done, before it is committed."""
+    def sink(seq, entry):
+        if entry.get("step") == "ACT" and entry.get("sub_step") == "completed":
+            if entry["step_number"] == step_number:
+                raise Crash()
+    return sink
+
+
+def make_agent(job_id, **options):
+    return AdForgeAgent(job_id, make_fake_service(latency=0), mode="production", checkpoint_every=CHECKPOINT_ROWS,
+                        rules_engine=RulesEngine(), portfolio_optimizer=PortfolioOptimizer(), **options)
+
+
+def read_log(job_id):
+    with open(f"logs/{job_id}.jsonlog") as f:
+        return [json.loads(line) for line in f]
+
+
+def run_with_crash(job_id, step_number, **options):
+    with pytest.raises(Crash):
+        asyncio.run(make_agent(job_id, event_sink=crash_at(step_number), **options)
+                    .run_intelligent_campaign("data.csv", None))
+    return asyncio.run(make_agent(job_id, resume=True, **options).run_intelligent_campaign("data.csv", None))
+
+
+def completed_steps(job_id):
+    return [entry["step_number"] for entry in read_log(job_id)
+            if entry["step"] == "ACT" and entry.get("sub_step") == "completed"]
+
+
+def assert_same_totals(summary, expected):
+    for field in ("spent_budget", "total_conversions", "total_clicks", "current_step", "total_steps"):
+        assert summary[field] == pytest.approx(expected[field]), field
+
+
+def portfolio_groups(job_id, last=False):
+    portfolios = [entry["portfolio"] for entry in read_log(job_id) if entry["step"] == "PORTFOLIO"]
+    assert len(portfolios) == 1 or last
+    return portfolios[-1]["groups"]
+
+
+def test_resumed_run_keeps_decisions_made_before_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(ROWS).to_csv("data.csv", index=False)
+    asyncio.run(make_agent("clean").run_intelligent_campaign("data.csv", None))
+    run_with_crash("resumed", 320)
+
+    groups = portfolio_groups("resumed")
+    assert sum(sum(group["row_decisions"].values()) for group in groups) == ROWS
+    clean = portfolio_groups("clean")
+    assert [group["row_decisions"] for group in groups] == [group["row_decisions"] for group in clean]
+
+
+# The first checkpoint is saved after step 50; crashing on a save boundary loses the rows since the last one
+@pytest.mark.parametrize("crash_step", [51, 100, 237, ROWS])
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, monkeypatch, crash_step):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(ROWS).to_csv("data.csv", index=False)
+    expected = asyncio.run(make_agent("clean").run_intelligent_campaign("data.csv", None))
+    summary = run_with_crash("resumed", crash_step)
+
+    assert completed_steps("resumed") == list(range(1, ROWS + 1))
+    assert_same_totals(summary, expected)
+    entries = read_log("resumed")
+    assert [entry["step"] for entry in entries].count("COMPLETE") == 1
+    assert sum(sum(group["row_decisions"].values()) for group in portfolio_groups("resumed")) == ROWS
+
+
+def test_incremental_resume_processes_only_appended_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = make_synthetic_dataset(ROWS)
+    data.to_csv("full.csv", index=False)
+    expected = asyncio.run(make_agent("clean").run_intelligent_campaign("full.csv", None))
+
+    data.iloc[:300].to_csv("data.csv", index=False)
+    asyncio.run(make_agent("job").run_intelligent_campaign("data.csv", None))
+    data.iloc[300:].to_csv("data.csv", mode="a", header=False, index=False)
+    summary = asyncio.run(make_agent("job", resume=True).run_intelligent_campaign("data.csv", None))
+
+    assert completed_steps("job") == list(range(1, ROWS + 1))
+    assert_same_totals(summary, expected)
+    # Each run reports its portfolio; the last one covers every row
+    assert sum(sum(group["row_decisions"].values()) for group in portfolio_groups("job", last=True)) == ROWS
@@ -0,0 +1,28 @@
+import os
+
+import pandas as pd
+
+from benchmarks.synthetic_data import make_synthetic_dataset
+from src.ad_simulator import build_observation_frame, iter_observation_records
+from src.dataset_registry import DatasetRegistry
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "digital_marketing_campaign_dataset.csv")
+
+
+def test_compact_dtypes_keep_observation_values():
+    # Observations (and so prompts and cache keys) match a plain read_csv
+    path = DATASET_PATH
+    compact = iter_observation_records(build_observation_frame(DatasetRegistry().load(path)))
+    full = iter_observation_records(build_observation_frame(pd.read_csv(path)))
+    for compact_row, full_row in zip(compact, full, strict=True):
+        assert compact_row.to_dict() == full_row.to_dict()
+
+
+def test_registry_reuses_frame_until_file_changes(tmp_path):
+    path = str(tmp_path / "data.csv")
+    make_synthetic_dataset(10).to_csv(path, index=False)
+    registry = DatasetRegistry()
+    assert registry.load(path) is registry.load(path)
+    make_synthetic_dataset(20).to_csv(path, index=False)
+    assert len(registry.load(path)) == 20
+    assert registry.loads == 2
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from benchmarks.fake_gemini import FAKE_RESPONSE, FakeAPIError, FakeGenerativeModel
+from src.gemini_service import JSON_GENERATION_CONFIG, GeminiService
+
+
+class FlakyModel(FakeGenerativeModel):
+    """The fake model, failing its first `failures` calls with `error_code`."""
+
+    def __init__(self, failures, error_code=429, **options):
+        super().__init__(latency=0, **options)
+        self.failures = failures
+        self.failure_code = error_code
+        self.configs = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.configs.append(generation_config)
+        if len(self.configs) <= self.failures:
+            self.calls += 1
+            raise FakeAPIError(self.failure_code)
+        return super().generate_content(prompt, generation_config)
+
+
+def make_service(model, **options):
+    # No backoff sleeps, so retries are instant
+    return GeminiService(model=model, backoff_base=0, **options)
+
+
+def generate(service, prompt="Campaign data", **options):
+    return asyncio.run(service.generate_content(prompt, **options))
+
+
+def test_returns_model_text():
+    model = FakeGenerativeModel(latency=0)
+    assert generate(make_service(model)) == FAKE_RESPONSE
+    assert model.calls == 1
+
+
+@pytest.mark.parametrize("code", [429, 500, 503])
+def test_retries_transient_errors(code):
+    model = FlakyModel(failures=2, error_code=code)
+    assert generate(make_service(model, max_retries=4)) == FAKE_RESPONSE
+    assert model.calls == 3
+
+
+def test_falls_back_when_retries_run_out():
+    model = FakeGenerativeModel(latency=0, error_rate=1.0)
+    text = generate(make_service(model, max_retries=2))
+    assert model.calls == 3
+    assert json.loads(text.strip("`").removeprefix("json"))["action"]["parameters"]["reason"] == "api_fallback"
+
+
+def test_does_not_retry_other_errors():
+    model = FlakyModel(failures=1, error_code=400)
+    text = generate(make_service(model, max_retries=4))
+    assert model.calls == 1
+    assert "api_fallback" in text
+
+
+def test_raises_without_fallback():
+    model = FakeGenerativeModel(latency=0, error_rate=1.0, error_code=503)
+    with pytest.raises(FakeAPIError):
+        generate(make_service(model, max_retries=1), use_fallback=False)
+    assert model.calls == 2
+
+
+def test_fallback_follows_prompt():
+    model = FakeGenerativeModel(latency=0, error_rate=1.0, error_code=400)
+    service = make_service(model)
+    assert "optimize_targeting" in generate(service, prompt="The cost is too high")
+    assert "continue_monitoring" in generate(service, prompt="Nothing notable")
+
+
+def test_backoff_is_jittered_and_capped():
+    service = GeminiService(model=FakeGenerativeModel(latency=0), backoff_base=0.5, backoff_cap=4.0)
+    random.seed(0)
+    for attempt in range(8):
+        delays = [service._backoff_delay(attempt) for _ in range(50)]
+        limit = min(4.0, 0.5 * 2 ** attempt)
+        assert all(0 <= delay <= limit for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_backoff_waits_between_attempts(monkeypatch):
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    model = FlakyModel(failures=3)
+    service = GeminiService(model=model, backoff_base=1.0, backoff_cap=2.0, max_retries=4)
+    assert generate(service) == FAKE_RESPONSE
+    assert len(waits) == 3
+    assert all(0 <= wait <= limit for wait, limit in zip(waits, (1.0, 2.0, 2.0)))
+
+
+def test_json_output_passes_generation_config():
+    model = FlakyModel(failures=0)
+    generate(make_service(model), json_output=True)
+    generate(make_service(model))
+    assert model.configs == [JSON_GENERATION_CONFIG, None]
+
+
+def test_calls_run_off_the_event_loop_up_to_max_concurrency():
+    model = FakeGenerativeModel(latency=0.05)
+    service = GeminiService(model=model, max_concurrency=4)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(service.generate_content("p") for _ in range(8)))
+        elapsed = asyncio.get_running_loop().time() - started
+        task.cancel()
+        return elapsed, ticks
+
+    elapsed, ticks = asyncio.run(run())
+    # Two rounds of four concurrent calls, with the loop free meanwhile
+    assert 0.09 <= elapsed < 0.35
+    assert ticks >= 5
+
+
+class PlainModel:
+    """A model without generation_config support."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return type("Response", (), {"text": FAKE_RESPONSE})()
+
+
+def test_json_output_is_skipped_for_models_without_generation_config():
+    model = PlainModel()
+    service = make_service(model)
+    assert service.supports_json_output is False
+    assert generate(service, json_output=True) == FAKE_RESPONSE
+    assert model.calls == 1
+
+
+class BrokenModel(FakeGenerativeModel):
+    """Raises a TypeError from inside a JSON-mode call."""
+
+    def generate_content(self, prompt, generation_config=None):
+        if generation_config is not None:
+            raise TypeError("unexpected value inside the SDK")
+        return super().generate_content(prompt)
+
+
+def test_type_error_inside_a_call_keeps_json_mode():
+    service = make_service(BrokenModel(latency=0))
+    assert service.supports_json_output is True
+    with pytest.raises(TypeError):
+        generate(service, json_output=True, use_fallback=False)
+    assert service.supports_json_output is True
+    # With fallback it is a failed call like any other
+    assert "api_fallback" in generate(service, json_output=True)
@@ -0,0 +1,54 @@
+import pytest
+
+from src.job_store import InMemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**options):
+        if request.param == "memory":
+            return InMemoryJobStore(**options)
+        return SQLiteJobStore(str(tmp_path / "jobs.db"), **options)
+    return make
+
+
+def test_list_pages_newest_first(make_store):
+    store = make_store()
+    for i in range(5):
+        store.create(f"job-{i}", {"status": "QUEUED" if i % 2 else "RUNNING"})
+    page, cursor = store.list(limit=2)
+    assert [job["job_id"] for job in page] == ["job-4", "job-3"]
+    page, cursor = store.list(limit=2, cursor=cursor)
+    assert [job["job_id"] for job in page] == ["job-2", "job-1"]
+    page, cursor = store.list(limit=2, cursor=cursor)
+    assert [job["job_id"] for job in page] == ["job-0"] and cursor is None
+    assert [job["job_id"] for job in store.list(status="QUEUED")[0]] == ["job-3", "job-1"]
+    assert store.count("RUNNING") == 3
+
+
+def test_evicts_finished_jobs_over_the_cap(make_store):
+    store = make_store(max_finished=1)
+    evicted = []
+    store.on_evict.append(evicted.append)
+    for job_id in ("a", "b", "c"):
+        store.create(job_id, {"status": "RUNNING"})
+    store.update("a", status="COMPLETED")
+    store.update("b", status="ERROR")
+    assert store.evict() == 1
+    assert evicted == ["a"]
+    assert "b" in store and "c" in store
+
+
+def test_resumed_job_is_not_evicted_while_running(make_store):
+    store = make_store(ttl_seconds=0, max_finished=0)
+    store.create("job", {"status": "RUNNING"})
+    store.update("job", status="ERROR", error="process died")
+    # Resumed before the eviction sweep ran
+    store.update("job", status="QUEUED", error=None)
+    store.update("job", status="RUNNING")
+    assert store.evict() == 0
+
+    store.update("job", status="COMPLETED", result={"ok": True})
+    assert store.get("job")["status"] == "COMPLETED"
+    assert store.evict() == 1
+    assert "job" not in store
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from src.log_tail import JobLogTail
+
+
+def write_entries(path, entries, partial=""):
+    with open(path, "a") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.write(partial)
+
+
+def act(step_number):
+    return {"step": "ACT", "sub_step": "completed", "step_number": step_number}
+
+
+def test_pages_match_the_log(tmp_path):
+    path = tmp_path / "job.jsonlog"
+    entries = [{"step": "INITIALIZE", "campaign_summary": {"total_steps": 100}}] + [act(i) for i in range(1, 101)]
+    write_entries(path, entries[:50])
+    tail = JobLogTail(str(path), window=8)
+    assert tail.read(0)[1] == 50
+    write_entries(path, entries[50:])
+
+    # Old pages come from the file, recent ones from the window
+    assert tail.read(0, 10) == (entries[:10], 10)
+    assert tail.read(45, 20) == (entries[45:65], 65)
+    assert tail.read(95) == (entries[95:], 101)
+    assert tail.read(200) == ([], 101)
+    assert tail.total_entries == 101
+    assert tail.progress == 100
+    assert len(tail._recent) == 8
+
+
+def test_skips_partial_blank_and_invalid_lines(tmp_path):
+    path = tmp_path / "job.jsonlog"
+    write_entries(path, [act(1)], partial="\nnot json\n")
+    write_entries(path, [act(2)], partial='{"step": "AC')
+    tail = JobLogTail(str(path), window=0)
+    assert tail.read(0) == ([act(1), act(2)], 2)
+    write_entries(path, [], partial='T"}\n')
+    assert tail.read(1) == ([act(2), {"step": "ACT"}], 3)
+
+
+def test_release_keeps_reading_from_file(tmp_path):
+    path = tmp_path / "job.jsonlog"
+    entries = [act(i) for i in range(20)]
+    write_entries(path, entries)
+    tail = JobLogTail(str(path))
+    tail.read(0)
+    tail.release()
+    assert len(tail._recent) == 0
+    assert tail.read(5, 3) == (entries[5:8], 8)
+    assert tail.read(15) == (entries[15:], 20)
+
+
+def test_starts_over_when_the_file_is_truncated(tmp_path):
+    path = tmp_path / "job.jsonlog"
+    write_entries(path, [act(i) for i in range(10)])
+    tail = JobLogTail(str(path))
+    assert tail.read(0)[1] == 10
+    path.write_text("")
+    write_entries(path, [act(1)])
+    assert tail.read(0) == ([act(1)], 1)
+
+
+def test_rejects_negative_limit(tmp_path):
+    path = tmp_path / "job.jsonlog"
+    write_entries(path, [act(i) for i in range(10)])
+    tail = JobLogTail(str(path))
+    with pytest.raises(ValueError):
+        tail.read(5, -3)
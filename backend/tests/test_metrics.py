@@ -0,0 +1,29 @@
+import pytest
+
+from src.clock import PhaseLatency
+from src.metrics import MetricsRegistry
+
+
+def test_merged_shard_timings_reach_the_phase_histograms():
+    registry = MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+    shard = PhaseLatency()
+    shard.record("decide", 0.2, count=4)
+    shard.record("decide", 0.03)
+    latency = PhaseLatency(metrics=registry)
+    latency.merge(shard.summary())
+
+    rendered = registry.render()
+    assert 'adforge_phase_seconds_count{phase="decide"} 5' in rendered
+    assert 'adforge_phase_seconds_bucket{phase="decide",le="0.1"} 5' in rendered
+    sum_line = next(line for line in rendered.splitlines() if line.startswith("adforge_phase_seconds_sum"))
+    assert float(sum_line.split()[-1]) == pytest.approx(0.23)
+    assert latency.summary() == shard.summary()
+
+
+def test_counters_kept_elsewhere_render_as_counters():
+    registry = MetricsRegistry()
+    registry.set_counter("adforge_response_cache_hits_total", 3)
+    registry.set_counter("adforge_response_cache_hits_total", 7)
+    rendered = registry.render()
+    assert "# TYPE adforge_response_cache_hits_total counter" in rendered
+    assert "adforge_response_cache_hits_total 7" in rendered
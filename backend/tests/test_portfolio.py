@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import make_synthetic_dataset
+from src.ad_simulator import CONVERSION_VALUE, AdCampaignSimulator
+from src.portfolio import GROUP_FIELDS, PortfolioOptimizer, portfolio_frame
+
+
+@pytest.fixture(scope="module")
+def frame(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "data.csv"
+    make_synthetic_dataset(2000, seed=3).to_csv(path, index=False)
+    return portfolio_frame(AdCampaignSimulator(str(path)))
+
+
+def test_allocation_spends_the_budget_within_the_shift_bounds():
+    rng = np.random.default_rng(0)
+    spend = rng.uniform(100, 10_000, 30)
+    revenue = spend * rng.uniform(0.2, 3.0, 30)
+    elasticity = rng.uniform(0.05, 0.95, 30)
+    optimizer = PortfolioOptimizer(max_shift=0.3)
+    for budget in (spend.sum(), spend.sum() * 1.1, spend.sum() * 0.8):
+        allocation, _ = optimizer.allocate(spend, revenue, elasticity, budget)
+        assert allocation.sum() == pytest.approx(budget)
+        assert np.all(allocation >= spend * 0.7 - 1e-6)
+        assert np.all(allocation <= spend * 1.3 + 1e-6)
+
+
+def test_unreachable_budget_is_clamped_to_the_bounds():
+    spend = np.array([100.0, 200.0])
+    optimizer = PortfolioOptimizer(max_shift=0.5)
+    allocation, _ = optimizer.allocate(spend, spend * 2, np.array([0.5, 0.5]), budget=10_000)
+    assert allocation.tolist() == pytest.approx([150.0, 300.0])
+
+
+def test_higher_elasticity_gains_budget():
+    # Same spend and return; only how revenue responds to more spend differs
+    spend = np.array([1000.0, 1000.0, 1000.0])
+    revenue = np.array([1500.0, 1500.0, 1500.0])
+    allocation, _ = PortfolioOptimizer(max_shift=0.5).allocate(spend, revenue, np.array([0.2, 0.5, 0.9]), 3000.0)
+    assert allocation[0] < spend[0] < allocation[2]
+    assert allocation[0] < allocation[1] < allocation[2]
+
+
+def test_optimize_report_keeps_total_and_bounds(frame):
+    report = PortfolioOptimizer(max_shift=0.25).optimize(frame)
+    totals = report["totals"]
+    assert totals["recommended_spend"] == pytest.approx(totals["spend"], abs=0.05)
+    assert totals["groups"] == frame.groupby(list(GROUP_FIELDS)).ngroups
+    assert sum(group["rows"] for group in report["groups"]) == len(frame)
+    for group in report["groups"]:
+        assert abs(group["spend_change_pct"]) <= 25 + 1e-6
+    assert sum(group["recommended_spend"] for group in report["groups"]) == pytest.approx(totals["spend"], rel=1e-6)
+
+
+def test_optimize_honours_a_budget(frame):
+    budget = float(frame["ad_spend"].sum()) * 1.1
+    report = PortfolioOptimizer(max_shift=0.5, budget=budget).optimize(frame)
+    assert report["totals"]["recommended_spend"] == pytest.approx(budget, abs=0.05)
+
+
+def test_fitted_elasticity_moves_budget_toward_responsive_groups():
+    rng = np.random.default_rng(1)
+    spend = rng.uniform(100, 10_000, 400)
+    rows = []
+    for platform, elasticity in (("flat", 0.1), ("steep", 0.9)):
+        # Both groups return about the same at their mean spend
+        revenue = 5000 * (spend / spend.mean()) ** elasticity
+        rows.append(pd.DataFrame({"campaign_channel": "Email", "campaign_type": "Awareness",
+                                  "advertising_platform": platform, "ad_spend": spend,
+                                  "conversions": revenue / CONVERSION_VALUE}))
+    frame = pd.concat(rows, ignore_index=True)
+
+    optimizer = PortfolioOptimizer(max_shift=0.5)
+    elasticity = optimizer.fit_curves(frame)["elasticity"]
+    assert elasticity[("Email", "Awareness", "steep")] > elasticity[("Email", "Awareness", "flat")]
+    groups = {group["advertising_platform"]: group for group in optimizer.optimize(frame)["groups"]}
+    assert groups["steep"]["spend_change_pct"] > 0 > groups["flat"]["spend_change_pct"]
@@ -0,0 +1,27 @@
+from src.prompt_builder import PromptBuilder
+from src.records import Observation, OBSERVATION_FIELDS
+
+OBSERVATIONS = [Observation(*(f"v{row}-{i}" for i in range(len(OBSERVATION_FIELDS)))) for row in range(3)]
+
+
+def table(prompt):
+    return prompt.split("campaigns) ---\n", 1)[1].split("\n--- END OF DATA", 1)[0].split("\n")
+
+
+def test_batch_table_leads_with_campaign_id():
+    rows = table(PromptBuilder("meta", "batch").build_batch(OBSERVATIONS))
+    assert rows[0].split("|")[:2] == ["campaign_id", "date"]
+    assert len(rows[0].split("|")) == len(OBSERVATION_FIELDS)
+    assert rows[1].split("|")[0] == OBSERVATIONS[0].campaign_id
+
+
+def test_batch_table_keeps_campaign_id_with_custom_fields():
+    rows = table(PromptBuilder("meta", "batch", fields=["roi", "ad_spend"]).build_batch(OBSERVATIONS))
+    assert rows[0] == "campaign_id|roi|ad_spend"
+    assert rows[2] == f"{OBSERVATIONS[1].campaign_id}|{OBSERVATIONS[1].roi}|{OBSERVATIONS[1].ad_spend}"
+
+
+def test_compact_encoding_selects_fields():
+    builder = PromptBuilder("meta", "batch", encoding="compact", fields=["roi"])
+    assert builder.encode(OBSERVATIONS[0]) == f'{{"roi":"{OBSERVATIONS[0].roi}"}}'
+    assert builder.cache_scope == "\n[compact:roi]"
@@ -0,0 +1,25 @@
+import pytest
+
+from benchmarks.response_corpus import CORPUS, fuzz_responses
+from src.response_parser import ResponseParseError, parse_decision
+
+
+@pytest.mark.parametrize("name, text, expected", CORPUS, ids=[case[0] for case in CORPUS])
+def test_corpus(name, text, expected):
+    if expected is None:
+        with pytest.raises(ResponseParseError):
+            parse_decision(text)
+    else:
+        assert parse_decision(text)[0]["action"]["tool_name"] == expected
+
+
+def test_fuzzed_responses_are_recovered():
+    for name, text, expected in fuzz_responses(500, seed=0):
+        assert parse_decision(text)[0]["action"]["tool_name"] == expected, name
+
+
+def test_repairs_leave_string_contents_alone():
+    text = dict((name, text) for name, text, _ in CORPUS)["literals_in_strings"]
+    assert parse_decision(text)[0]["reasoning"] == "None of the signals are True positives"
+    assert parse_decision('{"reasoning": "Spend [a, b,] or {x,}", "action": "pause_campaign",}')[0]["reasoning"] \
+        == "Spend [a, b,] or {x,}"
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from src.rules_engine import DECREASE, ESCALATE, INCREASE, OPTIMIZE, PAUSE, RULE_ACTIONS, RulesEngine
+
+# (roi, click_through_rate, cost_per_conversion) -> expected code, with the default thresholds:
+# high_roi 20, low_roi -10, pause_roi -90, min CTR 0.02, max cost per conversion 30
+CASES = [
+    # One clear action each
+    ((150.0, 0.08, 12.0), INCREASE),
+    ((-40.0, 0.05, 25.0), DECREASE),
+    ((-98.0, 0.05, math.nan), PAUSE),
+    ((5.0, 0.01, 20.0), OPTIMIZE),
+    ((5.0, 0.05, 80.0), OPTIMIZE),
+    # Nothing to act on
+    ((5.0, 0.05, 10.0), ESCALATE),
+    # Within the margins of a threshold
+    ((21.0, 0.08, 12.0), ESCALATE),
+    ((-9.0, 0.05, 25.0), ESCALATE),
+    ((-89.0, 0.05, 25.0), ESCALATE),
+    ((150.0, 0.0215, 12.0), ESCALATE),
+    # Conflicting signals
+    ((150.0, 0.01, 12.0), ESCALATE),
+    ((150.0, 0.08, 80.0), ESCALATE),
+    ((-40.0, 0.01, 25.0), ESCALATE),
+    ((-98.0, 0.01, 25.0), ESCALATE),
+]
+
+
+@pytest.mark.parametrize("metrics, expected", CASES)
+def test_classify_single_rows(metrics, expected):
+    roi, ctr, cost = metrics
+    assert RulesEngine().classify([roi], [ctr], [cost]).tolist() == [expected]
+
+
+def test_classify_scores_a_block_row_by_row():
+    roi, ctr, cost = zip(*(metrics for metrics, _ in CASES))
+    assert RulesEngine().classify(roi, ctr, cost).tolist() == [expected for _, expected in CASES]
+
+
+def test_margins_widen_the_escalated_band():
+    engine = RulesEngine(roi_margin=0.0, ctr_margin=0.0)
+    assert engine.classify([21.0, 150.0], [0.08, 0.0215], [12.0, 12.0]).tolist() == [INCREASE, INCREASE]
+    engine = RulesEngine(roi_margin=50.0)
+    assert engine.classify([60.0], [0.08], [12.0]).tolist() == [ESCALATE]
+
+
+def test_decide_returns_decisions_and_none_for_escalated_rows():
+    observations = [
+        {"roi": 150.0, "click_through_rate": 0.08, "cost_per_conversion": 12.0},
+        {"roi": 150.0, "click_through_rate": 0.01, "cost_per_conversion": 12.0},
+        {"roi": -98.0, "click_through_rate": 0.05, "cost_per_conversion": None},
+    ]
+    increase, escalated, pause = RulesEngine().decide(observations)
+    assert increase["action"]["tool_name"] == RULE_ACTIONS[INCREASE]
+    assert "150.0%" in increase["reasoning"]
+    assert escalated is None
+    assert pause["action"]["tool_name"] == "pause_campaign"
+    assert RulesEngine().decide([]) == []
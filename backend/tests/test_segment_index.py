@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import make_synthetic_dataset
+from src.ad_simulator import CONVERSION_VALUE, build_observation_frame
+from src.segment_index import BANDS, DIMENSIONS, SegmentIndex
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return build_observation_frame(make_synthetic_dataset(1500, seed=5))
+
+
+@pytest.fixture(scope="module")
+def index(frame):
+    index = SegmentIndex()
+    index.add_frame(frame)
+    return index
+
+
+def labelled(frame):
+    """The frame with a column per segment dimension, banded ones mapped to their labels."""
+    data = pd.DataFrame({"spend": frame["ad_spend"], "conversions": frame["conversions"],
+                         "visits": frame["website_visits"]})
+    for dim, field in DIMENSIONS.items():
+        if dim in BANDS:
+            bounds, labels = BANDS[dim]
+            data[dim] = np.asarray(labels)[np.searchsorted(bounds, frame[field], side="right")]
+        else:
+            data[dim] = frame[field].astype(str)
+    return data
+
+
+def expected_totals(rows):
+    spend = rows["spend"].sum()
+    conversions = rows["conversions"].sum()
+    return {"rows": len(rows), "spend": pytest.approx(spend, abs=0.01), "conversions": int(conversions),
+            "visits": int(rows["visits"].sum()),
+            "revenue": pytest.approx(conversions * CONVERSION_VALUE, abs=0.01)}
+
+
+def check(totals, rows):
+    assert {key: totals[key] for key in ("rows", "spend", "conversions", "visits", "revenue")} == expected_totals(rows)
+
+
+def test_adding_rows_one_by_one_matches_add_frame(frame, index):
+    by_row = SegmentIndex()
+    for row in frame.to_dict("records"):
+        by_row.add(row)
+    assert by_row.labels == index.labels
+    np.testing.assert_allclose(by_row.cube, index.cube)
+
+
+def test_query_matches_pandas_filters(frame, index):
+    data = labelled(frame)
+    check(index.query(), data)
+    for filters in ({"channel": "Email"}, {"platform": "IsConfid", "gender": "Female"},
+                    {"age_band": "35-44", "income_band": "50k-75k", "type": "Conversion"}):
+        mask = np.logical_and.reduce([data[dim] == label for dim, label in filters.items()])
+        check(index.query(**filters), data[mask])
+
+
+def test_breakdown_matches_pandas_groupby(frame, index):
+    data = labelled(frame)
+    for dimension in DIMENSIONS:
+        groups = dict(list(data.groupby(dimension)))
+        for segment in index.breakdown(dimension):
+            check(segment, groups.get(segment[dimension], data.iloc[:0]))
+    email = data[data["channel"] == "Email"]
+    groups = dict(list(email.groupby("age_band")))
+    for segment in index.breakdown("age_band", channel="Email"):
+        check(segment, groups.get(segment["age_band"], data.iloc[:0]))
+
+
+def test_unknown_labels_and_dimensions(index):
+    assert index.query(channel="Carrier pigeon")["rows"] == 0
+    with pytest.raises(ValueError):
+        index.query(age_band="toddler")
+    with pytest.raises(ValueError):
+        index.query(colour="red")
+    with pytest.raises(ValueError):
+        index.breakdown("colour")
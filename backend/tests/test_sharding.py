@@ -0,0 +1,110 @@
+import asyncio
+import glob
+import json
+import os
+import time
+from functools import partial
+
+import pytest
+
+from benchmarks.fake_gemini import make_fake_service
+from benchmarks.synthetic_data import make_synthetic_dataset
+from src.adforge_agent import AdForgeAgent
+from src.sharding import merge_summaries, shard_ranges
+
+
+def test_shard_ranges_cover_rows_once():
+    assert shard_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert shard_ranges(10, 4, start=8) == [(8, 9), (9, 10)]
+    assert shard_ranges(5, 2, start=5) == []
+
+
+def test_merge_summaries_adds_totals():
+    merged = merge_summaries([
+        {"total_budget": 10, "spent_budget": 4, "total_conversions": 1, "total_clicks": 3, "total_steps": 2,
+         "current_step": 2, "status": "COMPLETE"},
+        {"total_budget": 5, "spent_budget": 5, "total_conversions": 0, "total_clicks": 1, "total_steps": 1,
+         "current_step": 1, "status": "COMPLETE"},
+    ])
+    assert merged == {"total_budget": 15, "spent_budget": 9, "total_conversions": 1, "total_clicks": 4,
+                      "total_steps": 3, "current_step": 3, "status": "COMPLETE"}
+
+
+def test_cancelling_a_sharded_run_stops_its_workers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(4000).to_csv("data.csv", index=False)
+    # Slow enough that the shards are still running when the job is cancelled
+    factory = partial(make_fake_service, latency=0.01, max_concurrency=1)
+    agent = AdForgeAgent("job", factory(), mode="production", shards=2, max_concurrency=1,
+                         shard_service_factory=factory)
+
+    async def run_and_cancel():
+        task = asyncio.ensure_future(agent.run_intelligent_campaign("data.csv", None))
+        # Wait for both shards to be writing their logs
+        deadline = time.monotonic() + 60
+        while len(glob.glob("logs/job.shard*.jsonlog")) < 2 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    started = time.monotonic()
+    asyncio.run(run_and_cancel())
+    assert time.monotonic() - started < 60
+    assert glob.glob("logs/job.shard*") == []
+    size = os.path.getsize("logs/job.jsonlog")
+    time.sleep(1)
+    # Nothing is still writing
+    assert glob.glob("logs/job.shard*") == []
+    assert os.path.getsize("logs/job.jsonlog") == size
+
+
+def test_sharded_run_matches_unsharded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(300).to_csv("data.csv", index=False)
+    factory = partial(make_fake_service, latency=0)
+    single = asyncio.run(AdForgeAgent("single", factory(), mode="production")
+                         .run_intelligent_campaign("data.csv", None))
+    sharded = asyncio.run(AdForgeAgent("sharded", factory(), mode="production", shards=2,
+                                       shard_service_factory=factory).run_intelligent_campaign("data.csv", None))
+    for field in ("total_budget", "spent_budget", "total_conversions", "total_clicks", "current_step"):
+        assert sharded[field] == pytest.approx(single[field])
+    assert glob.glob("logs/sharded.shard*") == []
+    with open("logs/sharded.jsonlog") as f:
+        entries = [json.loads(line) for line in f]
+    steps = [entry["step_number"] for entry in entries if entry["step"] == "ACT" and entry["sub_step"] == "completed"]
+    assert steps == list(range(1, 301))
+
+
+def test_shard_logs_are_copied_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_synthetic_dataset(2000).to_csv("data.csv", index=False)
+    factory = partial(make_fake_service, latency=0)
+    agent = AdForgeAgent("job", factory(), mode="production", shards=2, shard_service_factory=factory)
+    copy = agent._append_shard_log
+
+    def slow_copy(shard_index, cancel_event):
+        time.sleep(0.5)  # A shard log of tens of thousands of entries
+        copy(shard_index, cancel_event)
+
+    monkeypatch.setattr(agent, "_append_shard_log", slow_copy)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await agent.run_intelligent_campaign("data.csv", None)
+        task.cancel()
+        return ticks
+
+    # Two copies of at least 0.5s each, with the loop free throughout
+    assert asyncio.run(run()) >= 60
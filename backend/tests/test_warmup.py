@@ -0,0 +1,30 @@
+import app as backend
+from src import warmup
+
+
+def test_first_request_starts_the_warm_up(monkeypatch):
+    calls = []
+    monkeypatch.setenv("AGENT_WARMUP", "1")
+    monkeypatch.setattr(backend, "start_warm_up", lambda path, delay: calls.append(path))
+    client = backend.app.test_client()
+    assert client.get("/health").status_code == 200
+    assert calls == [backend.DATASET_PATH]
+
+
+def test_warm_up_can_be_turned_off(monkeypatch):
+    calls = []
+    monkeypatch.setenv("AGENT_WARMUP", "0")
+    monkeypatch.setattr(backend, "start_warm_up", lambda path, delay: calls.append(path))
+    backend.app.test_client().get("/health")
+    assert calls == []
+
+
+def test_warm_up_runs_once_per_process(monkeypatch):
+    runs = []
+    monkeypatch.setattr(warmup, "warm_up", lambda path, delay: runs.append(path))
+    monkeypatch.setattr(warmup, "_started_pid", None)
+    assert warmup.start_warm_up("data.csv") is True
+    assert warmup.start_warm_up("data.csv") is False
+    # A worker forked from a process that already warmed up starts its own
+    monkeypatch.setattr(warmup, "_started_pid", -1)
+    assert warmup.start_warm_up("data.csv") is True
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Play, Brain, Target, Zap, CheckCircle, AlertCircle, Clock, TrendingUp } from 'lucide-react';
 
 interface LogEntry {
@@ -37,12 +37,15 @@ const AgentDashboard: React.FC<DashboardProps> = ({ onStartDemo }) => {
   const [logEntries, setLogEntries] = useState<LogEntry[]>([]);
   const [isRunning, setIsRunning] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // Sequence number of the next log entry to fetch; the backend only returns newer entries
+  const logCursor = useRef(0);
 
   const startCampaignAnalysis = async () => {
     try {
       setIsRunning(true);
       setError(null);
       setLogEntries([]);
+      logCursor.current = 0;
       
       const response = await fetch('http://localhost:5001/start-campaign', {
         method: 'POST',
@@ -68,16 +71,60 @@ const AgentDashboard: React.FC<DashboardProps> = ({ onStartDemo }) => {
   useEffect(() => {
     if (!jobId || !isRunning) return;
 
+    // Live push: the backend streams each log entry as it is written (Server-Sent Events).
+    // The event id is the entry's sequence number; EventSource resumes from it on reconnect.
+    if (typeof EventSource !== 'undefined') {
+      const totalSteps = { current: 0 };
+      const completedSteps = { current: 0 };
+      const progress = () => totalSteps.current > 0 ? Math.min(100, (completedSteps.current / totalSteps.current) * 100) : 0;
+
+      const source = new EventSource(`http://localhost:5001/stream-campaign/${jobId}`);
+
+      source.onmessage = (event: MessageEvent) => {
+        const seq = Number(event.lastEventId);
+        if (seq < logCursor.current) return; // Already shown
+        logCursor.current = seq + 1;
+
+        const entry: LogEntry = JSON.parse(event.data);
+        if (entry.step === 'INITIALIZE') {
+          totalSteps.current = entry.campaign_summary?.total_steps ?? 0;
+        } else if (entry.step === 'ACT' && entry.sub_step === 'completed') {
+          completedSteps.current += 1;
+        }
+        setLogEntries(previous => [...previous, entry]);
+        setJobInfo(previous => ({
+          created_at: previous?.created_at ?? entry.timestamp,
+          ...previous,
+          status: 'RUNNING',
+          progress: progress(),
+        }));
+      };
+
+      source.addEventListener('end', (event: MessageEvent) => {
+        const info = JSON.parse(event.data);
+        setJobInfo({ ...info, progress: info.status === 'COMPLETED' ? 100 : progress() });
+        setIsRunning(false);
+        source.close();
+      });
+
+      return () => source.close();
+    }
+
     const pollStatus = async () => {
       try {
-        const response = await fetch(`http://localhost:5001/get-campaign-status/${jobId}`);
+        const cursor = logCursor.current;
+        const response = await fetch(`http://localhost:5001/get-campaign-status/${jobId}?cursor=${cursor}`);
         const data = await response.json();
         
-        if (data.success) {
+        if (data.success && cursor === logCursor.current) {
           setJobInfo(data.job_info);
-          setLogEntries(data.log_entries || []);
+          const newEntries: LogEntry[] = data.log_entries || [];
+          if (newEntries.length > 0) {
+            setLogEntries(previous => [...previous, ...newEntries]);
+          }
+          logCursor.current = data.next_cursor ?? cursor + newEntries.length;
           
-          if (data.job_info.status === 'COMPLETED' || data.job_info.status === 'ERROR') {
+          if (['COMPLETED', 'ERROR', 'CANCELLED'].includes(data.job_info.status)) {
             setIsRunning(false);
           }
         }
@@ -281,6 +328,7 @@ const AgentDashboard: React.FC<DashboardProps> = ({ onStartDemo }) => {
                 setJobId(null);
                 setJobInfo(null);
                 setLogEntries([]);
+                logCursor.current = 0;
                 setIsRunning(false);
               }}
               className="mt-4 bg-slate-700 hover:bg-slate-600 px-4 py-2 rounded transition-colors"